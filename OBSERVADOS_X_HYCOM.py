@@ -1,10 +1,16 @@
-import pandas as pd
 from scipy.interpolate import CubicSpline
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import numpy as np
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from scipy.stats import pearsonr
+
+from formato_intermediario import read_table
+from quartod_engine import select_by_quality, QC_PASS
+from alinhamento_series import align_series, print_alignment
+from metricas import calculate_statistics_barron
+from bootstrap_skill import block_bootstrap, print_bootstrap
+from skill_janelas import calendar_skill, rolling_skill, plot_windowed_skill
+from defasagem import lag_analysis, print_lag_analysis
+from analise_espectral import welch_spectra, band_skill, plot_spectra
 
 # Definição das cores e estilos para cada tipo de dado
 COLOR_OBSERVED = 'blue'
@@ -15,14 +21,12 @@ ALPHA = 0.6  # Transparência ajustada
 
 def read_model_data(file_path):
     """Lê os dados previstos HYCOM do arquivo e retorna um DataFrame com datetime e Nivel_do_Mar."""
-    df_model = pd.read_csv(file_path)
-    df_model['timestamp'] = pd.to_datetime(df_model['timestamp'])
+    df_model = read_table(file_path)
     return df_model
 
-def read_observed_data(file_path):
-    """Lê os dados observados do arquivo CSV (referência)."""
-    df_observed = pd.read_csv(file_path)
-    df_observed['timestamp'] = pd.to_datetime(df_observed['timestamp'])
+def read_observed_data(file_path, max_qc_code=QC_PASS):
+    """Lê os dados observados do arquivo CSV (referência), só com as amostras aprovadas no QC."""
+    df_observed = select_by_quality(read_table(file_path), max_code=max_qc_code)
     return df_observed
 
 def plot_data(df_observed, df_model, station_name):
@@ -58,36 +62,12 @@ def plot_adjusted_data(df_observed, df_model, station_name):
     plt.grid(True)
     plt.show()
 
-def calculate_statistics_barron(observed, modeled, description="Original"):
-    """Calcula e exibe estatísticas entre dados observados (referência) e modelados HYCOM usando o skill de Barron."""
-    
-    # Cálculo das métricas
-    rmse = np.sqrt(mean_squared_error(observed, modeled))
-    mae = mean_absolute_error(observed, modeled)
-    r, _ = pearsonr(observed, modeled)
-    d = 1 - (np.sum((observed - modeled) ** 2) / np.sum((np.abs(modeled - np.mean(observed)) + np.abs(observed - np.mean(observed))) ** 2))
-    
-    # Cálculo do "range médio do dado" conforme Barron et al. (2004)
-    range_medio_barron = (2 / len(observed)) * np.sum(np.abs(observed - np.mean(observed)))
-    
-    # Skill Score de Barron
-    skill_barron = 1 - (rmse / range_medio_barron)
-    
-    # Exibição dos resultados
-    print(f"\nEstatísticas {description} - Skill de Barron:")
-    print(f"RMSE: {rmse:.4f}")
-    print(f"MAE: {mae:.4f}")
-    print(f"Coeficiente de Correlação de Pearson (r): {r:.4f}")
-    print(f"Índice de Willmott (d): {d:.4f}")
-    print(f"Skill de Barron: {skill_barron:.4f}")
-    
-    return skill_barron
-
 # Função principal adaptada para calcular o skill de Barron
 def main():
     observed_file_path = 'dados_qualidade_RIB.csv'  # Nome do arquivo com dados observados (referência)
     model_file_path = 'nova_serie_interpolada_RIB.csv'          # Nome do arquivo com dados modelados do HYCOM
     station_name = 'Ribamar - MA'              # Nome da estação por extenso
+    tolerance = '0s'                           # Diferença máxima entre timestamps pareados
     
     df_observed = read_observed_data(observed_file_path)  # Referência
     df_model = read_model_data(model_file_path)           # Dados HYCOM
@@ -98,17 +78,34 @@ def main():
     # Cálculo e plotagem das séries ajustadas
     plot_adjusted_data(df_observed, df_model, station_name)
     
-    # Remover NaNs dos dados observados e modelados
-    df_observed = df_observed.dropna(subset=['Nivel_do_Mar'])
-    df_model = df_model.dropna(subset=['Nivel_do_Mar'])
-    
-    # Garantir que estamos comparando as séries corretamente alinhadas
-    observed = df_observed['Nivel_do_Mar'].values  # Agora, os dados observados são a referência
-    modeled = df_model['Nivel_do_Mar'].values
+    # Parear observado e modelo pelo timestamp (NaNs removidos em cada série)
+    pares, contagens = align_series(df_observed, df_model, tolerance=tolerance)
+    print_alignment(contagens, station_name)
+    observed = pares['reference'].values  # Os dados observados são a referência
+    modeled = pares['model'].values
 
     # Calcular estatísticas com Skill de Barron
     calculate_statistics_barron(observed, modeled, "Original")
 
+    # Intervalos de confiança das métricas (bootstrap de blocos móveis)
+    print_bootstrap(block_bootstrap(observed, modeled, seed=0), "Original")
+
+    # Defasagem entre observado e HYCOM (ex.: erro de fase ou de ajuste de fuso) e métricas corrigidas
+    print_lag_analysis(lag_analysis(pares['timestamp'], observed, modeled))
+
+    # Métricas mensais e em janela deslizante de 30 dias, para localizar períodos de degradação
+    mensal = calendar_skill(pares['timestamp'], observed, modeled, freq='M')
+    print("\nEstatísticas mensais:")
+    print(mensal.round(4).to_string(index=False))
+    plot_windowed_skill(rolling_skill(pares['timestamp'], observed, modeled), station_name,
+                        title='Métricas em janela deslizante de 30 dias')
+
+    # Erro e skill por banda de maré (subtidal, diurna, semidiurna...)
+    espectro = welch_spectra(pares['timestamp'], observed, modeled)
+    print("\nSkill por banda de maré:")
+    print(band_skill(espectro).round(4).to_string(index=False))
+    plot_spectra(espectro, station_name)
+
     # Calcular estatísticas para dados ajustados
     desvio_observado = observed - np.mean(observed)
     desvio_modelado = modeled - np.mean(modeled)
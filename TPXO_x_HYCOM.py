@@ -1,10 +1,12 @@
-import pandas as pd
 from scipy.interpolate import CubicSpline
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import numpy as np
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from scipy.stats import pearsonr
+
+from formato_intermediario import read_table
+from alinhamento_series import align_series, print_alignment
+from metricas import calculate_statistics_barron
+from bootstrap_skill import block_bootstrap, print_bootstrap
 
 # Definição das cores e estilos para cada tipo de dado
 COLOR_OBSERVED = 'blue'
@@ -15,14 +17,12 @@ ALPHA = 0.6  # Transparência ajustada
 
 def read_model_data(file_path):
     """Lê os dados Modelados IHO do arquivo e retorna um DataFrame com datetime e Nivel_do_Mar."""
-    df_model = pd.read_csv(file_path)
-    df_model['timestamp'] = pd.to_datetime(df_model['timestamp'])
+    df_model = read_table(file_path)
     return df_model
 
 def read_observed_data(file_path):
     """Lê os dados Modelados do arquivo CSV."""
-    df_observed = pd.read_csv(file_path)
-    df_observed['timestamp'] = pd.to_datetime(df_observed['timestamp'])
+    df_observed = read_table(file_path)
     return df_observed
 
 def plot_data(df_observed, df_model, station_name):
@@ -58,36 +58,12 @@ def plot_adjusted_data(df_observed, df_model, station_name):
     plt.grid(True)
     plt.show()
 
-def calculate_statistics_barron(modeled, observed, description="Original"):
-    """Calcula e exibe estatísticas entre dados Modelados TPXO e Modelados HYCOM usando o skill de Barron."""
-    
-    # Cálculo das métricas
-    rmse = np.sqrt(mean_squared_error(modeled, observed))
-    mae = mean_absolute_error(modeled, observed)
-    r, _ = pearsonr(modeled, observed)
-    d = 1 - (np.sum((modeled - observed) ** 2) / np.sum((np.abs(observed - np.mean(modeled)) + np.abs(modeled - np.mean(modeled))) ** 2))
-    
-    # Cálculo do "range médio do dado" conforme Barron et al. (2004)
-    range_medio_barron = (2 / len(modeled)) * np.sum(np.abs(modeled - np.mean(modeled)))
-    
-    # Skill Score de Barron
-    skill_barron = 1 - (rmse / range_medio_barron)
-    
-    # Exibição dos resultados
-    print(f"\nEstatísticas {description} - Skill de Barron:")
-    print(f"RMSE: {rmse:.4f}")
-    print(f"MAE: {mae:.4f}")
-    print(f"Coeficiente de Correlação de Pearson (r): {r:.4f}")
-    print(f"Índice de Willmott (d): {d:.4f}")
-    print(f"Skill de Barron: {skill_barron:.4f}")
-    
-    return skill_barron
-
 # Função principal adaptada para calcular o skill de Barron
 def main():
     model_file_path = 'tpxo_RIB.csv'     # Nome do arquivo com dados de previsão TPXO
     observed_file_path = 'nova_serie_interpolada_RIB.csv'   # Nome do arquivo com dados Modelados do HYCOM
     station_name = 'Ribamar - MA'         # Nome da estação por extenso
+    tolerance = '0s'                      # Diferença máxima entre timestamps pareados
     
     df_model = read_model_data(model_file_path)
     df_observed = read_observed_data(observed_file_path)
@@ -98,17 +74,18 @@ def main():
     # Cálculo e plotagem das séries ajustadas
     plot_adjusted_data(df_observed, df_model, station_name)
     
-    # Remover NaNs dos dados Modelados e modelados
-    df_observed = df_observed.dropna(subset=['Nivel_do_Mar'])
-    df_model = df_model.dropna(subset=['Nivel_do_Mar'])
-    
-    # Garantir que estamos comparando as séries corretamente alinhadas
-    modeled = df_model['Nivel_do_Mar'].values  # Agora, os dados do TPXO são a referência
-    observed = df_observed['Nivel_do_Mar'].values
+    # Parear referência e série avaliada pelo timestamp (NaNs removidos em cada série)
+    pares, contagens = align_series(df_model, df_observed, tolerance=tolerance)
+    print_alignment(contagens, station_name)
+    modeled = pares['reference'].values  # Agora, os dados do TPXO são a referência
+    observed = pares['model'].values
 
     # Calcular estatísticas com Skill de Barron
     calculate_statistics_barron(modeled, observed, "Original")
 
+    # Intervalos de confiança das métricas (bootstrap de blocos móveis)
+    print_bootstrap(block_bootstrap(modeled, observed, seed=0), "Original")
+
     # Calcular estatísticas para dados ajustados
     desvio_modelado = modeled - np.mean(modeled)
     desvio_observado = observed - np.mean(observed)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Tolerância padrão do pareamento: só timestamps idênticos
+DEFAULT_TOLERANCE = pd.Timedelta(0)
+
+# Colunas da tabela de pares
+PAIR_COLUMNS = ['timestamp', 'reference', 'model']
+
+
+# Função para extrair (timestamp, valor) sem NaN, em ordem de timestamp
+def valid_series(df, coluna):
+    dados = pd.DataFrame({'timestamp': pd.to_datetime(df['timestamp']).values,
+                          'valor': pd.to_numeric(df[coluna], errors='coerce').values})
+    dados = dados[np.isfinite(dados['valor'].values) & dados['timestamp'].notna().values]
+    return dados.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+# Função para parear referência e modelo pelo timestamp, com tolerância
+def align_series(df_reference, df_model, column='Nivel_do_Mar', model_column=None,
+                 tolerance=DEFAULT_TOLERANCE, direction='nearest'):
+    """Alinha as duas séries pelo timestamp (merge_asof sobre séries ordenadas, O(n log n)).
+
+    As amostras NaN são removidas de cada série antes do pareamento. Cada amostra
+    da referência recebe a amostra do modelo mais próxima (`direction`) a até
+    `tolerance` (Timedelta ou texto, ex.: '5min'); as que não têm par são descartadas.
+    Retorna (pares, contagens): DataFrame com as colunas PAIR_COLUMNS (timestamp da
+    referência) e dicionário com 'pareados', 'sem_par_referencia' e 'sem_par_modelo'.
+    """
+    referencia = valid_series(df_reference, column)
+    modelo = valid_series(df_model, model_column or column)
+    modelo['posicao_modelo'] = np.arange(len(modelo))
+
+    pares = pd.merge_asof(referencia, modelo, on='timestamp', suffixes=('_ref', '_mod'),
+                          tolerance=pd.Timedelta(tolerance), direction=direction)
+    pareado = pares['posicao_modelo'].notna().values
+    usados = np.unique(pares['posicao_modelo'].values[pareado])
+
+    contagens = {
+        'pareados': int(pareado.sum()),
+        'sem_par_referencia': int((~pareado).sum()),
+        'sem_par_modelo': int(len(modelo) - len(usados)),
+    }
+    pares = pd.DataFrame({'timestamp': pares['timestamp'].values[pareado],
+                          'reference': pares['valor_ref'].values[pareado],
+                          'model': pares['valor_mod'].values[pareado]})
+    return pares, contagens
+
+
+# Função para exibir o resultado do pareamento
+def print_alignment(contagens, description=''):
+    print(f"\nPareamento {description}: {contagens['pareados']} pares, "
+          f"{contagens['sem_par_referencia']} amostras da referência sem par, "
+          f"{contagens['sem_par_modelo']} amostras do modelo sem par")
@@ -0,0 +1,169 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+from filtros_mare import fill_short_gaps, regular_grid
+
+# Bandas de maré em ciclos por dia
+TIDAL_BANDS = {
+    'subtidal': (0.0, 0.7),
+    'diurnal': (0.8, 1.2),
+    'semidiurnal': (1.7, 2.2),
+    'terdiurnal': (2.7, 3.3),
+    'quarter_diurnal': (3.6, 4.4),
+}
+
+# Duração padrão dos segmentos de Welch e sobreposição. Com 15 dias a resolução é de 1/15 cpd e o
+# lóbulo principal da janela de Hann (±2 bins, ±0,13 cpd) de Q1 a K1 e de N2 a K2 fica dentro das
+# bandas, de modo que a variância de cada constituinte é integrada por inteiro na sua banda
+SEGMENT = '15D'
+OVERLAP = 0.5
+
+# Lacunas de até 10 min (ex.: amostras isoladas reprovadas no QC) são interpoladas; as maiores separam blocos
+MAX_GAP = '10min'
+
+# Segmentos transformados por vez (limita a memória dos lotes de FFT)
+_SEGMENTOS_POR_LOTE = 256
+
+
+# Função para calcular os espectros de Welch da referência, do modelo e o espectro cruzado, por blocos contíguos
+def welch_spectra(timestamps, reference, model, segment=SEGMENT, overlap=OVERLAP, window='hann', dt=None,
+                  max_gap=MAX_GAP):
+    """Espectros de Welch (densidade, unidade²/cpd) acumulados segmento a segmento.
+
+    As séries são colocadas em uma grade regular de passo `dt` (o intervalo mais
+    frequente, se omitido) e lacunas de até `max_gap` são interpoladas
+    linearmente. A grade é dividida nos blocos em que as duas séries estão
+    presentes, e cada bloco contribui com os seus segmentos de `segment` (sem
+    atravessar lacunas maiores). Se nenhum bloco tiver `segment` de dados, os
+    segmentos passam a ter a duração do maior bloco, com um aviso. Os segmentos
+    são transformados em lotes de tamanho fixo, sem uma FFT da série inteira;
+    para um único bloco sem lacunas,
+    o resultado coincide com scipy.signal.welch/csd (detrend 'constant').
+
+    Retorna um DataFrame com freq_cpd, psd_reference, psd_model, psd_error,
+    csd_real, csd_imag, coherence e phase_deg (fase do modelo em relação à
+    referência), com o número de segmentos em `attrs['segments']`.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]').view('i8')
+    x = np.asarray(reference, dtype=np.float64)
+    y = np.asarray(model, dtype=np.float64)
+    validos = ~np.isnat(ts.view('datetime64[ns]'))
+    ts, x, y = ts[validos], x[validos], y[validos]
+    # Grade regular; amostras fora da grade são ignoradas
+    grades, passo, _, _ = regular_grid(ts, [x, y], None if dt is None else pd.Timedelta(dt).value)
+    if grades is None:
+        raise ValueError("Série sem intervalos de amostragem válidos.")
+    grade_x, grade_y = grades
+    max_amostras = int(pd.Timedelta(max_gap).value // passo)
+    grade_x, grade_y = fill_short_gaps(grade_x, max_amostras), fill_short_gaps(grade_y, max_amostras)
+    presente = np.isfinite(grade_x) & np.isfinite(grade_y)
+    mudanca = np.flatnonzero(np.diff(np.r_[0, presente.astype(np.int8), 0]))
+    blocos = list(zip(mudanca[::2], mudanca[1::2]))
+    maior_bloco = max((fim - inicio for inicio, fim in blocos), default=0)
+    if maior_bloco < 2:
+        raise ValueError("Nenhum bloco contíguo de dados pareados.")
+
+    # Sem blocos do tamanho pedido, os segmentos encolhem para o maior bloco disponível
+    nperseg = int(pd.Timedelta(segment).value // passo)
+    if maior_bloco < nperseg:
+        nperseg = int(maior_bloco)
+        print(f"Aviso: nenhum bloco contíguo com {segment} de dados pareados; "
+              f"usando segmentos de {pd.Timedelta(nperseg * passo, unit='ns')} (maior bloco disponível).")
+    avanco = max(1, int(round(nperseg * (1 - overlap))))
+    janela = get_window(window, nperseg)
+    fs = 86400e9 / passo                              # amostras por dia
+    escala = 1.0 / (fs * np.sum(janela**2))
+
+    pxx = np.zeros(nperseg // 2 + 1)
+    pyy = np.zeros_like(pxx)
+    pxy = np.zeros_like(pxx, dtype=np.complex128)
+    n_segmentos = 0
+    for inicio, fim in blocos:
+        if fim - inicio < nperseg:
+            continue
+        janelas_x = np.lib.stride_tricks.sliding_window_view(grade_x[inicio:fim], nperseg)[::avanco]
+        janelas_y = np.lib.stride_tricks.sliding_window_view(grade_y[inicio:fim], nperseg)[::avanco]
+        for k in range(0, len(janelas_x), _SEGMENTOS_POR_LOTE):
+            lote_x = janelas_x[k:k + _SEGMENTOS_POR_LOTE]
+            lote_y = janelas_y[k:k + _SEGMENTOS_POR_LOTE]
+            fx = sp_fft.rfft((lote_x - lote_x.mean(axis=1, keepdims=True)) * janela, axis=1)
+            fy = sp_fft.rfft((lote_y - lote_y.mean(axis=1, keepdims=True)) * janela, axis=1)
+            pxx += np.einsum('ij,ij->j', fx, fx.conj()).real
+            pyy += np.einsum('ij,ij->j', fy, fy.conj()).real
+            pxy += np.einsum('ij,ij->j', fx.conj(), fy)
+            n_segmentos += len(lote_x)
+
+    # Densidade unilateral: as frequências internas recebem o dobro da potência
+    fator = np.full(len(pxx), 2.0 * escala / n_segmentos)
+    fator[0] /= 2
+    if nperseg % 2 == 0:
+        fator[-1] /= 2
+    pxx, pyy, pxy = pxx * fator, pyy * fator, pxy * fator
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coerencia = np.abs(pxy)**2 / (pxx * pyy)
+    espectro = pd.DataFrame({
+        'freq_cpd': sp_fft.rfftfreq(nperseg, d=1.0 / fs),
+        'psd_reference': pxx,
+        'psd_model': pyy,
+        'psd_error': pxx + pyy - 2 * pxy.real,
+        'csd_real': pxy.real,
+        'csd_imag': pxy.imag,
+        'coherence': coerencia,
+        'phase_deg': np.degrees(np.angle(pxy)),
+    })
+    espectro.attrs['segments'] = n_segmentos
+    espectro.attrs['segment'] = pd.Timedelta(nperseg * passo, unit='ns')
+    return espectro
+
+
+# Função para integrar os espectros em cada banda de maré
+def band_skill(espectro, bands=TIDAL_BANDS):
+    """Uma linha por banda: variâncias, RMSE do erro na banda, correlação e skill.
+
+    skill = 1 - variância do erro / variância da referência na banda;
+    r = ∫Re(Pxy) / sqrt(∫Pxx ∫Pyy); amplitude_ratio = sqrt(∫Pyy / ∫Pxx).
+    """
+    freq = espectro['freq_cpd'].to_numpy()
+    df = freq[1] - freq[0] if len(freq) > 1 else 1.0
+    linhas = []
+    for banda, (f_min, f_max) in bands.items():
+        selecao = (freq >= f_min) & (freq <= f_max)
+        var_ref = espectro['psd_reference'][selecao].sum() * df
+        var_mod = espectro['psd_model'][selecao].sum() * df
+        var_erro = espectro['psd_error'][selecao].sum() * df
+        cruzado = espectro['csd_real'][selecao].sum() * df
+        with np.errstate(invalid='ignore', divide='ignore'):
+            linhas.append({
+                'band': banda, 'freq_min_cpd': f_min, 'freq_max_cpd': f_max,
+                'var_reference': var_ref, 'var_model': var_mod, 'rmse_band': np.sqrt(max(var_erro, 0.0)),
+                'r_band': cruzado / np.sqrt(var_ref * var_mod),
+                'amplitude_ratio': np.sqrt(var_mod / var_ref),
+                'coherence_mean': espectro['coherence'][selecao].mean(),
+                'skill': 1 - var_erro / var_ref,
+            })
+    return pd.DataFrame(linhas)
+
+
+# Função para plotar os espectros e a coerência
+def plot_spectra(espectro, station_name, bands=TIDAL_BANDS):
+    fig, (eixo_psd, eixo_coer) = plt.subplots(2, 1, figsize=(14, 9), sharex=True)
+    freq = espectro['freq_cpd'][1:]
+    eixo_psd.loglog(freq, espectro['psd_reference'][1:], label='Observado (Referência)', color='blue', linewidth=1)
+    eixo_psd.loglog(freq, espectro['psd_model'][1:], label='HYCOM', color='orange', linewidth=1)
+    eixo_psd.loglog(freq, espectro['psd_error'][1:], label='Erro (HYCOM - Observado)', color='red', linewidth=1)
+    eixo_psd.set_ylabel('Densidade espectral (cm²/cpd)')
+    eixo_psd.legend()
+    eixo_psd.grid(True, which='both', alpha=0.3)
+    eixo_coer.semilogx(freq, espectro['coherence'][1:], color='black', linewidth=1)
+    eixo_coer.set_ylabel('Coerência')
+    eixo_coer.set_xlabel('Frequência (ciclos por dia)')
+    eixo_coer.grid(True, which='both', alpha=0.3)
+    for f_min, f_max in bands.values():
+        for eixo in (eixo_psd, eixo_coer):
+            eixo.axvspan(max(f_min, freq.iloc[0]), f_max, color='gray', alpha=0.1)
+    fig.suptitle(f'Espectros de Welch e coerência - {station_name}')
+    plt.tight_layout()
+    plt.show()
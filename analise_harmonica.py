@@ -0,0 +1,276 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from formato_intermediario import read_table, write_table
+from quartod_engine import select_by_quality, QC_PASS
+
+# Constituintes: números de Doodson (tau, s, h, p, N', p') e fase adicional (graus)
+CONSTITUENTS = {
+    'M2': ((2, 0, 0, 0, 0, 0), 0),
+    'S2': ((2, 2, -2, 0, 0, 0), 0),
+    'N2': ((2, -1, 0, 1, 0, 0), 0),
+    'K2': ((2, 2, 0, 0, 0, 0), 0),
+    'K1': ((1, 1, 0, 0, 0, 0), 90),
+    'O1': ((1, -1, 0, 0, 0, 0), -90),
+    'P1': ((1, 1, -2, 0, 0, 0), -90),
+    'Q1': ((1, -2, 0, 1, 0, 0), -90),
+    'M4': ((4, 0, 0, 0, 0, 0), 0),
+    'MS4': ((4, 2, -2, 0, 0, 0), 0),
+    'MN4': ((4, -1, 0, 1, 0, 0), 0),
+    'Mf': ((0, 2, 0, 0, 0, 0), 0),
+    'Mm': ((0, 1, 0, -1, 0, 0), 0),
+}
+
+# Ordem de prioridade usada quando o critério de Rayleigh exige descartar constituintes
+DEFAULT_CONSTITUENTS = ('M2', 'S2', 'K1', 'O1', 'N2', 'K2', 'P1', 'Q1', 'M4', 'MS4', 'MN4', 'Mf', 'Mm')
+
+# Colunas da tabela de constantes harmônicas ('Z0' guarda o nível médio)
+CONSTANT_COLUMNS = ['series', 'constituent', 'amplitude', 'phase']
+
+# Longitudes médias (graus) em J2000.0 e taxas (graus por século juliano): s, h, p, N, p'
+_LONGITUDES = np.array([[218.3164, 481267.8812],
+                        [280.4661, 36000.7698],
+                        [83.3535, 4069.0137],
+                        [125.0445, -1934.1363],
+                        [282.9384, 1.7195]])
+_J2000 = np.datetime64('2000-01-01T12:00:00', 'ns')
+_NS_POR_SECULO = 36525 * 86400 * 10**9
+
+# Matrizes de projeto já montadas, por (eixo de tempo, constituintes), limitadas pelo total de bytes
+# (um ano de dados de 1 min com 13 constituintes ocupa cerca de 110 MB)
+_MATRIZES = {}
+_MAX_BYTES_MATRIZES = 256 * 2**20
+_LINHAS_POR_BLOCO = 2**20
+
+
+# Função para calcular as longitudes astronômicas (graus) em cada instante
+def astronomical_arguments(timestamps):
+    """Retorna (tau, s, h, p, N, p') em graus; tau é o tempo lunar médio em Greenwich."""
+    ns = (np.asarray(timestamps, dtype='datetime64[ns]') - _J2000).astype(np.int64)
+    seculos = ns / _NS_POR_SECULO
+    s, h, p, n, pp = (_LONGITUDES[:, 0][:, None] + _LONGITUDES[:, 1][:, None] * seculos[None, :])
+    horas_ut = (ns % (86400 * 10**9)) / 3.6e12 + 12.0     # J2000 é meio-dia
+    tau = 15.0 * horas_ut + 180.0 + h - s
+    return tau, s, h, p, n, pp
+
+
+# Função para calcular as correções nodais f e u (graus) de Pugh (1987) para a longitude do nodo N
+def nodal_corrections(n, constituintes=DEFAULT_CONSTITUENTS):
+    """Retorna {constituinte: (f, u)}; os senos e cossenos de N são calculados uma única vez."""
+    n = np.radians(n)
+    c1, c2, c3 = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    s1, s2, s3 = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+    um, zero = np.ones_like(n), np.zeros_like(n)
+    f_m2, u_m2 = 1.0004 - 0.0373 * c1 + 0.0002 * c2, -2.14 * s1
+    f_o1, u_o1 = 1.0089 + 0.1871 * c1 - 0.0147 * c2 + 0.0014 * c3, 10.80 * s1 - 1.34 * s2 + 0.19 * s3
+    correcoes = {
+        'M2': (f_m2, u_m2), 'N2': (f_m2, u_m2), 'MS4': (f_m2, u_m2),
+        'M4': (f_m2**2, 2 * u_m2), 'MN4': (f_m2**2, 2 * u_m2),
+        'S2': (um, zero), 'P1': (um, zero),
+        'K2': (1.0241 + 0.2863 * c1 + 0.0083 * c2 - 0.0015 * c3, -17.74 * s1 + 0.68 * s2 - 0.04 * s3),
+        'K1': (1.0060 + 0.1150 * c1 - 0.0088 * c2 + 0.0006 * c3, -8.86 * s1 + 0.68 * s2 - 0.07 * s3),
+        'O1': (f_o1, u_o1), 'Q1': (f_o1, u_o1),
+        'Mf': (1.043 + 0.414 * c1, -23.7 * s1 + 2.7 * s2 - 0.4 * s3),
+        'Mm': (1.0 - 0.130 * c1, zero),
+    }
+    return {c: correcoes[c] for c in constituintes}
+
+
+# Velocidade angular de cada constituinte (graus por hora)
+def constituent_speed(constituinte):
+    taxas = _LONGITUDES[:, 1] / (36525 * 24)                 # s, h, p, N, p' por hora
+    tau = 15.0 + taxas[1] - taxas[0]
+    doodson, _ = CONSTITUENTS[constituinte]
+    return float(np.dot(doodson, np.r_[tau, taxas[0], taxas[1], taxas[2], taxas[3], taxas[4]]))
+
+
+# Função para escolher os constituintes separáveis pela duração da série (critério de Rayleigh)
+def rayleigh_select(duracao_horas, constituintes=DEFAULT_CONSTITUENTS, rayleigh=1.0):
+    """Mantém, na ordem de prioridade, os constituintes separáveis de todos os já aceitos."""
+    aceitos = []
+    for c in constituintes:
+        if c not in CONSTITUENTS:
+            raise ValueError(f"Constituinte '{c}' desconhecido. Opções: {tuple(CONSTITUENTS)}")
+        velocidade = constituent_speed(c)
+        if velocidade > 0 and duracao_horas * velocidade / 360.0 < rayleigh:
+            continue
+        if all(duracao_horas * abs(velocidade - constituent_speed(a)) / 360.0 >= rayleigh for a in aceitos):
+            aceitos.append(c)
+    return tuple(aceitos)
+
+
+def _chave_tempo(ts):
+    return hashlib.blake2b(np.ascontiguousarray(ts).view('i8').tobytes(), digest_size=16).hexdigest()
+
+
+# Função para montar (e guardar) a matriz de projeto [1, f cos(V+u), f sin(V+u), ...]
+def design_matrix(timestamps, constituintes, guardar=True):
+    """Matriz n x (1 + 2k) com correções nodais calculadas em cada instante.
+
+    Com `guardar=True` a matriz fica em cache por (eixo de tempo, constituintes),
+    e novas análises sobre o mesmo eixo não a recalculam. O cache guarda no
+    máximo _MAX_BYTES_MATRIZES (as matrizes mais antigas saem primeiro); matrizes
+    maiores que esse limite não são guardadas.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    chave = (_chave_tempo(ts), tuple(constituintes)) if guardar else None
+    if chave in _MATRIZES:
+        return _MATRIZES[chave]
+
+    matriz = np.empty((len(ts), 1 + 2 * len(constituintes)))
+    matriz[:, 0] = 1.0
+    for inicio in range(0, len(ts), _LINHAS_POR_BLOCO):
+        bloco = slice(inicio, inicio + _LINHAS_POR_BLOCO)
+        argumentos = astronomical_arguments(ts[bloco])
+        correcoes = nodal_corrections(argumentos[4], constituintes)
+        for j, c in enumerate(constituintes):
+            doodson, fase = CONSTITUENTS[c]
+            v = fase + sum(d * a for d, a in zip(doodson, argumentos) if d)
+            f, u = correcoes[c]
+            angulo = np.radians(v + u)
+            matriz[bloco, 1 + 2 * j] = f * np.cos(angulo)
+            matriz[bloco, 2 + 2 * j] = f * np.sin(angulo)
+
+    if not guardar or matriz.nbytes > _MAX_BYTES_MATRIZES:
+        return matriz
+    while _MATRIZES and sum(m.nbytes for m in _MATRIZES.values()) + matriz.nbytes > _MAX_BYTES_MATRIZES:
+        _MATRIZES.pop(next(iter(_MATRIZES)))
+    _MATRIZES[chave] = matriz
+    return matriz
+
+
+def _tabela_constantes(nomes, constituintes, coeficientes):
+    a, b = coeficientes[1::2], coeficientes[2::2]
+    amplitude = np.hypot(a, b)
+    fase = np.degrees(np.arctan2(b, a)) % 360.0
+    linhas = []
+    for i, nome in enumerate(nomes):
+        linhas.append((nome, 'Z0', coeficientes[0, i], 0.0))
+        linhas.extend((nome, c, amplitude[j, i], fase[j, i]) for j, c in enumerate(constituintes))
+    return pd.DataFrame(linhas, columns=CONSTANT_COLUMNS)
+
+
+# Função principal da análise: várias séries com o mesmo eixo de tempo em uma única solução
+def harmonic_analysis(timestamps, series, constituintes=None, rayleigh=1.0):
+    """Ajusta nível médio e constituintes por mínimos quadrados.
+
+    `series` é um array (n,), uma matriz (n, m) ou um DataFrame (uma coluna por
+    série, ex.: observado, HYCOM, TPXO de várias estações). As séries sem falhas
+    são resolvidas juntas; séries com NaN são agrupadas por padrão de falhas.
+    Fases em graus (defasagem de Greenwich no fuso dos timestamps).
+    Retorna a tabela de constantes (colunas CONSTANT_COLUMNS).
+    """
+    if isinstance(series, pd.DataFrame):
+        nomes, y = list(series.columns), series.to_numpy(dtype=np.float64)
+    else:
+        y = np.asarray(series, dtype=np.float64)
+        y = y[:, None] if y.ndim == 1 else y
+        nomes = list(range(y.shape[1]))
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+
+    validos_ts = ts[np.isfinite(y).any(axis=1)]
+    duracao = (validos_ts.max() - validos_ts.min()) / np.timedelta64(1, 'h') if len(validos_ts) else 0.0
+    pedidos = tuple(constituintes or DEFAULT_CONSTITUENTS)
+    constituintes = rayleigh_select(duracao, pedidos, rayleigh)
+    descartados = [c for c in pedidos if c not in constituintes]
+    if descartados:
+        print(f"Constituintes não separáveis em {duracao / 24:.1f} dias: {descartados}")
+    matriz = design_matrix(ts, constituintes)
+
+    coeficientes = np.full((matriz.shape[1], y.shape[1]), np.nan)
+    presentes = np.isfinite(y)
+    padroes, grupo = np.unique(presentes.T, axis=0, return_inverse=True)
+    for g, padrao in enumerate(padroes):
+        colunas = np.flatnonzero(grupo.ravel() == g)
+        if padrao.sum() < matriz.shape[1]:
+            print(f"Séries {[nomes[c] for c in colunas]}: poucas amostras para a análise harmônica")
+            continue
+        linhas = slice(None) if padrao.all() else padrao
+        coeficientes[:, colunas] = np.linalg.lstsq(matriz[linhas], y[linhas][:, colunas], rcond=None)[0]
+    return _tabela_constantes(nomes, constituintes, coeficientes)
+
+
+# Função para prever a maré a partir das constantes, para todas as séries de uma vez
+def predict_tide(timestamps, constantes):
+    """Retorna um DataFrame (timestamp + uma coluna por série) com a maré prevista.
+
+    A série é montada em blocos: um produto matriz x coeficientes por bloco para
+    todas as séries, sem guardar as matrizes em cache.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    nomes = list(dict.fromkeys(constantes['series']))
+    constituintes = [c for c in dict.fromkeys(constantes['constituent']) if c != 'Z0']
+
+    tabela = constantes.set_index(['series', 'constituent'])
+    coeficientes = np.zeros((1 + 2 * len(constituintes), len(nomes)))
+    for i, nome in enumerate(nomes):
+        coeficientes[0, i] = tabela.loc[(nome, 'Z0'), 'amplitude'] if (nome, 'Z0') in tabela.index else 0.0
+        for j, c in enumerate(constituintes):
+            if (nome, c) in tabela.index:
+                amplitude, fase = tabela.loc[(nome, c), ['amplitude', 'phase']]
+                coeficientes[1 + 2 * j, i] = amplitude * np.cos(np.radians(fase))
+                coeficientes[2 + 2 * j, i] = amplitude * np.sin(np.radians(fase))
+
+    previsto = np.empty((len(ts), len(nomes)))
+    for inicio in range(0, len(ts), _LINHAS_POR_BLOCO):
+        bloco = slice(inicio, inicio + _LINHAS_POR_BLOCO)
+        previsto[bloco] = design_matrix(ts[bloco], constituintes, guardar=False) @ coeficientes
+    resultado = pd.DataFrame(previsto, columns=nomes)
+    resultado.insert(0, 'timestamp', ts)
+    return resultado
+
+
+# Função para comparar as constantes de um modelo com as da referência (observado)
+def compare_constituents(constantes, referencia, modelo):
+    """Diferenças por constituinte entre as séries `modelo` e `referencia` da tabela de constantes.
+
+    Amplitude (modelo - referência), fase (modelo - referência, em (-180, 180]) e
+    diferença vetorial |A_m e^{i g_m} - A_r e^{i g_r}|.
+    """
+    tabela = constantes[constantes['constituent'] != 'Z0']
+    ref = tabela[tabela['series'] == referencia].set_index('constituent')
+    mod = tabela[tabela['series'] == modelo].set_index('constituent')
+    comuns = [c for c in ref.index if c in mod.index]
+    ref, mod = ref.loc[comuns], mod.loc[comuns]
+
+    dif_fase = (mod['phase'] - ref['phase'] + 180.0) % 360.0 - 180.0
+    vetorial = np.abs(mod['amplitude'] * np.exp(1j * np.radians(mod['phase']))
+                      - ref['amplitude'] * np.exp(1j * np.radians(ref['phase'])))
+    return pd.DataFrame({
+        'constituent': comuns,
+        'amplitude_ref': ref['amplitude'].values,
+        'amplitude_model': mod['amplitude'].values,
+        'amplitude_diff': (mod['amplitude'] - ref['amplitude']).values,
+        'phase_ref': ref['phase'].values,
+        'phase_model': mod['phase'].values,
+        'phase_diff': dif_fase.values,
+        'vector_diff': vetorial.values,
+    })
+
+
+def main():
+    # Séries horárias da estação: observado (referência), HYCOM e TPXO
+    arquivos = {
+        'observado': ('dados_qualidade_RIB.csv', 'water_l1'),
+        'hycom': ('hycom_RIB.csv', 'Nivel_do_Mar'),
+        'tpxo': ('tpxo_RIB.csv', 'Nivel_do_Mar'),
+    }
+    series = []
+    for nome, (arquivo, coluna) in arquivos.items():
+        df = select_by_quality(read_table(arquivo), max_code=QC_PASS)  # Só amostras aprovadas no QC
+        series.append(df.set_index('timestamp')[coluna].rename(nome))
+    # Eixo de tempo comum (horário): uma única matriz de projeto e uma única solução para as três séries
+    dados = pd.concat([s.resample('1h').mean() for s in series], axis=1)
+
+    constantes = harmonic_analysis(dados.index, dados)
+    write_table(constantes, 'constantes_harmonicas_RIB.csv', metadata={'stage': 'analise_harmonica'})
+    for modelo in ('hycom', 'tpxo'):
+        comparacao = compare_constituents(constantes, 'observado', modelo)
+        print(f"\nConstituintes: {modelo} - observado")
+        print(comparacao.round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
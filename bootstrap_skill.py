@@ -0,0 +1,180 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.signal import fftconvolve
+
+from metricas import SKILL_METRICS, compute_statistics_barron
+
+# Número padrão de reamostragens e nível de confiança
+N_RESAMPLES = 1000
+CONFIDENCE = 0.95
+
+# Máximo de somas de blocos mantidas em memória por vez
+MAX_ELEMENTS = 2**24
+
+# Séries e blocos compartilhados com os processos (copiados uma vez por processo)
+_DADOS = {}
+
+
+# Função para estimar o comprimento dos blocos: defasagem em que a autocorrelação do erro cai abaixo de 1/e
+def block_length(reference, model):
+    """Comprimento de bloco (amostras) para preservar a autocorrelação do erro modelo - referência.
+
+    Usa a primeira defasagem com autocorrelação < 1/e (calculada por FFT), com
+    mínimo de n^(1/3) amostras e máximo de n/10.
+    """
+    erro = np.asarray(model, dtype=np.float64) - np.asarray(reference, dtype=np.float64)
+    n = len(erro)
+    minimo = max(1, int(round(n ** (1 / 3))))
+    if n < 3:
+        return minimo
+    erro = erro - erro.mean()
+    autocorrelacao = fftconvolve(erro, erro[::-1], mode='full')[n - 1:]
+    if autocorrelacao[0] <= 0:
+        return minimo
+    abaixo = np.flatnonzero(autocorrelacao / autocorrelacao[0] < np.exp(-1))
+    defasagem = int(abaixo[0]) if len(abaixo) else n
+    return int(min(max(defasagem, minimo), max(minimo, n // 10)))
+
+
+# Colunas das somas prefixadas (x = referência e y = modelo, ambos menos a média da referência)
+_SOMAS = ('x', 'y', 'xx', 'yy', 'xy', 'ee', 'abs_e', 'sx_x', 'sx', 'p_xy', 'p_x_y', 'p')
+
+
+# Função para montar as somas prefixadas das estatísticas aditivas de cada amostra
+def _somas_prefixadas(x, y, proxima, centro):
+    """Somas acumuladas (len(_SOMAS), n + 1).
+
+    Amostras "distantes" (x e y fora da faixa de centros possíveis, em torno de
+    `centro`) têm o sinal de x - c e y - c fixo em todas as reamostragens, de modo que |x - c| e
+    |(x - c)(y - c)| se escrevem como somas aditivas; as amostras `proxima` ficam
+    fora dessas somas e são avaliadas uma a uma.
+    """
+    e = y - x
+    sx = np.where(proxima, 0.0, np.sign(x - centro))
+    p = sx * np.where(proxima, 0.0, np.sign(y - centro))
+    colunas = (x, y, x * x, y * y, x * y, e * e, np.abs(e), sx * x, sx, p * x * y, p * (x + y), p)
+    somas = np.zeros((len(colunas), len(x) + 1))
+    np.cumsum(np.vstack(colunas), axis=1, out=somas[:, 1:])
+    return somas
+
+
+# Intervalos [início, fim) dos blocos de cada reamostragem; o último bloco é cortado para totalizar n
+def _fins(inicios, comprimento, n):
+    tamanhos = np.full(inicios.shape[1], comprimento)
+    tamanhos[-1] = n - comprimento * (inicios.shape[1] - 1)
+    return inicios + tamanhos
+
+
+# Função executada em cada processo: métricas das reamostragens com os inícios de bloco dados
+def _avaliar_reamostragens(inicios, comprimento, max_elements=MAX_ELEMENTS):
+    x, y, somas, proximas = _DADOS['x'], _DADOS['y'], _DADOS['somas'], _DADOS['proximas']
+    n = len(x)
+    por_lote = max(1, max_elements // (len(_SOMAS) * inicios.shape[1]))
+    resultados = []
+    for i in range(0, len(inicios), por_lote):
+        lote_inicios = inicios[i:i + por_lote]
+        lote_fins = _fins(lote_inicios, comprimento, n)
+        total = dict(zip(_SOMAS, (somas[:, lote_fins] - somas[:, lote_inicios]).sum(axis=2)))
+        c = total['x'] / n
+
+        # Amostras próximas do centro contidas em cada bloco (com repetição), via busca binária
+        primeira = np.searchsorted(proximas, lote_inicios).ravel()
+        contagem = np.searchsorted(proximas, lote_fins).ravel() - primeira
+        linhas = np.repeat(np.repeat(np.arange(len(lote_inicios)), lote_inicios.shape[1]), contagem)
+        deslocamento = np.repeat(primeira - np.cumsum(np.r_[0, contagem[:-1]]), contagem)
+        amostras = proximas[deslocamento + np.arange(contagem.sum())]
+        dx, dy = x[amostras] - c[linhas], y[amostras] - c[linhas]
+        desvio_proximas = np.bincount(linhas, np.abs(dx), minlength=len(lote_inicios))
+        cruzado_proximas = np.bincount(linhas, np.abs(dx * dy), minlength=len(lote_inicios))
+
+        media_y = total['y'] / n
+        sse = total['ee']
+        rmse = np.sqrt(sse / n)
+        cov = total['xy'] - n * c * media_y
+        var_x, var_y = total['xx'] - n * c * c, total['yy'] - n * media_y * media_y
+        desvio_ref = total['sx_x'] - c * total['sx'] + desvio_proximas
+        cruzado = total['p_xy'] - c * total['p_x_y'] + c * c * total['p'] + cruzado_proximas
+        willmott = (total['xx'] - 2 * c * total['x'] + total['yy'] - 2 * c * total['y'] + 2 * n * c * c
+                    + 2 * cruzado)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = cov / np.sqrt(var_x * var_y)
+            d = 1 - sse / willmott
+            skill_barron = 1 - rmse / (2 * desvio_ref / n)
+        resultados.append(np.column_stack((rmse, total['abs_e'] / n, media_y - c, r, d, skill_barron)))
+    return np.concatenate(resultados)
+
+
+def _iniciar_processo(dados):
+    _DADOS.update(dados)
+
+
+# Função principal: intervalos de confiança por bootstrap de blocos móveis
+def block_bootstrap(reference, model, n_resamples=N_RESAMPLES, block=None, confidence=CONFIDENCE,
+                    seed=None, max_workers=1, max_elements=MAX_ELEMENTS):
+    """Bootstrap de blocos móveis dos pares (referência, modelo) já alinhados.
+
+    Cada reamostragem junta ceil(n / block) blocos de `block` amostras
+    consecutivas (inícios sorteados) e é cortada em n amostras. As métricas de
+    `compute_statistics_barron` saem, em lote, da matriz de inícios
+    (reamostragens x blocos) e de somas prefixadas: cada bloco custa uma
+    subtração, e só as amostras cujo sinal em torno da média reamostrada pode
+    mudar são avaliadas uma a uma. Lotes de reamostragens limitam a memória a
+    cerca de `max_elements` valores. Os sorteios são feitos antes da divisão
+    entre processos, de modo que o resultado para uma `seed` não depende de
+    `max_workers`.
+    Retorna um DataFrame com metric, estimate, std, lower e upper.
+    """
+    ref = np.ascontiguousarray(reference, dtype=np.float64)
+    mod = np.ascontiguousarray(model, dtype=np.float64)
+    if ref.shape != mod.shape or ref.ndim != 1:
+        raise ValueError("Referência e modelo devem ser séries pareadas de mesmo tamanho.")
+    n = len(ref)
+    block = block or block_length(ref, mod)
+    if not 1 <= block <= n:
+        raise ValueError(f"Comprimento de bloco {block} inválido para {n} amostras.")
+
+    n_blocos = -(-n // block)
+    inicios = np.random.default_rng(seed).integers(0, n - block + 1, size=(n_resamples, n_blocos))
+    print(f"Bootstrap: {n_resamples} reamostragens, blocos de {block} amostras")
+
+    # Séries centradas na média da referência; a faixa dos centros (médias reamostradas) vem das somas de x
+    x, y = ref - ref.mean(), mod - ref.mean()
+    soma_x = np.r_[0.0, np.cumsum(x)]
+    fins = _fins(inicios, block, n)
+    centros = (soma_x[fins] - soma_x[inicios]).sum(axis=1) / n
+    folga = 1e-9 * (1 + np.abs(x).max())
+    c_min, c_max = centros.min() - folga, centros.max() + folga
+    proxima = ((x >= c_min) & (x <= c_max)) | ((y >= c_min) & (y <= c_max))
+    dados = {'x': x, 'y': y, 'somas': _somas_prefixadas(x, y, proxima, (c_min + c_max) / 2),
+             'proximas': np.flatnonzero(proxima)}
+
+    workers = max_workers or os.cpu_count()
+    if workers == 1:
+        _iniciar_processo(dados)
+        metricas = _avaliar_reamostragens(inicios, block, max_elements)
+    else:
+        partes = np.array_split(inicios, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_processo,
+                                 initargs=(dados,)) as executor:
+            metricas = np.concatenate(list(executor.map(_avaliar_reamostragens, partes,
+                                                        [block] * len(partes), [max_elements] * len(partes))))
+
+    estimativa = compute_statistics_barron(ref, mod)
+    alfa = (1 - confidence) / 2
+    return pd.DataFrame({
+        'metric': SKILL_METRICS,
+        'estimate': [estimativa[k] for k in SKILL_METRICS],
+        'std': np.nanstd(metricas, axis=0, ddof=1),
+        'lower': np.nanquantile(metricas, alfa, axis=0),
+        'upper': np.nanquantile(metricas, 1 - alfa, axis=0),
+    })
+
+
+# Função para exibir os intervalos de confiança
+def print_bootstrap(intervalos, description="Original", confidence=CONFIDENCE):
+    print(f"\nIntervalos de confiança de {confidence:.0%} ({description}) - bootstrap de blocos móveis:")
+    for linha in intervalos.itertuples(index=False):
+        print(f"{linha.metric}: {linha.estimate:.4f} [{linha.lower:.4f}, {linha.upper:.4f}]")
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from quartod_engine import run_quartod_tests, DEFAULT_PARAMS
+from ribamar_filtragem import filtrar_dados
+from interpola import create_new_series_with_timestamps, interpolate_model_levels
+from metricas import compute_statistics_barron
+from defasagem import lag_analysis, calendar_lag_analysis
+
+
+# Função para rodar, em memória, a cadeia QC -> filtro -> interpolação -> estatísticas
+def run_validation_chain(timestamps, water_l1, df_model, qc_params, std_dev, order=4, lag=False, lag_freq=None,
+                         max_workers=None):
+    """Valida uma série observada contra o HYCOM sem gravar arquivos intermediários.
+
+    `qc_params` deve trazer os limites do Gross Range ('user_min'/'user_max');
+    os demais parâmetros ausentes usam DEFAULT_PARAMS. Retorna um dicionário com
+    o número de linhas mantidas em cada etapa e as métricas de
+    `compute_statistics_barron` (observado filtrado como referência). Com
+    `lag=True`, inclui também a defasagem do modelo e as métricas corrigidas
+    (`defasagem.lag_analysis`). Com `lag_freq` (ex.: 'M'), a chave 'lag_calendar'
+    traz a defasagem por período (`defasagem.calendar_lag_analysis`).
+    `max_workers` vai para o filtro (`filtro_segmentos.filter_segments`); quem já
+    roda dentro de um pool de processos deve passar 1.
+    """
+    params = {**DEFAULT_PARAMS, **qc_params}
+
+    # Controle de qualidade
+    results = run_quartod_tests(timestamps, water_l1, std_dev, params)
+    passed = results['passed']
+    df_obs = pd.DataFrame({'water_l1': np.asarray(water_l1)[passed]},
+                          index=pd.DatetimeIndex(np.asarray(timestamps)[passed], name='timestamp'))
+
+    # Filtro Butterworth por frequência de amostragem
+    df_filtrado, _ = filtrar_dados(df_obs, order=order, plotar=False, max_workers=max_workers)
+    df_filtrado = df_filtrado.sort_index()
+
+    # Interpolação do HYCOM nos timestamps observados
+    df_observed = pd.DataFrame({'timestamp': df_filtrado.index,
+                                'Nivel_do_Mar': df_filtrado['water_l1_Filtrado'].values})
+    df_new_series = interpolate_model_levels(create_new_series_with_timestamps(df_observed), df_model)
+
+    # Estatísticas com o observado filtrado como referência, nos instantes cobertos pelo modelo
+    observado = df_observed['Nivel_do_Mar'].to_numpy(dtype=np.float64)
+    modelado = df_new_series['Nivel_do_Mar_Interpolado'].to_numpy(dtype=np.float64)
+    validos = np.isfinite(modelado)
+    stats = compute_statistics_barron(observado[validos], modelado[validos])
+    if lag:
+        stats.update(lag_analysis(df_observed['timestamp'], observado, modelado))
+    if lag_freq:
+        stats['lag_calendar'] = calendar_lag_analysis(df_observed['timestamp'], observado, modelado, freq=lag_freq)
+    return {'rows_qc': int(passed.sum()), 'rows_kept': len(df_filtrado), **stats}
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from formato_intermediario import read_table, write_table
+from alinhamento_series import DEFAULT_TOLERANCE, valid_series
+from metricas import SKILL_METRICS
+from quartod_engine import select_by_quality, QC_PASS
+
+
+# Função para ler a referência e os modelos (cada arquivo é lido uma única vez)
+def load_series(reference_file, model_files, max_qc_code=QC_PASS):
+    """`model_files` é um dicionário {nome do modelo: arquivo}; retorna (referência, {nome: DataFrame}).
+
+    A referência mantém só as amostras com código QUARTOD até `max_qc_code`.
+    """
+    referencia = select_by_quality(read_table(reference_file), max_code=max_qc_code)
+    return referencia, {nome: read_table(arquivo) for nome, arquivo in model_files.items()}
+
+
+# Função para alinhar todos os modelos, de uma vez, nos timestamps da referência
+def align_models(df_reference, models, column='Nivel_do_Mar', tolerance=DEFAULT_TOLERANCE, direction='nearest'):
+    """Tabela larga com 'timestamp', 'reference' e uma coluna por modelo.
+
+    Cada modelo é pareado com a referência por merge_asof (mesma regra de
+    alinhamento_series.align_series); amostras sem par ficam NaN na coluna do
+    modelo. `models` é um dicionário {nome: DataFrame com 'timestamp' e `column`}.
+    """
+    referencia = valid_series(df_reference, column)
+    tabela = pd.DataFrame({'timestamp': referencia['timestamp'].values, 'reference': referencia['valor'].values})
+    for nome, df_model in models.items():
+        pares = pd.merge_asof(referencia[['timestamp']], valid_series(df_model, column), on='timestamp',
+                              tolerance=pd.Timedelta(tolerance), direction=direction)
+        tabela[nome] = pares['valor'].values
+    return tabela
+
+
+# Função para calcular todas as métricas de todos os modelos em operações sobre a matriz (amostras x modelos)
+def model_metrics_matrix(reference, models):
+    """Tabela modelos x métricas (SKILL_METRICS e 'amostras').
+
+    `models` é uma matriz (n, m) ou DataFrame (uma coluna por modelo) pareada
+    com `reference`; cada modelo usa só as linhas em que ele e a referência são
+    finitos. As médias da referência são calculadas por modelo (primeira
+    passagem) e os desvios absolutos de Willmott e Barron em torno delas
+    (segunda passagem), como em metricas.compute_statistics_barron.
+    """
+    nomes = list(models.columns) if isinstance(models, pd.DataFrame) else list(range(np.shape(models)[1]))
+    y = np.asarray(models, dtype=np.float64)
+    x = np.asarray(reference, dtype=np.float64)[:, None]
+    validos = np.isfinite(y) & np.isfinite(x)
+    n = validos.sum(axis=0).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xv = np.where(validos, x, 0.0)
+        yv = np.where(validos, y, 0.0)
+        media_x, media_y = xv.sum(axis=0) / n, yv.sum(axis=0) / n
+        dx = np.where(validos, x - media_x, 0.0)
+        dy = np.where(validos, y - media_y, 0.0)
+        erro = np.where(validos, y - x, 0.0)
+
+        sse = np.einsum('ij,ij->j', erro, erro)
+        rmse = np.sqrt(sse / n)
+        mae = np.abs(erro).sum(axis=0) / n
+        r = np.einsum('ij,ij->j', dx, dy) / np.sqrt(np.einsum('ij,ij->j', dx, dx) * np.einsum('ij,ij->j', dy, dy))
+        desvio_x = np.abs(dx)
+        willmott = np.square(np.where(validos, np.abs(y - media_x), 0.0) + desvio_x).sum(axis=0)
+        d = 1 - sse / willmott
+        skill_barron = 1 - rmse / (2 * desvio_x.sum(axis=0) / n)
+
+    tabela = pd.DataFrame({'rmse': rmse, 'mae': mae, 'bias': media_y - media_x, 'r': r, 'd': d,
+                           'skill_barron': skill_barron, 'amostras': n.astype(np.int64)},
+                          index=pd.Index(nomes, name='model'))
+    return tabela[[*SKILL_METRICS, 'amostras']]
+
+
+# Função principal: compara todos os modelos de uma estação com a referência
+def compare_models(df_reference, models, station_name='', column='Nivel_do_Mar', tolerance=DEFAULT_TOLERANCE):
+    """Alinha os modelos nos timestamps da referência e retorna a tabela modelos x métricas."""
+    alinhados = align_models(df_reference, models, column=column, tolerance=tolerance)
+    tabela = model_metrics_matrix(alinhados['reference'], alinhados[list(models)])
+    tabela.insert(0, 'station', station_name)
+    print(f"\nComparação de modelos - {station_name} ({len(alinhados)} amostras da referência):")
+    print(tabela.drop(columns='station').round(4).to_string())
+    return tabela
+
+
+def main():
+    reference_file = 'dados_qualidade_RIB.csv'      # Dados observados (referência)
+    model_files = {
+        'HYCOM': 'nova_serie_interpolada_RIB.csv',  # HYCOM interpolado nos timestamps observados
+        'TPXO': 'tpxo_RIB.csv',                     # Previsão TPXO
+    }
+    station_name = 'Ribamar - MA'
+
+    df_reference, models = load_series(reference_file, model_files)
+    tabela = compare_models(df_reference, models, station_name)
+    write_table(tabela.reset_index(), 'comparacao_modelos_RIB.csv', metadata={'stage': 'comparacao_modelos',
+                                                                              'station': station_name})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import numpy as np
+import matplotlib.dates as mdates
+
+# Pontos desenhados por série na janela visível
+MAX_POINTS = 2000
+
+# Redução entre níveis da pirâmide; o nível mais grosso tem até PRESELECTION * MAX_POINTS pontos
+PYRAMID_FACTOR = 4
+PRESELECTION = 4
+
+
+# Função para escolher n_out pontos pelo Largest-Triangle-Three-Buckets (Steinarsson, 2013)
+def lttb_indices(x, y, n_out):
+    """Índices dos pontos escolhidos; o primeiro e o último são sempre mantidos."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 baldes entre o primeiro e o último ponto, e a média de cada balde
+    limites = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    tamanhos = np.diff(limites)
+    media_x = np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / tamanhos
+    media_y = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / tamanhos
+    media_x, media_y = np.r_[media_x[1:], x[-1]], np.r_[media_y[1:], y[-1]]
+
+    escolhidos = np.empty(n_out, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - media_x[i]) * (y[inicio:fim] - ay) - (ax - x[inicio:fim]) * (media_y[i] - ay))
+        a = inicio + int(np.argmax(area))
+        escolhidos[i + 1] = a
+    return escolhidos
+
+
+# Função para pré-selecionar, de forma vetorizada, o mínimo e o máximo de cada balde
+def minmax_indices(y, n_buckets):
+    """Índices (ordenados) do mínimo e do máximo de cada um dos `n_buckets` baldes, mais as pontas."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    tamanho = -(-n // n_buckets)
+    n_buckets = -(-n // tamanho)
+    completo = np.full(n_buckets * tamanho, np.nan)
+    completo[:n] = y
+    matriz = completo.reshape(n_buckets, tamanho)
+    base = np.arange(n_buckets) * tamanho
+    maximos = base + np.argmax(np.where(np.isnan(matriz), -np.inf, matriz), axis=1)
+    minimos = base + np.argmin(np.where(np.isnan(matriz), np.inf, matriz), axis=1)
+    return np.unique(np.r_[0, minimos, maximos, n - 1])
+
+
+# Função para montar a pirâmide de resoluções de uma série (nível 0 = dados completos)
+def build_pyramid(x, y, max_points=MAX_POINTS, factor=PYRAMID_FACTOR):
+    """Lista de níveis (x, y), cada um cerca de `factor` vezes menor que o anterior.
+
+    Os níveis vêm da pré-seleção mínimo/máximo por balde (MinMaxLTTB), que
+    preserva picos e vales; o LTTB exato é aplicado só aos pontos visíveis.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    ordem = np.argsort(x, kind='stable')
+    niveis = [(x[ordem], y[ordem])]
+    while len(niveis[-1][0]) > PRESELECTION * max_points:
+        nx, ny = niveis[-1]
+        indices = minmax_indices(ny, max(1, len(nx) // (2 * factor)))
+        niveis.append((nx[indices], ny[indices]))
+    return niveis
+
+
+# Função para obter os pontos a desenhar no intervalo [xmin, xmax]
+def visible_points(piramide, xmin, xmax, max_points=MAX_POINTS):
+    """Usa o nível mais fino com até PRESELECTION * max_points pontos visíveis e aplica o LTTB."""
+    for i, (nx, ny) in enumerate(piramide):
+        inicio = max(np.searchsorted(nx, xmin, side='left') - 1, 0)
+        fim = min(np.searchsorted(nx, xmax, side='right') + 1, len(nx))
+        if fim - inicio <= PRESELECTION * max_points or i == len(piramide) - 1:
+            break
+    x, y = nx[inicio:fim], ny[inicio:fim]
+    indices = lttb_indices(x, y, max_points)
+    return x[indices], y[indices]
+
+
+# Função para desenhar uma série decimada que se redecima ao aplicar zoom ou deslocar o gráfico
+def plot_decimated(ax, timestamps, values, kind='line', max_points=MAX_POINTS, **kwargs):
+    """Desenha a série em `ax` (datas no eixo x) com no máximo `max_points` pontos.
+
+    `kind` é 'line' (ax.plot) ou 'scatter' (ax.scatter); `kwargs` vão para a
+    função do matplotlib. A cada mudança dos limites do eixo x, os pontos da
+    janela visível são decimados de novo a partir da pirâmide. Retorna o artista.
+    """
+    x = mdates.date2num(np.asarray(timestamps, dtype='datetime64[ns]'))
+    piramide = build_pyramid(x, values, max_points)
+    px, py = visible_points(piramide, -np.inf, np.inf, max_points)
+    ax.xaxis_date()
+    if kind == 'scatter':
+        artista = ax.scatter(px, py, **kwargs)
+    elif kind == 'line':
+        artista, = ax.plot(px, py, **kwargs)
+    else:
+        raise ValueError(f"Tipo de gráfico '{kind}' desconhecido. Opções: ('line', 'scatter')")
+
+    def redecimar(eixo):
+        xmin, xmax = eixo.get_xlim()
+        nx, ny = visible_points(piramide, xmin, xmax, max_points)
+        if kind == 'scatter':
+            artista.set_offsets(np.column_stack((nx, ny)))
+        else:
+            artista.set_data(nx, ny)
+        eixo.figure.canvas.draw_idle()
+
+    ax.callbacks.connect('xlim_changed', redecimar)
+    return artista
@@ -0,0 +1,145 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from formato_intermediario import write_table
+
+# Nomes usuais das variáveis e coordenadas nas saídas do HYCOM
+SSH_NAMES = ('ssh', 'surf_el', 'sea_surface_height', 'zos')
+LAT_NAMES = ('lat', 'latitude', 'Latitude', 'nav_lat')
+LON_NAMES = ('lon', 'longitude', 'Longitude', 'nav_lon')
+TIME_NAMES = ('time', 'MT', 'Time')
+
+# Blocos de leitura ao longo do tempo e conversão de metros para centímetros (unidade das observações)
+TIME_CHUNK = 24 * 30
+ESCALA_CM = 100.0
+
+RAIO_TERRA_KM = 6371.0
+
+
+# Importação do xarray apenas quando a extração é usada
+def _xarray():
+    try:
+        import xarray
+    except ImportError as e:
+        raise ImportError("A extração do HYCOM requer os pacotes xarray, dask e netCDF4 "
+                          "(pip install xarray dask netCDF4).") from e
+    return xarray
+
+
+def _encontrar(nomes_disponiveis, candidatos, descricao):
+    for nome in candidatos:
+        if nome in nomes_disponiveis:
+            return nome
+    raise ValueError(f"Variável de {descricao} não encontrada; procurei {candidatos}.")
+
+
+# Função para abrir vários arquivos NetCDF do HYCOM como um único conjunto, sem carregar os dados
+def open_hycom(arquivos, time_chunk=TIME_CHUNK):
+    """Abre os arquivos (lista, padrão glob ou diretório) em blocos de `time_chunk` passos de tempo."""
+    xr = _xarray()
+    if isinstance(arquivos, str):
+        padrao = os.path.join(arquivos, '*.nc') if os.path.isdir(arquivos) else arquivos
+        arquivos = sorted(glob.glob(padrao))
+    if not arquivos:
+        raise FileNotFoundError("Nenhum arquivo NetCDF do HYCOM encontrado.")
+    print(f"Abrindo {len(arquivos)} arquivos NetCDF do HYCOM")
+    with xr.open_dataset(arquivos[0]) as primeiro:
+        tempo = _encontrar(primeiro.variables, TIME_NAMES, 'tempo')
+    return xr.open_mfdataset(arquivos, combine='by_coords', chunks={tempo: time_chunk},
+                             data_vars='minimal', coords='minimal', compat='override')
+
+
+def _cartesianas(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+# Função para localizar a célula molhada mais próxima de cada estação
+def nearest_wet_cells(ds, lats, lons, ssh_name=None):
+    """Busca, com uma KD-tree sobre a grade, a célula com dado mais próxima de cada estação.
+
+    Retorna (indices, distancias_km, coordenadas): `indices` é uma tupla de arrays
+    de índices (linha, coluna) da grade e `coordenadas` a tupla (lat, lon) das
+    células; células secas (NaN no primeiro passo de tempo) são ignoradas.
+    """
+    ssh = ds[ssh_name or _encontrar(ds.data_vars, SSH_NAMES, 'nível do mar')]
+    tempo = _encontrar(ssh.dims, TIME_NAMES, 'tempo')
+    nome_lat = _encontrar(ds.variables, LAT_NAMES, 'latitude')
+    nome_lon = _encontrar(ds.variables, LON_NAMES, 'longitude')
+    lat, lon = ds[nome_lat].values, ds[nome_lon].values
+    if lat.ndim == 1:
+        lat, lon = np.meshgrid(lat, lon, indexing='ij')
+
+    molhada = np.isfinite(ssh.isel({tempo: 0}).values)
+    if not molhada.any():
+        raise ValueError("Nenhuma célula molhada na grade do HYCOM.")
+    linhas, colunas = np.nonzero(molhada)
+    arvore = cKDTree(_cartesianas(lat[linhas, colunas], lon[linhas, colunas]))
+
+    corda, k = arvore.query(_cartesianas(np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)))
+    distancias = 2 * RAIO_TERRA_KM * np.arcsin(np.clip(corda / 2, 0, 1))
+    linhas, colunas = linhas[k], colunas[k]
+    return (linhas, colunas), distancias, (lat[linhas, colunas], lon[linhas, colunas])
+
+
+# Função principal: extrai as séries de nível do mar de todas as estações em uma passagem
+def extract_stations(arquivos, estacoes, output_pattern='hycom_{station}.csv', ssh_name=None,
+                     escala=ESCALA_CM, time_chunk=TIME_CHUNK):
+    """Extrai a série do HYCOM na célula molhada mais próxima de cada estação.
+
+    `estacoes` é um DataFrame (ou caminho de CSV) com as colunas 'station', 'lat'
+    e 'lon'. Cada série é gravada em `output_pattern` (CSV, Parquet ou Feather)
+    com as colunas 'timestamp' e 'Nivel_do_Mar' (em cm com `escala`=100), como
+    espera `interpola.read_data`. Retorna a tabela de estações com a célula
+    usada e a distância até ela.
+    """
+    xr = _xarray()
+    if isinstance(estacoes, str):
+        estacoes = pd.read_csv(estacoes)
+    estacoes = estacoes.reset_index(drop=True)
+
+    ds = open_hycom(arquivos, time_chunk=time_chunk)
+    ssh_name = ssh_name or _encontrar(ds.data_vars, SSH_NAMES, 'nível do mar')
+    ssh = ds[ssh_name]
+    tempo = _encontrar(ssh.dims, TIME_NAMES, 'tempo')
+    dim_lat, dim_lon = [d for d in ssh.dims if d != tempo][-2:]
+
+    (linhas, colunas), distancias, (lat_celula, lon_celula) = nearest_wet_cells(ds, estacoes['lat'], estacoes['lon'], ssh_name)
+
+    # Seleção pontual das células: uma única leitura (em blocos de tempo) de todas as estações
+    pontos = ssh.isel({dim_lat: xr.DataArray(linhas, dims='estacao'),
+                       dim_lon: xr.DataArray(colunas, dims='estacao')})
+    series = pontos.transpose('estacao', tempo).values * escala
+    timestamps = pd.to_datetime(ds[tempo].values)
+
+    resumo = estacoes[['station', 'lat', 'lon']].copy()
+    resumo['cell_lat'], resumo['cell_lon'], resumo['distance_km'] = lat_celula, lon_celula, distancias
+    arquivos_saida = []
+    for i, linha in resumo.iterrows():
+        output_file = output_pattern.format(station=linha['station'])
+        df_model = pd.DataFrame({'timestamp': timestamps, 'Nivel_do_Mar': series[i]})
+        write_table(df_model, output_file, metadata={
+            'stage': 'extracao_hycom', 'station': linha['station'], 'variable': ssh_name, 'escala': escala,
+            'cell_lat': float(linha['cell_lat']), 'cell_lon': float(linha['cell_lon']),
+            'distance_km': float(linha['distance_km']),
+        })
+        arquivos_saida.append(output_file)
+        print(f"Estação {linha['station']}: célula a {linha['distance_km']:.2f} km, série salva em {output_file}")
+    resumo['file'] = arquivos_saida
+    ds.close()
+    return resumo
+
+
+def main():
+    arquivos = 'hycom_chm/*.nc'                  # Arquivos diários/horários do HYCOM-CHM
+    estacoes = 'estacoes_coordenadas.csv'        # Colunas: station, lat, lon
+    resumo = extract_stations(arquivos, estacoes)
+    print(resumo.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks
+
+from formato_intermediario import read_table, write_table
+from filtros_mare import regular_grid
+
+# Separação mínima entre duas preamares (ou duas baixa-mares) e distância máxima para parear eventos
+MIN_SEPARATION = '8h'
+MATCH_TOLERANCE = '3h'
+
+# Colunas da tabela de eventos
+EVENT_COLUMNS = ['timestamp', 'height', 'type']
+
+
+# Refinamento parabólico (3 pontos) da posição e da altura de cada pico
+def _refinar(y, picos):
+    anterior, centro, seguinte = y[picos - 1], y[picos], y[picos + 1]
+    curvatura = anterior - 2 * centro + seguinte
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where(curvatura != 0, 0.5 * (anterior - seguinte) / curvatura, 0.0)
+    delta = np.clip(delta, -0.5, 0.5)
+    return delta, centro - 0.25 * (anterior - seguinte) * delta
+
+
+# Função para detectar preamares e baixa-mares de uma série
+def detect_extrema(timestamps, values, min_separation=MIN_SEPARATION, prominence=None):
+    """Preamares ('high') e baixa-mares ('low') com refinamento parabólico.
+
+    A série vai para uma grade regular (passo mais frequente) e cada trecho sem
+    lacunas é processado com scipy.signal.find_peaks; picos separados por menos
+    de `min_separation` são descartados (fica o maior). `prominence` padrão é
+    10% do desvio padrão da série. O instante e a altura de cada evento vêm da
+    parábola pelos três pontos em torno do pico, o que importa para séries
+    horárias como a do HYCOM. Retorna um DataFrame com EVENT_COLUMNS, em ordem
+    de timestamp.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]').view('i8')
+    x = np.asarray(values, dtype=np.float64)
+    validos = np.isfinite(x) & ~np.isnat(ts.view('datetime64[ns]'))
+    ts, x = ts[validos], x[validos]
+    if len(ts) < 3:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    ordem = np.argsort(ts, kind='stable')
+    ts, x = ts[ordem], x[ordem]
+    grades, passo, inicio_grade, _ = regular_grid(ts, [x])
+    if grades is None:
+        raise ValueError("Série sem intervalos de amostragem válidos.")
+    grade = grades[0]
+    distancia = max(1, int(pd.Timedelta(min_separation).value // passo))
+    prominence = 0.1 * np.nanstd(grade) if prominence is None else prominence
+
+    presente = np.isfinite(grade)
+    mudanca = np.flatnonzero(np.diff(np.r_[0, presente.astype(np.int8), 0]))
+    partes = []
+    for inicio, fim in zip(mudanca[::2], mudanca[1::2]):
+        trecho = grade[inicio:fim]
+        if len(trecho) < 3:
+            continue
+        for tipo, sinal in (('high', 1.0), ('low', -1.0)):
+            picos, _ = find_peaks(sinal * trecho, distance=distancia, prominence=prominence)
+            delta, altura = _refinar(sinal * trecho, picos)
+            instantes = inicio_grade + np.rint((inicio + picos + delta) * passo).astype(np.int64)
+            partes.append(pd.DataFrame({
+                'timestamp': instantes.view('datetime64[ns]'),
+                'height': sinal * altura,
+                'type': tipo,
+            }))
+    if not partes:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    eventos = pd.concat(partes, ignore_index=True)
+    return eventos.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+# Função para parear cada evento observado com o evento do modelo mais próximo, do mesmo tipo
+def match_events(observed_events, model_events, tolerance=MATCH_TOLERANCE):
+    """Busca binária nos instantes (ordenados) dos eventos do modelo.
+
+    Retorna uma linha por evento observado com o evento do modelo pareado (NaN
+    se não houver um a até `tolerance`), o erro de tempo (modelo - observado, em
+    minutos) e o erro de altura (modelo - observado).
+    """
+    tolerancia = pd.Timedelta(tolerance).value
+    partes = []
+    for tipo, observados in observed_events.groupby('type', sort=False):
+        modelo = model_events[model_events['type'] == tipo].sort_values('timestamp')
+        t_obs = observados['timestamp'].values.astype('datetime64[ns]').view('i8')
+        t_mod = modelo['timestamp'].values.astype('datetime64[ns]').view('i8')
+        h_mod = modelo['height'].to_numpy(dtype=np.float64)
+
+        if len(t_mod):
+            direita = np.minimum(np.searchsorted(t_mod, t_obs), len(t_mod) - 1)
+            esquerda = np.maximum(direita - 1, 0)
+            indice = np.where(np.abs(t_obs - t_mod[esquerda]) <= np.abs(t_mod[direita] - t_obs), esquerda, direita)
+            pareado = np.abs(t_mod[indice] - t_obs) <= tolerancia
+            t_par = np.where(pareado, t_mod[indice], np.iinfo(np.int64).min)
+            h_par = np.where(pareado, h_mod[indice], np.nan)
+        else:
+            t_par = np.full(len(t_obs), np.iinfo(np.int64).min)
+            h_par = np.full(len(t_obs), np.nan)
+            pareado = np.zeros(len(t_obs), dtype=bool)
+
+        partes.append(pd.DataFrame({
+            'type': tipo,
+            'timestamp_observed': observados['timestamp'].values,
+            'height_observed': observados['height'].to_numpy(dtype=np.float64),
+            'timestamp_model': t_par.view('datetime64[ns]'),
+            'height_model': h_par,
+            'timing_error_min': np.where(pareado, (t_par - t_obs) / 6e10, np.nan),
+        }))
+    colunas = ['type', 'timestamp_observed', 'height_observed', 'timestamp_model', 'height_model',
+               'timing_error_min']
+    pares = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=colunas)
+    pares['height_error'] = pares['height_model'] - pares['height_observed']
+    return pares.sort_values('timestamp_observed', kind='stable').reset_index(drop=True)
+
+
+# Função para resumir os erros de tempo e de altura por tipo de evento
+def event_statistics(pares):
+    linhas = []
+    for tipo, grupo in pares.groupby('type', sort=False):
+        tempo = grupo['timing_error_min'].dropna().to_numpy()
+        altura = grupo['height_error'].dropna().to_numpy()
+        linhas.append({
+            'type': tipo, 'events_observed': len(grupo), 'events_matched': len(tempo),
+            'timing_mean_min': tempo.mean() if len(tempo) else np.nan,
+            'timing_std_min': tempo.std(ddof=1) if len(tempo) > 1 else np.nan,
+            'timing_mae_min': np.abs(tempo).mean() if len(tempo) else np.nan,
+            'height_bias': altura.mean() if len(altura) else np.nan,
+            'height_std': altura.std(ddof=1) if len(altura) > 1 else np.nan,
+            'height_rmse': np.sqrt(np.mean(altura**2)) if len(altura) else np.nan,
+        })
+    return pd.DataFrame(linhas)
+
+
+# Função principal: detecta, pareia e resume preamares e baixa-mares de uma estação
+def compare_extrema(df_observed, df_model, station_name='', observed_column='water_l1_Filtrado',
+                    model_column='Nivel_do_Mar', tolerance=MATCH_TOLERANCE):
+    """Retorna (pares, estatisticas) para a série observada filtrada e a série do HYCOM."""
+    eventos_obs = detect_extrema(df_observed['timestamp'], df_observed[observed_column])
+    eventos_mod = detect_extrema(df_model['timestamp'], df_model[model_column])
+    pares = match_events(eventos_obs, eventos_mod, tolerance=tolerance)
+    estatisticas = event_statistics(pares)
+    estatisticas.insert(0, 'station', station_name)
+    print(f"\nPreamares e baixa-mares - {station_name}: {len(eventos_obs)} eventos observados, "
+          f"{len(eventos_mod)} no modelo")
+    print(estatisticas.drop(columns='station').round(2).to_string(index=False))
+    return pares, estatisticas
+
+
+def main():
+    observed_file = 'dados_qualidade_RIB_filtrados.csv'   # Saída de ribamar_filtragem.processar_dados
+    model_file = 'hycom_RIB.csv'                          # Série do HYCOM
+    station_name = 'Ribamar - MA'
+
+    pares, estatisticas = compare_extrema(read_table(observed_file), read_table(model_file), station_name)
+    write_table(pares, 'extremos_mare_RIB.csv', metadata={'stage': 'extremos_mare', 'station': station_name})
+
+
+if __name__ == "__main__":
+    main()
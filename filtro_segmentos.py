@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, sosfiltfilt
+
+from separar_frequencias import tabela_blocos
+
+# Intervalos de amostragem filtrados por padrão (1 min, 10 min, 15 min), em segundos
+FILTER_INTERVALS = (60, 600, 900)
+
+# Frequência de corte como fração da taxa de amostragem (critério original de aplicar_filtro)
+CUTOFF_RATIO = 0.1
+
+# Tamanho mínimo da série para distribuir os blocos entre processos
+_MIN_AMOSTRAS_PARALELO = 2**20
+_LOTES_POR_PROCESSO = 4
+
+
+# Função para obter (e guardar) os coeficientes do filtro Butterworth em seções de segunda ordem
+@lru_cache(maxsize=None)
+def butterworth_sos(sample_rate, order=4, cutoff_freq=None):
+    """Coeficientes SOS do passa-baixa, calculados uma vez por (taxa, ordem, corte)."""
+    if not isinstance(order, int) or order <= 0:
+        raise ValueError("A ordem do filtro deve ser um número inteiro positivo.")
+
+    nyquist = 0.5 * sample_rate
+    if cutoff_freq is None:
+        cutoff_freq = CUTOFF_RATIO * sample_rate
+    if cutoff_freq >= nyquist:
+        raise ValueError(f"Frequência de corte {cutoff_freq} inválida para a taxa de amostragem {sample_rate}.")
+
+    return butter(order, cutoff_freq / nyquist, btype='low', analog=False, output='sos')
+
+
+# Comprimento mínimo de um bloco para o filtro de fase zero (mesmo padlen do sosfiltfilt)
+def min_block_length(sos):
+    return 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())) + 1
+
+
+# Função para localizar os blocos contíguos com intervalo de amostragem constante
+def contiguous_blocks(timestamps, intervals=FILTER_INTERVALS):
+    """Retorna um DataFrame com um bloco por linha: intervalo_s, linha_inicio, linha_fim (inclusivo).
+
+    Um bloco é uma sequência de linhas consecutivas separadas exatamente por um
+    dos `intervals`. Os limites dos blocos são os de `separar_frequencias.tabela_blocos`
+    (a linha de transição inicia o novo bloco), com a classe de cada intervalo
+    dada pelo seu valor exato em vez da faixa de tolerância. Lacunas encerram o
+    bloco, de modo que nenhum filtro atravessa uma lacuna.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    diffs = np.diff(ts.view('i8')) / 1e9
+    classe_diff = np.full(len(diffs), np.nan)
+    for intervalo in intervals:
+        classe_diff[diffs == intervalo] = intervalo
+    # Classe de cada linha pelo intervalo desde a anterior (como 'amostragem' de separar_amostragem)
+    dados = pd.DataFrame({'DataHora': ts, 'diff': pd.to_timedelta(np.r_[np.nan, diffs][:len(ts)], unit='s'),
+                          'amostragem': np.r_[np.nan, classe_diff][:len(ts)]})
+    blocos = tabela_blocos(dados, invalida=np.nan)
+    blocos = blocos[blocos['amostragem'].notna()].reset_index(drop=True)
+    return pd.DataFrame({'intervalo_s': blocos['amostragem'].astype(np.float64),
+                         'linha_inicio': blocos['linha_inicio'].astype(np.int64),
+                         'linha_fim': blocos['linha_fim'].astype(np.int64),
+                         'amostras': blocos['amostras'].astype(np.int64)})
+
+
+# Função executada nos processos: filtra um lote de blocos com os mesmos coeficientes
+def _filtrar_lote(sos, segmentos):
+    return [sosfiltfilt(sos, x) for x in segmentos]
+
+
+# Função principal do motor: filtro de fase zero bloco a bloco
+def filter_segments(timestamps, values, intervals=FILTER_INTERVALS, order=4, max_workers=None):
+    """Filtra cada bloco contíguo separadamente com sosfiltfilt.
+
+    Retorna (posicoes, filtrado, blocos): posições (iloc) das amostras filtradas em
+    ordem de timestamp, os valores filtrados e a tabela de blocos com a coluna
+    'filtrado' (False para blocos curtos demais para o filtro, que são descartados).
+    Séries longas são divididas entre processos; `max_workers=1` força a execução serial.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    x = np.asarray(values, dtype=np.float64)
+    blocos = contiguous_blocks(ts, intervals)
+
+    # Coeficientes de cada bloco (taxa de amostragem em amostras por minuto, como em obter_sample_rate)
+    sos_blocos = [butterworth_sos(60.0 / intervalo, order) for intervalo in blocos['intervalo_s']]
+    blocos['filtrado'] = [n >= min_block_length(sos) for n, sos in zip(blocos['amostras'], sos_blocos)]
+
+    # Lotes de blocos com os mesmos coeficientes
+    tarefas = []
+    for intervalo, grupo in blocos[blocos['filtrado']].groupby('intervalo_s'):
+        sos = butterworth_sos(60.0 / intervalo, order)
+        tarefas.append((sos, list(grupo.index),
+                        [x[i:f + 1] for i, f in zip(grupo['linha_inicio'], grupo['linha_fim'])]))
+
+    total = int(blocos.loc[blocos['filtrado'], 'amostras'].sum())
+    paralelo = max_workers != 1 and total >= _MIN_AMOSTRAS_PARALELO and len(blocos) > 1
+    resultados = {}
+    if paralelo:
+        n_lotes = (max_workers or os.cpu_count()) * _LOTES_POR_PROCESSO
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = []
+            for sos, indices, segmentos in tarefas:
+                passo = max(1, -(-len(segmentos) // n_lotes))
+                for k in range(0, len(segmentos), passo):
+                    futuros.append((indices[k:k + passo], executor.submit(_filtrar_lote, sos, segmentos[k:k + passo])))
+            for indices, futuro in futuros:
+                resultados.update(zip(indices, futuro.result()))
+    else:
+        for sos, indices, segmentos in tarefas:
+            resultados.update(zip(indices, _filtrar_lote(sos, segmentos)))
+
+    # Reunir os blocos na ordem dos timestamps
+    filtrados = blocos[blocos['filtrado']]
+    if len(filtrados) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64), blocos
+    posicoes = np.concatenate([np.arange(i, f + 1) for i, f in zip(filtrados['linha_inicio'], filtrados['linha_fim'])])
+    filtrado = np.concatenate([resultados[b] for b in filtrados.index])
+    ordem = np.argsort(ts[posicoes], kind='stable')
+    return posicoes[ordem], filtrado[ordem], blocos
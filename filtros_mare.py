@@ -0,0 +1,159 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import oaconvolve
+
+# Filtros de maré disponíveis (sinal submareal / meteorológico)
+TIDAL_FILTERS = ('godin', 'doodson', 'pl33')
+
+# Lacunas de até 1 h são preenchidas por interpolação linear antes do filtro
+MAX_LACUNA_S = 3600
+
+# Pesos do filtro de Doodson X0 para dados horários, defasagens de -19 h a +19 h (soma 30)
+_DOODSON = np.array([1, 0, 1, 0, 0, 1, 0, 1, 1, 0, 2, 0, 1, 1, 0, 2, 1, 1, 2, 0,
+                     2, 1, 1, 2, 0, 1, 1, 0, 2, 0, 1, 1, 0, 1, 0, 0, 1, 0, 1], dtype=np.float64)
+
+# Pesos do filtro PL33 (meia potência em 33 h) tabelados de -33 h a +33 h, passo de 1 h
+_PL33 = np.array([
+    -0.00027, -0.00114, -0.00211, -0.00317, -0.00427, -0.00537, -0.00641, -0.00735, -0.00811,
+    -0.00864, -0.00887, -0.00872, -0.00816, -0.00714, -0.00560, -0.00355, -0.00097, 0.00213,
+    0.00574, 0.00980, 0.01425, 0.01902, 0.02400, 0.02911, 0.03423, 0.03923, 0.04399, 0.04842,
+    0.05237, 0.05576, 0.05850, 0.06051, 0.06174, 0.06215, 0.06174, 0.06051, 0.05850, 0.05576,
+    0.05237, 0.04842, 0.04399, 0.03923, 0.03423, 0.02911, 0.02400, 0.01902, 0.01425, 0.00980,
+    0.00574, 0.00213, -0.00097, -0.00355, -0.00560, -0.00714, -0.00816, -0.00872, -0.00887,
+    -0.00864, -0.00811, -0.00735, -0.00641, -0.00537, -0.00427, -0.00317, -0.00211, -0.00114,
+    -0.00027])
+
+
+def _amostras_por_hora(dt):
+    passo = 3600.0 / dt
+    if not np.isclose(passo, round(passo)):
+        raise ValueError(f"O intervalo de amostragem de {dt} s não divide uma hora.")
+    return int(round(passo))
+
+
+# Função para montar (e guardar) o núcleo normalizado de um filtro para o intervalo dt (s)
+@lru_cache(maxsize=None)
+def tidal_kernel(metodo, dt):
+    """Núcleo simétrico, de comprimento ímpar e soma 1, para amostras espaçadas de `dt` segundos."""
+    por_hora = _amostras_por_hora(dt)
+    if metodo == 'godin':
+        # Médias móveis de 24 h, 24 h e 25 h em cascata; a última ganha uma amostra se
+        # necessário para manter o comprimento ímpar (filtro centrado)
+        n24, n25 = 24 * por_hora, 25 * por_hora
+        if (2 * n24 + n25 - 2) % 2 == 0:
+            n25 += 1
+        nucleo = np.convolve(np.convolve(np.ones(n24), np.ones(n24)), np.ones(n25))
+    elif metodo == 'doodson':
+        # Pesos horários com zeros entre as horas
+        nucleo = np.zeros(38 * por_hora + 1)
+        nucleo[::por_hora] = _DOODSON
+    elif metodo == 'pl33':
+        horas = np.arange(-33 * por_hora, 33 * por_hora + 1) / por_hora
+        nucleo = np.interp(horas, np.arange(-33, 34), _PL33)
+    else:
+        raise ValueError(f"Filtro '{metodo}' desconhecido. Opções: {TIDAL_FILTERS}")
+    return nucleo / nucleo.sum()
+
+
+# Função para obter o intervalo de amostragem mais frequente (ns) entre timestamps
+def dominant_step(timestamps):
+    """Intervalo positivo mais frequente entre timestamps consecutivos (após ordenar), em ns; None se não houver."""
+    diffs = np.diff(np.sort(np.asarray(timestamps, dtype='datetime64[ns]').view('i8')))
+    diffs = diffs[diffs > 0]
+    if len(diffs) == 0:
+        return None
+    valores, contagens = np.unique(diffs, return_counts=True)
+    return int(valores[np.argmax(contagens)])
+
+
+# Função para colocar uma ou mais séries em uma grade regular (NaN onde não há amostra)
+def regular_grid(timestamps, series, step=None):
+    """Grade de passo `step` (ns; o intervalo mais frequente, se omitido) a partir do primeiro timestamp.
+
+    `series` é uma lista de arrays alinhados a `timestamps` (sem NaT). Amostras
+    fora da grade são ignoradas. Retorna (grades, passo, inicio, posicao): uma
+    grade por série, o passo e o instante inicial em ns e a posição de cada
+    timestamp na grade (-1 para os que caem fora dela). Sem intervalo válido,
+    `grades` é None.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]').view('i8')
+    passo = dominant_step(ts) if step is None else int(step)
+    if passo is None or len(ts) == 0:
+        return None, passo, None, None
+    inicio = int(ts.min())
+    deslocamento = ts - inicio
+    na_grade = deslocamento % passo == 0
+    posicao = np.where(na_grade, deslocamento // passo, -1)
+    tamanho = int(posicao.max()) + 1
+    grades = []
+    for valores in series:
+        grade = np.full(tamanho, np.nan)
+        grade[posicao[na_grade]] = np.asarray(valores, dtype=np.float64)[na_grade]
+        grades.append(grade)
+    return grades, passo, inicio, posicao
+
+
+# Função para preencher por interpolação linear as lacunas curtas (NaN) de uma série regular
+def fill_short_gaps(x, max_amostras):
+    x = np.asarray(x, dtype=np.float64)
+    ausente = ~np.isfinite(x)
+    if not ausente.any() or ausente.all() or max_amostras <= 0:
+        return x.copy()
+    presentes = np.flatnonzero(~ausente)
+    y = x.copy()
+    y[ausente] = np.interp(np.flatnonzero(ausente), presentes, x[presentes])
+
+    # Lacunas longas e as que tocam as bordas voltam a ser NaN
+    mudanca = np.flatnonzero(np.diff(np.r_[0, ausente.astype(np.int8), 0]))
+    inicios, fins = mudanca[::2], mudanca[1::2]
+    for inicio, fim in zip(inicios, fins):
+        if fim - inicio > max_amostras or inicio == 0 or fim == len(x):
+            y[inicio:fim] = np.nan
+    return y
+
+
+# Função para aplicar um núcleo por convolução FFT (overlap-add) a uma série regular com NaN
+def convolve_with_gaps(x, nucleo):
+    """Convolução centrada; a saída é NaN onde a janela contém alguma amostra ausente.
+
+    As janelas que ultrapassam as bordas da série (meio núcleo em cada extremo)
+    também resultam em NaN.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return x.copy()
+    ausente = ~np.isfinite(x)
+    y = oaconvolve(np.where(ausente, 0.0, x), nucleo, mode='same')
+
+    # Número de amostras ausentes ou fora da série sob os pesos não nulos de cada janela
+    suporte = np.abs(nucleo) > 0
+    falta = oaconvolve(ausente.astype(np.float64), suporte.astype(np.float64), mode='same')
+    meio = len(nucleo) // 2
+    falta[:meio] += 1
+    falta[len(x) - meio:] += 1
+    y[falta > 0.5] = np.nan
+    return y
+
+
+# Função para filtrar uma série (possivelmente com lacunas) e devolver os valores nos timestamps originais
+def tidal_filter(timestamps, values, metodo='godin', dt=None, max_lacuna=MAX_LACUNA_S):
+    """Aplica o filtro `metodo` ('godin', 'doodson' ou 'pl33') à série.
+
+    As amostras são colocadas em uma grade regular de passo `dt` segundos (o
+    intervalo mais frequente, se omitido). Lacunas e NaN de até `max_lacuna`
+    segundos são interpolados linearmente; janelas que contêm lacunas maiores ou
+    ultrapassam as bordas resultam em NaN, assim como amostras fora da grade.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    y = np.full(len(x), np.nan)
+    grades, passo, _, posicao = regular_grid(timestamps, [x], None if dt is None else int(round(dt * 1e9)))
+    if grades is None:
+        return y
+    dt = passo / 1e9
+
+    grade = fill_short_gaps(grades[0], int(max_lacuna // dt))
+    filtrado = convolve_with_gaps(grade, tidal_kernel(metodo, dt))
+    na_grade = posicao >= 0
+    y[na_grade] = filtrado[posicao[na_grade]]
+    return y
@@ -0,0 +1,304 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Chave dos metadados da etapa no esquema Arrow (estação, amostragem, parâmetros do QC...)
+METADATA_KEY = b'hycom_chm'
+
+# Colunas de data/hora convertidas ao ler arquivos CSV
+DATE_COLUMNS = ('timestamp', 'DataHora')
+
+# Extensões dos formatos colunares
+_PARQUET = ('.parquet', '.pq')
+_FEATHER = ('.feather', '.arrow')
+
+# Prefixo das partes de uma tabela colunar acrescentada (diretório com um arquivo por acréscimo)
+_PREFIXO_PARTE = 'part-'
+
+
+# Função para identificar o formato pelo nome do arquivo
+def table_format(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in _PARQUET:
+        return 'parquet'
+    if ext in _FEATHER:
+        return 'feather'
+    return 'csv'
+
+
+# Importação do pyarrow apenas quando um formato colunar é usado
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.feather
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("Os formatos Parquet/Feather requerem o pacote pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+# Função para converter o DataFrame em tabela Arrow com os metadados da etapa
+def _to_arrow(df, metadata):
+    pa = _pyarrow()
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    esquema = dict(tabela.schema.metadata or {})
+    if metadata:
+        esquema[METADATA_KEY] = json.dumps(metadata, default=_json_default).encode()
+    return tabela.replace_schema_metadata(esquema)
+
+
+def _json_default(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    return str(valor)
+
+
+# Função para listar os arquivos de uma tabela: o próprio arquivo ou as partes do diretório, em ordem
+def _partes(file_path):
+    if not os.path.isdir(file_path):
+        return [file_path]
+    return sorted(os.path.join(file_path, nome) for nome in os.listdir(file_path) if nome.startswith(_PREFIXO_PARTE))
+
+
+def _nome_parte(file_path, numero):
+    return os.path.join(file_path, f"{_PREFIXO_PARTE}{numero:05d}{os.path.splitext(file_path)[1]}")
+
+
+# Função para ler o esquema Arrow de um arquivo Parquet/Feather
+def _esquema(arquivo):
+    pa = _pyarrow()
+    if table_format(arquivo) == 'parquet':
+        return pa.parquet.read_schema(arquivo)
+    with pa.memory_map(arquivo) as fonte:
+        return pa.ipc.open_file(fonte).schema
+
+
+# Função para remover um arquivo ou diretório de partes antes de regravá-lo
+def _remover_existente(file_path):
+    if os.path.isdir(file_path):
+        shutil.rmtree(file_path)
+
+
+# Função para gravar um DataFrame de uma etapa em CSV, Parquet ou Feather
+def write_table(df, file_path, metadata=None, index=False):
+    """Grava `df` no formato indicado pela extensão de `file_path`.
+
+    Parquet e Feather guardam os timestamps como datetime64 e os valores como
+    float/int nativos, junto com `metadata` (dicionário JSON da etapa). CSV é
+    mantido como opção de exportação e não guarda os metadados.
+    Com `index=True` o índice (ex.: timestamp) é gravado como coluna.
+    """
+    if index:
+        df = df.reset_index()
+    formato = table_format(file_path)
+    _remover_existente(file_path)
+    if formato == 'csv':
+        df.to_csv(file_path, index=False)
+        return
+    _write_arrow(_to_arrow(df, metadata), file_path)
+
+
+def _write_arrow(tabela, file_path):
+    pa = _pyarrow()
+    if table_format(file_path) == 'parquet':
+        pa.parquet.write_table(tabela, file_path)
+    else:
+        pa.feather.write_feather(tabela, file_path)
+
+
+# Função para ler um DataFrame de uma etapa de qualquer formato suportado
+def read_table(file_path, columns=None, date_columns=DATE_COLUMNS, date_format=None, errors='raise'):
+    """Lê CSV, Parquet ou Feather e retorna um DataFrame com timestamps datetime64.
+
+    Nos formatos colunares os timestamps já vêm tipados e não são convertidos;
+    no CSV as colunas em `date_columns` passam por `pd.to_datetime`. Tabelas
+    colunares acrescentadas com `append_table` (diretório de partes) são lidas
+    como uma só.
+    """
+    formato = table_format(file_path)
+    if formato == 'csv':
+        df = pd.read_csv(file_path, delimiter=',', usecols=columns)
+    else:
+        pa = _pyarrow()
+        ler = pa.parquet.read_table if formato == 'parquet' else pa.feather.read_table
+        tabelas = [ler(arquivo, columns=columns) for arquivo in _partes(file_path)]
+        df = (tabelas[0] if len(tabelas) == 1 else pa.concat_tables(tabelas)).to_pandas()
+
+    for coluna in date_columns:
+        if coluna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = pd.to_datetime(df[coluna], format=date_format, errors=errors)
+    return df
+
+
+# Tamanho dos blocos lidos do final de um CSV ao procurar as linhas novas
+_BLOCO_CSV = 1 << 20
+
+
+# Função para ler apenas as linhas com `column` posterior a `after`
+def read_table_after(file_path, column, after, date_columns=DATE_COLUMNS, date_format=None, errors='raise'):
+    """Como `read_table`, mas só com as linhas em que `column` > `after`.
+
+    Parquet usa as estatísticas dos grupos de linhas para não ler os grupos
+    antigos; Feather é mapeado em memória e filtrado sem conversão de datas. O
+    CSV deve estar em ordem cronológica de `column` (como o gravado pelas
+    etapas): o arquivo é percorrido de trás para frente em blocos até a primeira
+    linha não posterior a `after`, e só as linhas seguintes são lidas e têm os
+    timestamps convertidos. O custo é proporcional às linhas novas.
+    """
+    after = pd.Timestamp(after)
+    formato = table_format(file_path)
+    if formato == 'csv':
+        with open(file_path, 'rb') as f:
+            nomes = pd.read_csv(f, nrows=0).columns
+            f.seek(0)
+            f.readline()
+            inicio = _inicio_csv_apos(f, list(nomes).index(column), after, date_format, f.tell())
+            f.seek(inicio)
+            df = pd.read_csv(f, delimiter=',', header=None, names=nomes)
+    else:
+        pa = _pyarrow()
+        if formato == 'parquet':
+            tabelas = [pa.parquet.read_table(arquivo, filters=[(column, '>', after)]) for arquivo in _partes(file_path)]
+        else:
+            import pyarrow.compute as pc
+            tabelas = []
+            for arquivo in _partes(file_path):
+                tabela = pa.feather.read_table(arquivo, memory_map=True)
+                limite = pa.scalar(after, type=tabela.schema.field(column).type)
+                tabelas.append(tabela.filter(pc.greater(tabela[column], limite)))
+        df = (tabelas[0] if len(tabelas) == 1 else pa.concat_tables(tabelas)).to_pandas()
+
+    for coluna in date_columns:
+        if coluna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = pd.to_datetime(df[coluna], format=date_format, errors=errors)
+    return df[df[column] > after].reset_index(drop=True)
+
+
+# Posição (em bytes) da última linha de dados com timestamp <= `after`, ou do início dos dados
+def _inicio_csv_apos(f, indice, after, date_format, inicio_dados):
+    posicao = f.seek(0, 2)
+    while posicao > inicio_dados:
+        posicao = max(inicio_dados, posicao - _BLOCO_CSV)
+        f.seek(posicao)
+        if posicao > inicio_dados:
+            f.readline()                       # descarta a linha parcial
+        linha_inicio = f.tell()
+        linha = f.readline()
+        if not linha.strip():
+            continue
+        valor = linha.decode().rstrip('\r\n').split(',')[indice]
+        if pd.to_datetime(valor, format=date_format) <= after:
+            return linha_inicio
+    return inicio_dados
+
+
+# Função para ler apenas os metadados da etapa gravados no arquivo
+def read_metadata(file_path):
+    """Retorna o dicionário de metadados de um arquivo Parquet/Feather ({} para CSV).
+
+    Em tabelas acrescentadas valem os metadados da parte mais recente.
+    """
+    if table_format(file_path) == 'csv':
+        return {}
+    esquema = _esquema(_partes(file_path)[-1])
+    bruto = (esquema.metadata or {}).get(METADATA_KEY)
+    return json.loads(bruto) if bruto else {}
+
+
+# Função para ler um arquivo em blocos de tamanho limitado
+def iter_table_chunks(file_path, chunksize, columns=None):
+    """Gera DataFrames de até `chunksize` linhas, na ordem do arquivo."""
+    formato = table_format(file_path)
+    if formato == 'csv':
+        yield from pd.read_csv(file_path, delimiter=',', usecols=columns, chunksize=chunksize)
+        return
+    pa = _pyarrow()
+    for arquivo in _partes(file_path):
+        if formato == 'parquet':
+            for lote in pa.parquet.ParquetFile(arquivo).iter_batches(batch_size=chunksize, columns=columns):
+                yield lote.to_pandas()
+            continue
+        with pa.memory_map(arquivo) as fonte:
+            leitor = pa.ipc.open_file(fonte)
+            for i in range(leitor.num_record_batches):
+                df = leitor.get_batch(i).to_pandas()
+                df = df[columns] if columns else df
+                for inicio in range(0, len(df), chunksize):
+                    yield df.iloc[inicio:inicio + chunksize]
+
+
+# Função para acrescentar linhas a um arquivo existente de uma etapa
+def append_table(df, file_path, metadata=None):
+    """Acrescenta `df` ao final do arquivo (cria o arquivo se não existir).
+
+    CSV é acrescentado diretamente. Parquet e Feather não são regravados: no
+    primeiro acréscimo o arquivo é movido (sem cópia) para dentro de um
+    diretório com o mesmo nome, como a parte 0, e cada acréscimo grava uma nova
+    parte com o esquema da primeira. O custo é proporcional às linhas novas.
+    """
+    if not os.path.exists(file_path):
+        write_table(df, file_path, metadata=metadata)
+    elif table_format(file_path) == 'csv':
+        df.to_csv(file_path, mode='a', header=False, index=False)
+    else:
+        metadata = metadata or read_metadata(file_path)
+        if not os.path.isdir(file_path):
+            temporario = file_path + '.tmp'
+            os.replace(file_path, temporario)
+            os.makedirs(file_path)
+            os.replace(temporario, _nome_parte(file_path, 0))
+        partes = _partes(file_path)
+        esquema = _esquema(partes[0])
+        tabela = _to_arrow(df, metadata)
+        tabela = tabela.select(esquema.names).cast(esquema.remove_metadata()).replace_schema_metadata(
+            tabela.schema.metadata)
+        numero = int(os.path.basename(partes[-1])[len(_PREFIXO_PARTE):].split('.')[0]) + 1
+        _write_arrow(tabela, _nome_parte(file_path, numero))
+
+
+# Gravação incremental (bloco a bloco) para as etapas que processam em partes
+class TableWriter:
+    """Grava blocos sucessivos de um DataFrame em um novo arquivo CSV, Parquet ou Feather.
+
+    Nos formatos colunares os metadados da etapa vão no esquema do arquivo.
+    """
+
+    def __init__(self, file_path, metadata=None):
+        self.file_path = file_path
+        self.metadata = metadata
+        self.formato = table_format(file_path)
+        self._writer = None
+        self._primeiro = True
+
+    def write(self, df):
+        if self._primeiro:
+            _remover_existente(self.file_path)
+        if self.formato == 'csv':
+            df.to_csv(self.file_path, mode='w' if self._primeiro else 'a', header=self._primeiro, index=False)
+        else:
+            pa = _pyarrow()
+            tabela = _to_arrow(df, self.metadata)
+            if self._writer is None:
+                if self.formato == 'parquet':
+                    self._writer = pa.parquet.ParquetWriter(self.file_path, tabela.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, tabela.schema)
+            self._writer.write_table(tabela)
+        self._primeiro = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
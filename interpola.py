@@ -1,12 +1,27 @@
+import numpy as np
 import pandas as pd
-from scipy.interpolate import CubicSpline
+from scipy.interpolate import CubicSpline, PchipInterpolator, Akima1DInterpolator
 import matplotlib.pyplot as plt
 
+from quartod_engine import select_by_quality, QC_PASS
+from quartod_thresholds import data_hash
+from formato_intermediario import read_table, write_table
+from decimacao import plot_decimated
+
+# Métodos de interpolação disponíveis
+INTERPOLATION_METHODS = ('linear', 'pchip', 'akima', 'cubic')
+
+# Ajustes já calculados (por conteúdo da série modelada e método), reaproveitados entre avaliações
+_AJUSTES = {}
+_MAX_AJUSTES = 16
+
 # Função para ler dados modelados e observados
-def read_data(file_path):
-    """Lê os dados de um arquivo CSV e retorna um DataFrame."""
-    df = pd.read_csv(file_path)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+def read_data(file_path, max_qc_code=QC_PASS):
+    """Lê os dados de um arquivo CSV (ou Parquet/Feather) e retorna um DataFrame.
+
+    Arquivos com a coluna 'qc_flags' são filtrados pelo código QUARTOD máximo aceito.
+    """
+    df = select_by_quality(read_table(file_path), max_code=max_qc_code)
     return df
 
 # Função para criar nova série com os timestamps observados
@@ -14,37 +29,99 @@ def create_new_series_with_timestamps(df_observed):
     """Cria uma nova série apenas com os timestamps dos dados observados."""
     df_new_series = pd.DataFrame()
     df_new_series['timestamp'] = df_observed['timestamp']
-    df_new_series['Nivel_do_Mar_Interpolado'] = None
+    df_new_series['Nivel_do_Mar_Interpolado'] = np.nan
     return df_new_series
 
+# Função para separar a série modelada em segmentos contíguos e ajustar um interpolador a cada um
+def fit_model_levels(df_model, metodo='cubic', max_gap=None):
+    """Ajusta o interpolador `metodo` ('linear', 'pchip', 'akima' ou 'cubic') a cada segmento do modelo.
+
+    Um novo segmento começa quando o intervalo entre amostras passa de `max_gap`
+    (Timedelta; padrão: 1,5 vez o intervalo mediano). O ajuste é guardado em
+    cache pelo conteúdo da série e pode ser avaliado em vários conjuntos de
+    timestamps com `evaluate_model_levels` sem ser refeito.
+    """
+    if metodo not in INTERPOLATION_METHODS:
+        raise ValueError(f"Método de interpolação '{metodo}' desconhecido. Opções: {INTERPOLATION_METHODS}")
+    modelo = df_model[['timestamp', 'Nivel_do_Mar']].dropna().sort_values('timestamp', kind='stable')
+    modelo = modelo.drop_duplicates('timestamp', keep='last')
+    ts = modelo['timestamp'].values.astype('datetime64[ns]').view('i8')
+    nivel = modelo['Nivel_do_Mar'].to_numpy(dtype=np.float64)
+
+    chave = (data_hash(ts, nivel), metodo, None if max_gap is None else pd.Timedelta(max_gap).value)
+    if chave in _AJUSTES:
+        return _AJUSTES[chave]
+
+    diffs = np.diff(ts)
+    limite = pd.Timedelta(max_gap).value if max_gap is not None else (1.5 * np.median(diffs) if len(diffs) else 0)
+    quebras = np.flatnonzero(diffs > limite) + 1
+    inicios = np.r_[0, quebras]
+    fins = np.r_[quebras, len(ts)]
+
+    # Tempo em segundos a partir do início do modelo
+    t0 = ts[0] if len(ts) else 0
+    segundos = (ts - t0) / 1e9
+    interpoladores = [_interpolador(segundos[i:f], nivel[i:f], metodo) for i, f in zip(inicios, fins)]
+
+    ajuste = {'metodo': metodo, 't0': t0, 'inicio': ts[inicios] if len(ts) else ts,
+              'fim': ts[fins - 1] if len(ts) else ts, 'interpoladores': interpoladores}
+    if len(_AJUSTES) >= _MAX_AJUSTES:
+        _AJUSTES.pop(next(iter(_AJUSTES)))
+    _AJUSTES[chave] = ajuste
+    return ajuste
+
+def _interpolador(t, y, metodo):
+    # Segmentos com menos de dois pontos só têm valor no próprio instante
+    if metodo == 'linear' or len(t) < 2:
+        return lambda x: np.interp(x, t, y)
+    if metodo == 'pchip':
+        return PchipInterpolator(t, y, extrapolate=False)
+    if metodo == 'akima':
+        return Akima1DInterpolator(t, y, extrapolate=False)
+    return CubicSpline(t, y, extrapolate=False)
+
+# Função para avaliar um ajuste em um conjunto de timestamps
+def evaluate_model_levels(ajuste, timestamps):
+    """Retorna um array float64; timestamps em lacunas ou fora do período do modelo recebem NaN."""
+    ts = np.asarray(timestamps, dtype='datetime64[ns]').view('i8')
+    resultado = np.full(len(ts), np.nan)
+    if len(ajuste['inicio']) == 0:
+        return resultado
+    segmento = np.searchsorted(ajuste['inicio'], ts, side='right') - 1
+    dentro = (segmento >= 0) & (ts <= ajuste['fim'][np.maximum(segmento, 0)])
+    for s in np.unique(segmento[dentro]):
+        alvo = dentro & (segmento == s)
+        resultado[alvo] = ajuste['interpoladores'][s]((ts[alvo] - ajuste['t0']) / 1e9)
+    return resultado
+
 # Função para interpolar os valores de nível modelado com base nos timestamps observados
-def interpolate_model_levels(df_new_series, df_model):
-    """Realiza a interpolação Cubic Spline dos níveis de mar modelados para os timestamps observados."""
-    # Convertendo os timestamps para números (em segundos) para a interpolação
-    time_numeric_model = (df_model['timestamp'] - df_model['timestamp'].min()).dt.total_seconds()
-    time_numeric_new_series = (df_new_series['timestamp'] - df_model['timestamp'].min()).dt.total_seconds()
-    
-    # Usando Cubic Spline para interpolar os níveis de mar modelados
-    cs = CubicSpline(time_numeric_model, df_model['Nivel_do_Mar'])
-    
-    # Preenchendo os valores de nível na nova série
-    df_new_series['Nivel_do_Mar_Interpolado'] = cs(time_numeric_new_series)
-    
+def interpolate_model_levels(df_new_series, df_model, metodo='cubic', max_gap=None):
+    """Interpola os níveis de mar modelados para os timestamps observados (Cubic Spline por padrão).
+
+    Cada segmento contíguo do modelo é ajustado separadamente; timestamps em
+    lacunas do modelo ou fora do seu período ficam com NaN, sem extrapolação.
+    """
+    ajuste = fit_model_levels(df_model, metodo=metodo, max_gap=max_gap)
+    df_new_series['Nivel_do_Mar_Interpolado'] = evaluate_model_levels(ajuste, df_new_series['timestamp'].values)
     return df_new_series
 
 # Função para plotar os dados observados, modelados e interpolados com pontos pequenos
 def plot_data(df_observed, df_model, df_new_series, station_name):
     """Plota todas as séries temporais juntas como gráfico de dispersão com pontos pequenos."""
-    plt.figure(figsize=(14, 7))
+    fig, ax = plt.subplots(figsize=(14, 7))
     
+    # Cada série é decimada por LTTB e redecimada a cada zoom
     # Plotar dados observados como pontos pequenos
-    plt.scatter(df_observed['timestamp'], df_observed['Nivel_do_Mar'], label='Dados Observados', color='blue', s=1, alpha=0.7)
+    plot_decimated(ax, df_observed['timestamp'], df_observed['Nivel_do_Mar'], kind='scatter',
+                   label='Dados Observados', color='blue', s=1, alpha=0.7)
     
     # Plotar dados modelados como pontos pequenos
-    plt.scatter(df_model['timestamp'], df_model['Nivel_do_Mar'], label='Dados Modelados HYCOM', color='orange', s=1, alpha=0.7)
+    plot_decimated(ax, df_model['timestamp'], df_model['Nivel_do_Mar'], kind='scatter',
+                   label='Dados Modelados HYCOM', color='orange', s=1, alpha=0.7)
     
     # Plotar dados interpolados como pontos pequenos
-    plt.scatter(df_new_series['timestamp'], df_new_series['Nivel_do_Mar_Interpolado'], label='Dados Interpolados', color='green', s=1, alpha=0.7)
+    plot_decimated(ax, df_new_series['timestamp'], df_new_series['Nivel_do_Mar_Interpolado'], kind='scatter',
+                   label='Dados Interpolados', color='green', s=1, alpha=0.7)
     
     plt.xlabel('Data')
     plt.ylabel('Nível do Mar (cm)')
@@ -53,22 +130,28 @@ def plot_data(df_observed, df_model, df_new_series, station_name):
     plt.grid(True)
     plt.show()
 
-# Carregar os dados OBSERVADOS X MODELADOS
-df_observed = read_data('dados_qualidade_RGD_filtrados.csv')  # Substitua pelo caminho correto dos dados observados
-df_model = read_data('hycom_RGD.csv')  # Substitua pelo caminho correto dos dados modelados (HYCOM)
+def main():
+    # Carregar os dados OBSERVADOS X MODELADOS
+    df_observed = read_data('dados_qualidade_RGD_filtrados.csv')  # Substitua pelo caminho correto dos dados observados
+    df_model = read_data('hycom_RGD.csv')  # Substitua pelo caminho correto dos dados modelados (HYCOM)
+
+    # Passo 2: Criar a nova série com timestamps observados
+    df_new_series = create_new_series_with_timestamps(df_observed)
+
+    # Passo 4: Interpolar os dados modelados com base nos timestamps observados
+    df_new_series = interpolate_model_levels(df_new_series, df_model)
 
-# Passo 2: Criar a nova série com timestamps observados
-df_new_series = create_new_series_with_timestamps(df_observed)
+    # Mostrar as primeiras linhas da nova série após interpolação
+    print("\nNova Série (após interpolação):")
+    print(df_new_series.head())
 
-# Passo 4: Interpolar os dados modelados com base nos timestamps observados
-df_new_series = interpolate_model_levels(df_new_series, df_model)
+    # Passo 6: Plotar os dados observados, modelados e interpolados com pontos pequenos
+    plot_data(df_observed, df_model, df_new_series, "Rio Grande - RS")
 
-# Mostrar as primeiras linhas da nova série após interpolação
-print("\nNova Série (após interpolação):")
-print(df_new_series.head())
+    # Passo 5: Salvar a nova série interpolada em um arquivo CSV
+    write_table(df_new_series, 'nova_serie_interpolada_RGD.csv',
+                metadata={'stage': 'interpolacao', 'station': 'Rio Grande - RS', 'metodo': 'cubic'})
 
-# Passo 6: Plotar os dados observados, modelados e interpolados com pontos pequenos
-plot_data(df_observed, df_model, df_new_series, "Rio Grande - RS")
 
-# Passo 5: Salvar a nova série interpolada em um arquivo CSV
-df_new_series.to_csv('nova_serie_interpolada_RGD.csv', index=False)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Colunas de data/hora separadas dos arquivos SIMCOSTA
+DATE_PARTS = ['YEAR', 'MONTH', 'DAY', 'HOUR', 'MINUTE', 'SECOND']
+
+# Número máximo de linhas examinadas à procura da linha de cabeçalho
+_MAX_LINHAS_METADADOS = 500
+
+_NS_POR_SEGUNDO = 1_000_000_000
+_NS_POR_DIA = 86_400 * _NS_POR_SEGUNDO
+
+
+# Função para encontrar a linha com os nomes das colunas, após os metadados textuais
+def detectar_cabecalho(input_file):
+    """Retorna o número de linhas de metadados antes do cabeçalho (valor para `skiprows`)."""
+    with open(input_file, encoding='utf-8', errors='replace') as f:
+        for i, linha in enumerate(f):
+            if i >= _MAX_LINHAS_METADADOS:
+                break
+            campos = {c.strip().strip('"').upper() for c in linha.split(',')}
+            if 'YEAR' in campos and 'MONTH' in campos:
+                return i
+    raise ValueError(f"Cabeçalho com as colunas {DATE_PARTS} não encontrado em {input_file}")
+
+
+# Função para converter datas civis em dias desde 1970-01-01 (algoritmo de H. Hinnant)
+def _dias_desde_epoca(ano, mes, dia):
+    ano = ano - (mes <= 2)
+    era = np.floor_divide(ano, 400)
+    ano_da_era = ano - era * 400
+    mes_deslocado = (mes + 9) % 12                                   # março = 0
+    dia_do_ano = (153 * mes_deslocado + 2) // 5 + dia - 1
+    dia_da_era = ano_da_era * 365 + ano_da_era // 4 - ano_da_era // 100 + dia_do_ano
+    return era * 146097 + dia_da_era - 719468
+
+
+# Função para montar datetime64 a partir das colunas inteiras YEAR...SECOND
+def montar_datahora(dados, ajuste_fuso=0):
+    """Equivalente a `pd.to_datetime(dados[DATE_PARTS])`, com aritmética inteira vetorizada.
+
+    Linhas com algum componente ausente resultam em NaT; componentes fora do
+    intervalo válido geram ValueError, como no pandas.
+    """
+    partes = [dados[c].to_numpy(dtype=np.float64) for c in DATE_PARTS]
+    ausente = np.zeros(len(dados), dtype=bool)
+    for p in partes:
+        ausente |= np.isnan(p)
+    ano, mes, dia, hora, minuto = (np.where(ausente, 1, p).astype(np.int64) for p in partes[:5])
+    segundo = np.where(ausente, 0, partes[5])
+
+    dias_no_mes = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(mes, 1, 12) - 1]
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    dias_no_mes = dias_no_mes + ((mes == 2) & bissexto)
+    invalido = ((mes < 1) | (mes > 12) | (dia < 1) | (dia > dias_no_mes) | (hora < 0) | (hora > 23)
+                | (minuto < 0) | (minuto > 59) | (segundo < 0) | (segundo >= 60)) & ~ausente
+    if invalido.any():
+        i = int(np.flatnonzero(invalido)[0])
+        raise ValueError(f"Data/hora inválida na linha {i}: " + ", ".join(f"{c}={p[i]}" for c, p in zip(DATE_PARTS, partes)))
+
+    ns = (_dias_desde_epoca(ano, mes, dia) * _NS_POR_DIA
+          + (hora * 3600 + minuto * 60 + int(round(ajuste_fuso * 3600))) * _NS_POR_SEGUNDO
+          + np.round(segundo * _NS_POR_SEGUNDO).astype(np.int64))
+    datahora = ns.view('datetime64[ns]')
+    datahora[ausente] = np.datetime64('NaT')
+    return datahora
+
+
+# Função para ler um arquivo SIMCOSTA com detecção automática do cabeçalho
+def ler_simcosta(input_file, ajuste_fuso=0, colunas=('water_l1',)):
+    """Lê um arquivo SIMCOSTA e retorna um DataFrame com 'DataHora' (já com o ajuste de fuso).
+
+    Apenas as colunas de data/hora e as de `colunas` são lidas (`colunas=None`
+    lê todas). `ajuste_fuso` é dado em horas.
+    """
+    usecols = None if colunas is None else DATE_PARTS + list(colunas)
+    dados = pd.read_csv(input_file, delimiter=',', skiprows=detectar_cabecalho(input_file), usecols=usecols)
+    dados.insert(0, 'DataHora', montar_datahora(dados, ajuste_fuso=ajuste_fuso))
+    return dados
+
+
+# Função para ler e unir todas as exportações SIMCOSTA de um diretório (mensais, anuais...)
+def ler_diretorio_simcosta(diretorio, padrao='*.csv', ajuste_fuso=0, colunas=('water_l1',), max_workers=None):
+    """Lê os arquivos em paralelo e retorna uma única série ordenada por 'DataHora'.
+
+    Amostras repetidas em exportações sobrepostas são removidas; prevalece a do
+    arquivo que vem por último na ordem alfabética.
+    """
+    arquivos = sorted(glob.glob(os.path.join(diretorio, padrao)))
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum arquivo {padrao} encontrado em {diretorio}")
+    print(f"Lendo {len(arquivos)} arquivos SIMCOSTA de {diretorio}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        partes = list(executor.map(lambda f: ler_simcosta(f, ajuste_fuso=ajuste_fuso, colunas=colunas), arquivos))
+
+    dados = pd.concat(partes, ignore_index=True)
+    dados = dados.sort_values('DataHora', kind='stable')
+    total = len(dados)
+    dados = dados.drop_duplicates('DataHora', keep='last').reset_index(drop=True)
+    print(f"Amostras repetidas removidas: {total - len(dados)}")
+    return dados
@@ -0,0 +1,147 @@
+import numpy as np
+
+# Métricas calculadas por compute_statistics_barron, na ordem de exibição
+SKILL_METRICS = ('rmse', 'mae', 'bias', 'r', 'd', 'skill_barron')
+
+# Tamanho dos blocos usados por compute_statistics_barron
+CHUNK_SIZE = 2**20
+
+
+# Acumulador das estatísticas suficientes das métricas de skill (referência x modelo)
+class SkillAccumulator:
+    """Acumula, bloco a bloco, as estatísticas de RMSE, MAE, viés, r, d de Willmott e skill de Barron.
+
+    Primeira passagem (`update`): contagem, médias e co-momentos centrados
+    (combinação de Chan et al.) e soma dos erros absolutos. O d de Willmott e o
+    range médio de Barron dependem de |x - média da referência|, que não se
+    acumula antes de conhecer a média global; a segunda passagem
+    (`update_deviations`) soma esses termos em torno de `center`, a média da
+    referência obtida na primeira passagem. Acumuladores parciais (blocos, meses,
+    estações, processos) se combinam com `merge` sem perda: o resultado é o
+    mesmo do cálculo sobre a série inteira.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_ref = 0.0
+        self.mean_mod = 0.0
+        self.m2_ref = 0.0
+        self.m2_mod = 0.0
+        self.c_ref_mod = 0.0
+        self.sum_abs_err = 0.0
+        # Segunda passagem
+        self.center = None
+        self.n_dev = 0
+        self.sum_abs_dev = 0.0
+        self.sum_willmott = 0.0
+
+    def _combinar(self, n, mean_ref, mean_mod, m2_ref, m2_mod, c_ref_mod, sum_abs_err):
+        total = self.n + n
+        if n == 0:
+            return
+        delta_ref, delta_mod = mean_ref - self.mean_ref, mean_mod - self.mean_mod
+        peso = self.n * n / total
+        self.m2_ref += m2_ref + delta_ref**2 * peso
+        self.m2_mod += m2_mod + delta_mod**2 * peso
+        self.c_ref_mod += c_ref_mod + delta_ref * delta_mod * peso
+        self.mean_ref += delta_ref * n / total
+        self.mean_mod += delta_mod * n / total
+        self.sum_abs_err += sum_abs_err
+        self.n = total
+
+    # Primeira passagem sobre um bloco de pares (referência, modelo) já alinhados
+    def update(self, reference, model):
+        ref = np.asarray(reference, dtype=np.float64)
+        mod = np.asarray(model, dtype=np.float64)
+        if ref.shape != mod.shape:
+            raise ValueError("Referência e modelo devem ter o mesmo número de amostras.")
+        if len(ref) == 0:
+            return self
+        mean_ref, mean_mod = ref.mean(), mod.mean()
+        dr, dm = ref - mean_ref, mod - mean_mod
+        self._combinar(len(ref), mean_ref, mean_mod, np.dot(dr, dr), np.dot(dm, dm), np.dot(dr, dm),
+                       np.abs(mod - ref).sum())
+        return self
+
+    # Segunda passagem: desvios absolutos em torno da média global da referência
+    def update_deviations(self, reference, model, center=None):
+        center = self.mean_ref if center is None else float(center)
+        if self.center is not None and center != self.center:
+            raise ValueError("A segunda passagem deve usar o mesmo centro em todos os blocos.")
+        self.center = center
+        ref = np.asarray(reference, dtype=np.float64)
+        mod = np.asarray(model, dtype=np.float64)
+        desvio_ref = np.abs(ref - center)
+        self.n_dev += len(ref)
+        self.sum_abs_dev += desvio_ref.sum()
+        self.sum_willmott += np.square(np.abs(mod - center) + desvio_ref).sum()
+        return self
+
+    # Combina outro acumulador parcial neste
+    def merge(self, other):
+        if other.center is not None:
+            if self.center is not None and other.center != self.center:
+                raise ValueError("Acumuladores com centros diferentes na segunda passagem.")
+            self.center = other.center
+        self.n_dev += other.n_dev
+        self.sum_abs_dev += other.sum_abs_dev
+        self.sum_willmott += other.sum_willmott
+        self._combinar(other.n, other.mean_ref, other.mean_mod, other.m2_ref, other.m2_mod,
+                       other.c_ref_mod, other.sum_abs_err)
+        return self
+
+    # Métricas finais; d e skill de Barron exigem a segunda passagem completa
+    def result(self):
+        if self.n == 0:
+            return {k: np.nan for k in SKILL_METRICS}
+        bias = self.mean_mod - self.mean_ref
+        sse = self.m2_ref + self.m2_mod - 2 * self.c_ref_mod + self.n * bias**2
+        rmse = np.sqrt(max(sse, 0.0) / self.n)
+        denominador = np.sqrt(self.m2_ref * self.m2_mod)
+        r = self.c_ref_mod / denominador if denominador > 0 else np.nan
+
+        d = skill_barron = np.nan
+        if self.n_dev == self.n:
+            d = 1 - sse / self.sum_willmott if self.sum_willmott > 0 else np.nan
+            range_medio_barron = 2 * self.sum_abs_dev / self.n
+            skill_barron = 1 - rmse / range_medio_barron if range_medio_barron > 0 else np.nan
+        elif self.n_dev:
+            raise ValueError("Segunda passagem incompleta: os desvios não cobrem todas as amostras.")
+        return {'rmse': rmse, 'mae': self.sum_abs_err / self.n, 'bias': bias, 'r': r, 'd': d,
+                'skill_barron': skill_barron}
+
+
+# Função para calcular as métricas de skill de Barron em duas passagens por blocos
+def compute_statistics_barron(reference, model, chunk_size=CHUNK_SIZE):
+    """Retorna {rmse, mae, bias, r, d, skill_barron}; `reference` é a série de referência.
+
+    O viés é modelo - referência. As séries devem estar pareadas (ver
+    alinhamento_series.align_series).
+    """
+    ref = np.asarray(reference, dtype=np.float64)
+    mod = np.asarray(model, dtype=np.float64)
+    acumulador = SkillAccumulator()
+    for inicio in range(0, len(ref), chunk_size):
+        acumulador.update(ref[inicio:inicio + chunk_size], mod[inicio:inicio + chunk_size])
+    for inicio in range(0, len(ref), chunk_size):
+        acumulador.update_deviations(ref[inicio:inicio + chunk_size], mod[inicio:inicio + chunk_size])
+    return acumulador.result()
+
+
+# Função para exibir as métricas
+def print_statistics(stats, description="Original"):
+    print(f"\nEstatísticas {description} - Skill de Barron:")
+    print(f"RMSE: {stats['rmse']:.4f}")
+    print(f"MAE: {stats['mae']:.4f}")
+    print(f"Viés: {stats['bias']:.4f}")
+    print(f"Coeficiente de Correlação de Pearson (r): {stats['r']:.4f}")
+    print(f"Índice de Willmott (d): {stats['d']:.4f}")
+    print(f"Skill de Barron: {stats['skill_barron']:.4f}")
+
+
+# Função para calcular e exibir as métricas; retorna o skill de Barron
+def calculate_statistics_barron(reference, model, description="Original"):
+    """Calcula e exibe as estatísticas entre a referência (primeiro argumento) e o modelo."""
+    stats = compute_statistics_barron(reference, model)
+    print_statistics(stats, description)
+    return stats['skill_barron']
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pre_RIB import ler_dados_simcosta
+from leitura_simcosta import montar_datahora
+from separar_frequencias import separar_amostragem
+from testes_quartod_RIB_todos import flag_quartod
+from quartod_engine import select_by_quality, QC_PASS
+from ribamar_filtragem import filtrar_dados
+from interpola import create_new_series_with_timestamps, interpolate_model_levels
+from metricas import compute_statistics_barron
+from formato_intermediario import read_table, write_table
+
+# Diretório padrão do cache das saídas das etapas
+CACHE_DIR = 'cache_pipeline'
+
+# Parâmetros que não alteram o resultado de uma etapa e ficam fora da chave do cache
+_FORA_DA_CHAVE = ('thresholds_cache',)
+
+# Saídas da última execução de run_pipeline neste processo, por chave de cache
+# (só as chaves dessa execução são mantidas, para a memória não crescer a cada variação de parâmetros)
+_MEMORIA = {}
+
+
+# Etapa 1: leitura do arquivo SIMCOSTA e ajuste do fuso (pre_RIB.transformar_dados)
+def _etapa_pre_processamento(entradas, ajuste_fuso=0):
+    fonte = entradas['simcosta']
+    if isinstance(fonte, pd.DataFrame):
+        # Tabela SIMCOSTA já lida: colunas YEAR...SECOND e water_l1, como no arquivo
+        dados = pd.DataFrame({'DataHora': montar_datahora(fonte, ajuste_fuso=ajuste_fuso),
+                              'water_l1': fonte['water_l1'].round(2).values})
+    else:
+        dados = ler_dados_simcosta(fonte, ajuste_fuso=ajuste_fuso)
+    return dados[['DataHora', 'water_l1']]
+
+
+# Etapa 2: classificação da amostragem (separar_frequencias.processar_amostragem)
+def _etapa_amostragem(entradas):
+    return separar_amostragem(entradas['pre_processamento']).drop(columns=['diff'])
+
+
+# Etapa 3: testes QUARTOD (testes_quartod_RIB_todos.apply_quartod_tests)
+def _etapa_controle_qualidade(entradas, station='', amostragem=None, seasonal=False, qc_params=None,
+                              thresholds_cache=None):
+    dados = entradas['amostragem']
+    if amostragem is not None:
+        dados = dados[dados['amostragem'] == amostragem]
+    data = pd.DataFrame({'timestamp': dados['DataHora'].values, 'water_l1': dados['water_l1'].values})
+    data, _, _, _ = flag_quartod(data, station, seasonal=seasonal, thresholds_cache=thresholds_cache,
+                                 qc_params=qc_params)
+    return data
+
+
+# Etapa 4: filtro Butterworth por frequência de amostragem, ou filtro de maré (ribamar_filtragem.processar_dados)
+def _etapa_filtragem(entradas, order=4, max_qc_code=QC_PASS, metodo='butterworth'):
+    df = select_by_quality(entradas['controle_qualidade'], max_code=max_qc_code).set_index('timestamp')
+    df_final, _ = filtrar_dados(df, order=order, plotar=False, metodo=metodo)
+    return df_final.sort_index().reset_index()
+
+
+# Etapa 5: interpolação do HYCOM nos timestamps observados (interpola.interpolate_model_levels)
+def _etapa_interpolacao(entradas, metodo='cubic', max_gap=None):
+    df_observed = entradas['filtragem'].rename(columns={'water_l1_Filtrado': 'Nivel_do_Mar'})
+    return interpolate_model_levels(create_new_series_with_timestamps(df_observed), entradas['hycom'],
+                                    metodo=metodo, max_gap=max_gap)
+
+
+# Etapa 6: estatísticas com o observado filtrado como referência (apenas instantes cobertos pelo modelo)
+def _etapa_estatisticas(entradas):
+    observado = entradas['filtragem']['water_l1_Filtrado'].to_numpy(dtype=np.float64)
+    modelado = entradas['interpolacao']['Nivel_do_Mar_Interpolado'].to_numpy(dtype=np.float64)
+    validos = np.isfinite(observado) & np.isfinite(modelado)
+    return compute_statistics_barron(observado[validos], modelado[validos])
+
+
+# Grafo das etapas, em ordem topológica: nome -> (função, entradas)
+# As entradas 'simcosta' e 'hycom' são as fontes (arquivos ou DataFrames) passadas a run_pipeline
+STAGES = {
+    'pre_processamento': (_etapa_pre_processamento, ['simcosta']),
+    'amostragem': (_etapa_amostragem, ['pre_processamento']),
+    'controle_qualidade': (_etapa_controle_qualidade, ['amostragem']),
+    'filtragem': (_etapa_filtragem, ['controle_qualidade']),
+    'interpolacao': (_etapa_interpolacao, ['filtragem', 'hycom']),
+    'estatisticas': (_etapa_estatisticas, ['filtragem', 'interpolacao']),
+}
+
+
+# Função para calcular o hash do conteúdo de um arquivo, diretório ou DataFrame
+def content_hash(valor):
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(valor, pd.DataFrame):
+        h.update(json.dumps([list(map(str, valor.columns)), list(map(str, valor.dtypes))]).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=False).values.tobytes())
+    elif isinstance(valor, dict):
+        h.update(json.dumps(valor, sort_keys=True, default=str).encode())
+    else:
+        # Arquivo, ou diretório de exportações SIMCOSTA (nomes e conteúdos de todos os arquivos)
+        arquivos = sorted(os.path.join(valor, a) for a in os.listdir(valor)) if os.path.isdir(valor) else [valor]
+        for arquivo in arquivos:
+            h.update(os.path.basename(arquivo).encode())
+            with open(arquivo, 'rb') as f:
+                for bloco in iter(lambda: f.read(1 << 20), b''):
+                    h.update(bloco)
+    return h.hexdigest()
+
+
+# Função para montar a chave do cache de uma etapa: hash das entradas + parâmetros
+def _chave(nome, hashes_entradas, params):
+    chave = {k: v for k, v in params.items() if k not in _FORA_DA_CHAVE}
+    texto = json.dumps([nome, hashes_entradas, chave], sort_keys=True, default=str)
+    return hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()
+
+
+def _arquivos_cache(cache_dir, nome, chave):
+    base = os.path.join(cache_dir, f'{nome}-{chave}')
+    return base + '.json', base + '.parquet'
+
+
+# Função para ler a saída de uma etapa guardada no cache (DataFrame ou dicionário)
+def _ler_cache(cache_dir, nome, chave):
+    if chave in _MEMORIA:
+        return _MEMORIA[chave]
+    indice, tabela = _arquivos_cache(cache_dir, nome, chave)
+    with open(indice) as f:
+        registro = json.load(f)
+    valor = read_table(tabela) if registro['tipo'] == 'tabela' else registro['valor']
+    _MEMORIA[chave] = valor
+    return valor
+
+
+# Função para guardar a saída de uma etapa no cache, junto com o hash do seu conteúdo
+def _gravar_cache(cache_dir, nome, chave, valor, hash_saida):
+    _MEMORIA[chave] = valor
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    indice, tabela = _arquivos_cache(cache_dir, nome, chave)
+    registro = {'stage': nome, 'hash': hash_saida}
+    if isinstance(valor, pd.DataFrame):
+        write_table(valor, tabela, metadata={'stage': nome})
+        registro['tipo'] = 'tabela'
+    else:
+        registro.update({'tipo': 'valor', 'valor': valor})
+    # O índice é gravado por último: só marca como válida uma saída completa
+    with open(indice, 'w') as f:
+        json.dump(registro, f, default=float)
+
+
+# Função para obter o hash da saída de uma etapa já calculada, sem carregá-la
+def _hash_em_cache(cache_dir, nome, chave):
+    if cache_dir is None:
+        return None
+    indice, _ = _arquivos_cache(cache_dir, nome, chave)
+    if not os.path.exists(indice):
+        return None
+    with open(indice) as f:
+        return json.load(f)['hash']
+
+
+# Função principal do pipeline: roda as etapas em ordem, recalculando só o que mudou
+def run_pipeline(simcosta, hycom, params=None, cache_dir=CACHE_DIR, outputs=('estatisticas',)):
+    """Roda pré-processamento -> amostragem -> QC -> filtro -> interpolação -> estatísticas.
+
+    `simcosta` e `hycom` são caminhos de arquivo ou DataFrames (`simcosta` como
+    DataFrame tem as colunas do arquivo SIMCOSTA: YEAR...SECOND e 'water_l1'); `params` é um
+    dicionário {etapa: {parâmetro: valor}} (ex.: {'filtragem': {'order': 6}}).
+    Os DataFrames passam de uma etapa a outra em memória. A saída de cada etapa é
+    guardada em `cache_dir` com a chave hash(entradas + parâmetros); em uma nova
+    execução, as etapas cujas entradas e parâmetros não mudaram são lidas do
+    cache e só as etapas a jusante de uma mudança são recalculadas. Uma saída em
+    cache só é carregada se alguma etapa recalculada ou `outputs` precisar dela.
+
+    Retorna {'outputs': {etapa: saída}, 'executed': [...], 'cached': [...]}.
+    """
+    params = params or {}
+    # O arquivo SIMCOSTA é lido pela própria etapa de pré-processamento; o do HYCOM, só se
+    # a interpolação for recalculada
+    fontes = {'simcosta': simcosta, 'hycom': hycom}
+
+    # Hash e valor de cada nó do grafo (fontes e etapas); os valores são carregados sob demanda
+    hashes = {nome: content_hash(valor) for nome, valor in fontes.items()}
+    valores = {'simcosta': simcosta}
+    if isinstance(hycom, pd.DataFrame):
+        valores['hycom'] = hycom
+    chaves = {}
+    executadas, em_cache = [], []
+
+    def valor_de(nome):
+        if nome not in valores:
+            valores[nome] = read_table(fontes[nome]) if nome in fontes else _ler_cache(cache_dir, nome, chaves[nome])
+        return valores[nome]
+
+    for nome, (funcao, entradas) in STAGES.items():
+        params_etapa = params.get(nome, {})
+        chave = _chave(nome, [hashes[e] for e in entradas], params_etapa)
+        chaves[nome] = chave
+
+        hash_saida = _hash_em_cache(cache_dir, nome, chave)
+        if hash_saida is None and chave in _MEMORIA:
+            hash_saida = content_hash(_MEMORIA[chave])
+        if hash_saida is not None:
+            print(f"Etapa {nome}: entradas e parâmetros inalterados, saída lida do cache")
+            hashes[nome] = hash_saida
+            em_cache.append(nome)
+            continue
+
+        print(f"Etapa {nome}: executando")
+        valor = funcao({e: valor_de(e) for e in entradas}, **params_etapa)
+        hashes[nome] = content_hash(valor)
+        valores[nome] = valor
+        _gravar_cache(cache_dir, nome, chave, valor, hashes[nome])
+        executadas.append(nome)
+
+    saidas = {nome: valor_de(nome) for nome in outputs}
+    for chave in set(_MEMORIA) - set(chaves.values()):
+        del _MEMORIA[chave]
+    return {'outputs': saidas, 'executed': executadas, 'cached': em_cache}
+
+
+def main():
+    simcosta_file = 'SIMCOSTA_Ribamar_LEVEL_2024-01-01_2024-09-22.csv'
+    hycom_file = 'hycom_RIB.csv'
+    params = {
+        'pre_processamento': {'ajuste_fuso': 2},
+        'controle_qualidade': {'station': 'Ribamar - MA', 'thresholds_cache': 'limites_gross_range.csv'},
+        'filtragem': {'order': 4},
+    }
+    resultado = run_pipeline(simcosta_file, hycom_file, params)
+    print(f"Etapas executadas: {resultado['executed']}")
+    print(f"Etapas lidas do cache: {resultado['cached']}")
+    print(resultado['outputs']['estatisticas'])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,41 @@
+import os
+
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.dates import DateFormatter
 
-def transformar_dados(input_file, output_file, estacao, ajuste_fuso=0):
-    # Lendo o arquivo de entrada, ignorando as linhas de cabeçalho textual
-    dados = pd.read_csv(input_file, delimiter=',', skiprows=16)  # Ignora as primeiras 10 linhas de metadados
-    
-    # Criando uma coluna de data/hora a partir das colunas separadas
-    dados['DataHora'] = pd.to_datetime(dados[['YEAR', 'MONTH', 'DAY', 'HOUR', 'MINUTE', 'SECOND']])
-    
-    # Ajustando o fuso horário
-    dados['DataHora'] = dados['DataHora'] + pd.Timedelta(hours=ajuste_fuso)
+from formato_intermediario import write_table
+from leitura_simcosta import ler_simcosta, ler_diretorio_simcosta
+
+# Função para ler um arquivo SIMCOSTA (ou um diretório de exportações) e montar a coluna de data/hora
+def ler_dados_simcosta(input_file, ajuste_fuso=0):
+    # Lendo o arquivo de entrada; o número de linhas de metadados é detectado automaticamente
+    # e a coluna de data/hora já vem com o ajuste de fuso horário
+    if os.path.isdir(input_file):
+        dados = ler_diretorio_simcosta(input_file, ajuste_fuso=ajuste_fuso)
+    else:
+        dados = ler_simcosta(input_file, ajuste_fuso=ajuste_fuso)
 
     # Convertendo o nível do mar para centímetros
     dados['water_l1'] = dados['water_l1'].round(2)  # O dado já está em centímetros
+    return dados
 
-    # Selecionando as colunas necessárias
-    dados_transformados = dados[['YEAR', 'MONTH', 'DAY', 'HOUR', 'MINUTE', 'SECOND', 'water_l1']]
+def transformar_dados(input_file, output_file, estacao, ajuste_fuso=0, plotar=True):
+    dados = ler_dados_simcosta(input_file, ajuste_fuso=ajuste_fuso)
 
-    # Salvando o resultado no arquivo de saída
-    dados_transformados.to_csv(output_file, index=False)
+    # Selecionando as colunas necessárias (DataHora já com o ajuste de fuso, usada pelo controle de qualidade)
+    dados_transformados = dados[['DataHora', 'water_l1']]
     
     # Definindo e imprimindo o intervalo de dados
     intervalo = dados['DataHora'].diff().dropna().min()
+
+    # Salvando o resultado no arquivo de saída (CSV, Parquet ou Feather conforme a extensão)
+    write_table(dados_transformados, output_file, metadata={
+        'stage': 'pre_processamento',
+        'station': estacao,
+        'ajuste_fuso': ajuste_fuso,
+        'sampling_interval_s': intervalo.total_seconds() if pd.notna(intervalo) else None,
+    })
     if intervalo == pd.Timedelta(minutes=1):
         print("A frequência de amostragem é de 1 em 1 minuto.")
     elif intervalo == pd.Timedelta(minutes=5):
@@ -42,6 +55,9 @@ def transformar_dados(input_file, output_file, estacao, ajuste_fuso=0):
     print(f"Período de dados: {dados['DataHora'].min()} a {dados['DataHora'].max()} para a estação {estacao}")
     print(f"Dados transformados e salvos em {output_file}")
 
+    if not plotar:
+        return dados
+
     # Plotando o gráfico
     plt.figure(figsize=(10,6))
     plt.plot(dados['DataHora'], dados['water_l1'], label='Nível do Mar (cm)')
@@ -62,9 +78,11 @@ def transformar_dados(input_file, output_file, estacao, ajuste_fuso=0):
 
     # Exibir o gráfico
     plt.show()
+    return dados
 
 # Exemplo de uso
-input_file = 'SIMCOSTA_Ribamar_LEVEL_2024-01-01_2024-09-22.csv'  # Arquivo com formato de CSV
-output_file = 'dados_pre_RIB.csv'
-estacao = 'de Ribamar - MA'
-transformar_dados(input_file, output_file, estacao, ajuste_fuso=2)
+if __name__ == "__main__":
+    input_file = 'SIMCOSTA_Ribamar_LEVEL_2024-01-01_2024-09-22.csv'  # Arquivo com formato de CSV
+    output_file = 'dados_pre_RIB.csv'
+    estacao = 'de Ribamar - MA'
+    transformar_dados(input_file, output_file, estacao, ajuste_fuso=2)
@@ -0,0 +1,260 @@
+import numpy as np
+
+# Nomes dos testes QUARTOD na ordem em que são aplicados
+TEST_NAMES = ['valid_syntax', 'valid_range', 'spike', 'rate_of_change', 'flat_line']
+
+# Parâmetros padrão dos testes QUARTOD (os limites do Gross Range dependem dos dados)
+DEFAULT_PARAMS = {
+    'min_chars': 16,          # Syntax Test (mínimo de caracteres)
+    'max_chars': 27,          # Syntax Test (máximo de caracteres)
+    'spike_threshold': 3,     # Spike Test (limiar em múltiplos do desvio padrão)
+    'n_dev': 3,               # Rate of Change Test (número de desvios padrão)
+    'rep_cnt_fail': 5,        # Flat Line Test (repetições para falha)
+    'eps': 0.01,              # Flat Line Test (variação mínima em cm)
+    'tst_tim': 375,           # Tempo de teste em número de observações
+}
+
+# Bits da palavra de flags por amostra (bit ligado = teste reprovado)
+FLAG_SYNTAX = 1
+FLAG_GROSS_RANGE = 2
+FLAG_SPIKE = 4
+FLAG_RATE_OF_CHANGE = 8
+FLAG_FLAT_LINE = 16
+FLAG_MISSING = 32
+
+# Códigos agregados QUARTOD
+QC_PASS = 1
+QC_SUSPECT = 3
+QC_FAIL = 4
+QC_MISSING = 9
+
+# Spike e Rate of Change marcam dados suspeitos; os demais testes reprovam a amostra
+SUSPECT_FLAGS = FLAG_SPIKE | FLAG_RATE_OF_CHANGE
+FAIL_FLAGS = FLAG_SYNTAX | FLAG_GROSS_RANGE | FLAG_FLAT_LINE
+
+# Largura do texto de um timestamp conforme a resolução necessária (ver _timestamp_text_length)
+_NS_POR_DIA = 86400 * 10**9
+_LARGURAS_TIMESTAMP = [
+    (_NS_POR_DIA, 10),   # 'YYYY-MM-DD'
+    (10**9, 19),         # 'YYYY-MM-DD HH:MM:SS'
+    (10**6, 23),         # '... .fff'
+    (10**3, 26),         # '... .ffffff'
+    (1, 29),             # '... .fffffffff'
+]
+
+# Maior valor absoluto para o qual o comprimento do texto do float é calculado numericamente
+_LIMITE_TEXTO_FLOAT = 1e9
+_MAX_DECIMAIS = 6
+
+# Desvio padrão móvel: resolução (1/cm) das somas inteiras exatas e limites de memória
+_ESCALA_INTEIRA = 100
+_MAX_INTEIRO = 2**31
+_ELEMENTOS_POR_BLOCO = 2**22
+
+
+# Função para obter a largura do texto de uma série de timestamps sem criar strings
+def timestamp_text_width(timestamps):
+    """Retorna a largura que `Series.astype(str)` usa para a série inteira de timestamps.
+
+    O pandas formata todos os timestamps com a mesma resolução: apenas a data se todos
+    caem à meia-noite, segundos inteiros, ou frações de milissegundo/micro/nanossegundo.
+    Retorna 0 se todos os timestamps forem NaT.
+    """
+    t = np.asarray(timestamps, dtype='datetime64[ns]')
+    ns = t[~np.isnat(t)].view('i8')
+    if len(ns) == 0:
+        return 0
+    for unidade, largura in _LARGURAS_TIMESTAMP:
+        if not np.any(ns % unidade):
+            return largura
+    return _LARGURAS_TIMESTAMP[-1][1]
+
+
+# Função para calcular o comprimento do texto de cada timestamp
+def _timestamp_text_length(timestamps, width):
+    t = np.asarray(timestamps, dtype='datetime64[ns]')
+    return np.where(np.isnat(t), 3, width)  # 'NaT'
+
+
+# Função para calcular o comprimento de repr(float) de cada valor sem criar strings
+def _float_text_length(values):
+    v = np.asarray(values, dtype=np.float64)
+    a = np.abs(v)
+    length = np.zeros(v.shape, dtype=np.int64)
+
+    nan = np.isnan(v)
+    inf = np.isinf(v)
+    length[nan] = 3                          # 'nan'
+    length[inf] = 3 + np.signbit(v[inf])     # 'inf' / '-inf'
+
+    # Notação fixa: o repr mais curto tem o menor número de casas decimais que reconstrói o valor
+    pendente = ~nan & ~inf & ((a == 0) | ((a >= 1e-4) & (a < _LIMITE_TEXTO_FLOAT)))
+    digitos_inteiros = np.searchsorted(10.0 ** np.arange(1, 10), np.floor(a), side='right') + 1
+    prefixo = np.signbit(v).astype(np.int64) + digitos_inteiros + 1  # sinal, parte inteira e '.'
+    for decimais in range(1, _MAX_DECIMAIS + 1):
+        idx = np.flatnonzero(pendente)
+        if len(idx) == 0:
+            break
+        exato = np.round(a[idx], decimais) == a[idx]
+        length[idx[exato]] = prefixo[idx[exato]] + decimais
+        pendente[idx[exato]] = False
+
+    # Casos raros (notação científica, muitos dígitos) usam o repr diretamente
+    restante = np.flatnonzero(pendente | (~nan & ~inf & (a != 0) & ((a < 1e-4) | (a >= _LIMITE_TEXTO_FLOAT))))
+    if len(restante):
+        length[restante] = [len(repr(float(x))) for x in v[restante]]
+    return length
+
+
+# Função para calcular o comprimento de str(int) de cada valor (séries de dtype inteiro)
+def _int_text_length(values):
+    v = np.asarray(values, dtype=np.float64)
+    digitos = np.searchsorted(10.0 ** np.arange(1, 19), np.abs(v), side='right') + 1
+    return np.signbit(v).astype(np.int64) + digitos
+
+
+# Função para calcular o desvio padrão móvel (ddof=1) como o pandas rolling(window).std()
+def rolling_std(values, window):
+    """Desvio padrão amostral em janela móvel terminando em cada posição.
+
+    Posições sem `window` valores anteriores ou com NaN na janela recebem NaN,
+    igual a `Series.rolling(window).std()`. O resultado de cada posição depende
+    apenas dos valores da sua janela, de modo que processar a série inteira, em
+    partes ou de forma incremental produz exatamente os mesmos números.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window < 2 or n < window:
+        return out
+
+    invalido = ~np.isfinite(x)
+    x0 = np.where(invalido, 0.0, x)
+    contagem_invalidos = np.concatenate(([0], np.cumsum(invalido)))
+
+    # Dados com resolução de 0.01 cm: somas inteiras exatas (diferenças de somas acumuladas
+    # continuam exatas mesmo se as somas acumuladas excederem int64)
+    escalado = x0 * _ESCALA_INTEIRA
+    inteiros = np.rint(escalado)
+    if np.all(np.abs(escalado - inteiros) <= 1e-6) and np.all(np.abs(inteiros) <= _MAX_INTEIRO / window):
+        c = inteiros.astype(np.int64)
+        s1 = np.concatenate(([0], np.cumsum(c)))
+        s2 = np.concatenate(([0], np.cumsum(c * c)))
+        soma = s1[window:] - s1[:-window]
+        soma_q = s2[window:] - s2[:-window]
+        var = (window * soma_q - soma * soma).astype(np.float64) / (window * (window - 1)) / _ESCALA_INTEIRA**2
+    else:
+        # Demais dados: variância de cada janela calculada diretamente, em blocos
+        janelas = np.lib.stride_tricks.sliding_window_view(x0, window)
+        var = np.empty(len(janelas))
+        bloco = max(1, _ELEMENTOS_POR_BLOCO // window)
+        for inicio in range(0, len(janelas), bloco):
+            var[inicio:inicio + bloco] = janelas[inicio:inicio + bloco].var(axis=1, ddof=1)
+
+    std = np.sqrt(np.clip(var, 0.0, None))
+    std[(contagem_invalidos[window:] - contagem_invalidos[:-window]) > 0] = np.nan
+    out[window - 1:] = std
+    return out
+
+
+# Motor QUARTOD vetorizado: todos os testes em uma única passagem sobre arrays NumPy
+def run_quartod_tests(timestamps, water_l1, std_dev, params, timestamp_width=None, integer_values=None):
+    """Aplica Syntax, Gross Range, Spike, Rate of Change e Flat Line de uma só vez.
+
+    Reproduz as decisões dos antigos testes baseados em colunas do DataFrame
+    (Syntax, Gross Range, Spike, Rate of Change e Flat Line), sem criar colunas.
+    O Syntax Test calcula o comprimento de `str(timestamp) + str(water_l1)`
+    numericamente. `timestamp_width` permite fixar a largura do texto do timestamp
+    quando a série é processada em partes. Séries de dtype inteiro são medidas
+    como `str(int)` ('150', e não '150.0'), como `astype(str)` de uma coluna
+    inteira; `integer_values` fixa essa escolha quando a série é processada em
+    partes (se omitido, vem do dtype de `water_l1`).
+
+    Retorna um dicionário com um array booleano por teste (chaves em TEST_NAMES)
+    e a chave 'passed' com as linhas aprovadas em todos os testes.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    if integer_values is None:
+        integer_values = np.issubdtype(np.asarray(water_l1).dtype, np.integer)
+    x = np.asarray(water_l1, dtype=np.float64)
+    n = len(x)
+
+    # Etapa 1 - Syntax Test
+    if timestamp_width is None:
+        timestamp_width = timestamp_text_width(ts)
+    valor_length = _int_text_length(x) if integer_values else _float_text_length(x)
+    message_length = _timestamp_text_length(ts, timestamp_width) + valor_length
+    valid_syntax = (message_length >= params['min_chars']) & (message_length <= params['max_chars'])
+
+    # Etapa 2 - Gross Range Test (NaN nunca está dentro dos limites)
+    valid_range = (x >= params['user_min']) & (x <= params['user_max'])
+
+    # Diferença para a amostra anterior, usada pelos testes seguintes
+    diff = np.full(n, np.nan)
+    diff[1:] = x[1:] - x[:-1]
+    abs_diff = np.abs(diff)
+
+    # Etapa 3 - Spike Test: referência é a média entre a amostra atual e a de duas posições antes
+    anterior = np.full(n, np.nan)
+    anterior[2:] = x[:-2]
+    spk_ref = (anterior + x) / 2
+    spike = np.abs(x - spk_ref) > std_dev * params['spike_threshold']
+
+    # Etapa 4 - Rate of Change Test
+    rate_of_change = abs_diff > rolling_std(x, params['tst_tim']) * params['n_dev']
+
+    # Etapa 5 - Flat Line Test: rep_cnt_fail variações seguidas menores que eps
+    rep = params['rep_cnt_fail']
+    repetida = np.concatenate(([0], np.cumsum(abs_diff < params['eps'])))
+    flat_line = np.zeros(n, dtype=bool)
+    if n >= rep:
+        flat_line[rep - 1:] = (repetida[rep:] - repetida[:-rep]) == rep
+
+    results = {
+        'valid_syntax': valid_syntax,
+        'valid_range': valid_range,
+        'spike': spike,
+        'rate_of_change': rate_of_change,
+        'flat_line': flat_line,
+    }
+    results['passed'] = valid_syntax & valid_range & ~spike & ~rate_of_change & ~flat_line
+    return results
+
+
+# Função para compactar os resultados dos testes em uma palavra de flags uint8
+def pack_flags(results, timestamps, water_l1):
+    """Converte o dicionário de `run_quartod_tests` em um array uint8 de flags."""
+    flags = np.zeros(len(results['passed']), dtype=np.uint8)
+    flags |= np.where(results['valid_syntax'], 0, FLAG_SYNTAX).astype(np.uint8)
+    flags |= np.where(results['valid_range'], 0, FLAG_GROSS_RANGE).astype(np.uint8)
+    flags |= np.where(results['spike'], FLAG_SPIKE, 0).astype(np.uint8)
+    flags |= np.where(results['rate_of_change'], FLAG_RATE_OF_CHANGE, 0).astype(np.uint8)
+    flags |= np.where(results['flat_line'], FLAG_FLAT_LINE, 0).astype(np.uint8)
+    faltante = np.isnan(np.asarray(water_l1, dtype=np.float64)) | np.isnat(np.asarray(timestamps, dtype='datetime64[ns]'))
+    flags |= np.where(faltante, FLAG_MISSING, 0).astype(np.uint8)
+    return flags
+
+
+# Função para obter o código agregado QUARTOD (1, 3, 4 ou 9) de cada amostra
+def qc_codes(flags):
+    flags = np.asarray(flags, dtype=np.uint8)
+    codes = np.full(len(flags), QC_PASS, dtype=np.uint8)
+    codes[(flags & SUSPECT_FLAGS) != 0] = QC_SUSPECT
+    codes[(flags & FAIL_FLAGS) != 0] = QC_FAIL
+    codes[(flags & FLAG_MISSING) != 0] = QC_MISSING
+    return codes
+
+
+# Função para selecionar as amostras conforme o nível de rigor escolhido na leitura
+def select_by_quality(df, max_code=QC_PASS, ignore_flags=0):
+    """Mantém as linhas cujo código QUARTOD é menor ou igual a `max_code`.
+
+    `max_code=QC_PASS` mantém apenas os dados aprovados em todos os testes (como o
+    filtro original de `apply_quartod_tests`); `QC_SUSPECT` aceita também os suspeitos.
+    Bits em `ignore_flags` são desconsiderados. Amostras faltantes nunca são mantidas.
+    DataFrames sem a coluna 'qc_flags' são retornados sem alteração.
+    """
+    if 'qc_flags' not in df.columns:
+        return df
+    flags = df['qc_flags'].to_numpy().astype(np.uint8) & np.uint8(~ignore_flags & 0xFF | FLAG_MISSING)
+    return df[qc_codes(flags) <= max_code]
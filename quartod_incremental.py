@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+
+from quartod_engine import run_quartod_tests, timestamp_text_width
+
+# Variação relativa do desvio padrão da série acumulada acima da qual os limiares congelados
+# no estado deixam de representar a série e ela deve ser reprocessada por inteiro
+DRIFT_TOLERANCE = 0.05
+
+
+# Função para calcular quantas amostras anteriores os testes precisam enxergar
+def tail_length(params):
+    """Número de amostras do final da série necessárias para testar as seguintes.
+
+    Spike usa a amostra de duas posições antes, Flat Line as `rep_cnt_fail`
+    diferenças anteriores e Rate of Change a janela móvel de `tst_tim` amostras.
+    """
+    return max(2, params['rep_cnt_fail'], params['tst_tim'] - 1)
+
+
+# Função para criar o estado de uma estação a partir da série já testada
+def create_state(timestamps, water_l1, std_dev, params, timestamp_width=None):
+    """Guarda os limiares usados, a cauda da série e as estatísticas acumuladas
+    (contagem, média e soma dos quadrados dos desvios) para as próximas execuções."""
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    inteiro = bool(np.issubdtype(np.asarray(water_l1).dtype, np.integer))
+    x = np.asarray(water_l1, dtype=np.float64)
+    if timestamp_width is None:
+        timestamp_width = timestamp_text_width(ts)
+    state = {
+        'params': {k: v.item() if isinstance(v, np.generic) else v for k, v in params.items()},
+        'std_dev': float(std_dev),
+        'timestamp_width': int(timestamp_width),
+        'integer_values': inteiro,
+        'count': 0, 'mean': 0.0, 'm2': 0.0,
+    }
+    _update_statistics(state, x)
+    return _update_tail(state, ts, x)
+
+
+# Função para acumular no estado a contagem, a média e a soma dos quadrados dos desvios (Chan et al.)
+def _update_statistics(state, x):
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return state
+    nb, media_b = len(x), float(x.mean())
+    m2_b = float(((x - media_b) ** 2).sum())
+    delta = media_b - state['mean']
+    total = state['count'] + nb
+    state['mean'] += delta * nb / total
+    state['m2'] += m2_b + delta * delta * state['count'] * nb / total
+    state['count'] = total
+    return state
+
+
+# Função para medir quanto o desvio padrão da série acumulada se afastou do usado nos testes
+def std_dev_drift(state):
+    """Variação relativa entre o desvio padrão atual da série e o `std_dev` congelado.
+
+    Retorna NaN para estados sem estatísticas acumuladas (criados por versões anteriores).
+    """
+    if state.get('count', 0) < 2 or not state['std_dev']:
+        return np.nan
+    atual = np.sqrt(state['m2'] / (state['count'] - 1))
+    return abs(atual - state['std_dev']) / state['std_dev']
+
+
+# Função para guardar no estado as últimas amostras processadas
+def _update_tail(state, ts, x):
+    n = tail_length(state['params'])
+    state['tail_timestamps'] = ts[-n:].view('i8').tolist()
+    state['tail_water_l1'] = [None if np.isnan(v) else float(v) for v in x[-n:]]
+    state['last_timestamp'] = int(ts[-1].view('i8')) if len(ts) else None
+    return state
+
+
+# Funções para salvar e carregar o estado em JSON
+def save_state(state, file_path):
+    with open(file_path, 'w') as f:
+        json.dump(state, f)
+
+
+def load_state(file_path):
+    with open(file_path) as f:
+        return json.load(f)
+
+
+# Função para testar apenas as amostras novas usando a cauda guardada no estado
+def run_incremental(state, timestamps, water_l1):
+    """Aplica os testes QUARTOD às amostras posteriores à última já processada.
+
+    A cauda da série guardada no estado é concatenada às amostras novas, de modo
+    que os resultados são idênticos aos de `run_quartod_tests` sobre a série
+    completa com os mesmos limiares (`std_dev`, `user_min`, `user_max`).
+    Amostras com timestamp igual ou anterior ao último processado são ignoradas.
+
+    Retorna (timestamps, water_l1, results, state) das amostras novas, em ordem
+    cronológica, e o estado atualizado.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    x = np.asarray(water_l1, dtype=np.float64)
+
+    novas = np.ones(len(ts), dtype=bool)
+    if state['last_timestamp'] is not None:
+        novas = ts.view('i8') > state['last_timestamp']
+    ts_novas = ts[novas]
+    x_novas = x[novas]
+    ordem = np.argsort(ts_novas, kind='stable')
+    ts_novas, x_novas = ts_novas[ordem], x_novas[ordem]
+
+    # Timestamps novos com resolução maior mudariam o Syntax Test de toda a série
+    if timestamp_text_width(ts_novas) > state['timestamp_width']:
+        raise ValueError("Os novos timestamps têm resolução maior que a da série processada; "
+                         "é necessário reprocessar a série completa.")
+
+    tail_ts = np.array(state['tail_timestamps'], dtype='i8').view('datetime64[ns]')
+    tail_x = np.array([np.nan if v is None else v for v in state['tail_water_l1']], dtype=np.float64)
+    n_tail = len(tail_ts)
+
+    results = run_quartod_tests(np.concatenate((tail_ts, ts_novas)), np.concatenate((tail_x, x_novas)),
+                                state['std_dev'], state['params'], timestamp_width=state['timestamp_width'],
+                                integer_values=state.get('integer_values', False))
+    results = {k: v[n_tail:] for k, v in results.items()}
+
+    if len(ts_novas):
+        if 'count' in state:
+            _update_statistics(state, x_novas)
+        state = _update_tail(state, np.concatenate((tail_ts, ts_novas)), np.concatenate((tail_x, x_novas)))
+    return ts_novas, x_novas, results, state
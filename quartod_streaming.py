@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from quartod_engine import run_quartod_tests, timestamp_text_width, pack_flags, qc_codes, DEFAULT_PARAMS, QC_PASS
+from quartod_incremental import tail_length
+from quartod_thresholds import linear_percentile, quartile_ranks, whiskers_from_extremes
+from formato_intermediario import iter_table_chunks, TableWriter
+
+# Tamanho padrão dos blocos de leitura (linhas) e número de classes do histograma de quantis
+CHUNKSIZE = 1_000_000
+_CLASSES_HISTOGRAMA = 2**16
+
+
+# Função para ler o arquivo CSV em blocos de tamanho limitado
+def read_csv_chunks(file_path, chunksize=CHUNKSIZE, with_timestamps=True):
+    """Gera (timestamps, water_l1) de cada bloco, na ordem do arquivo.
+
+    Segue `read_csv` de testes_quartod_RIB_todos.py: os timestamps vêm da coluna
+    'DataHora'. Com `with_timestamps=False` apenas 'water_l1' é lido. Aceita CSV,
+    Parquet ou Feather.
+    """
+    usecols = ['DataHora', 'water_l1'] if with_timestamps else ['water_l1']
+    for bloco in iter_table_chunks(file_path, chunksize, columns=usecols):
+        # Colunas inteiras mantêm o dtype (o Syntax Test mede '150', e não '150.0')
+        x = bloco['water_l1'].to_numpy()
+        if not np.issubdtype(x.dtype, np.integer):
+            x = x.astype(np.float64)
+        ts = pd.to_datetime(bloco['DataHora']).to_numpy(dtype='datetime64[ns]') if with_timestamps else None
+        yield ts, x
+
+
+# Primeira passagem: estatísticas globais combinadas bloco a bloco
+def streaming_statistics(file_path, chunksize=CHUNKSIZE):
+    """Calcula contagem, desvio padrão, máximo, mínimo, largura do texto dos timestamps e
+    se a coluna de valores é inteira em todos os blocos ('integer_values').
+
+    Média e soma dos quadrados dos desvios são combinadas entre blocos pela
+    fórmula de Chan et al., sem manter a série em memória.
+    """
+    n, media, m2 = 0, 0.0, 0.0
+    max_value, min_value = -np.inf, np.inf
+    largura = 0
+    inteiro = True
+    for ts, x in read_csv_chunks(file_path, chunksize):
+        largura = max(largura, timestamp_text_width(ts))
+        inteiro = inteiro and np.issubdtype(x.dtype, np.integer)
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            continue
+        nb, media_b = len(x), x.mean()
+        m2_b = ((x - media_b) ** 2).sum()
+        delta = media_b - media
+        total = n + nb
+        media += delta * nb / total
+        m2 += m2_b + delta * delta * n * nb / total
+        n = total
+        max_value = max(max_value, x.max())
+        min_value = min(min_value, x.min())
+
+    std_dev = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+    return {'count': n, 'std_dev': std_dev, 'max': max_value, 'min': min_value, 'timestamp_width': largura,
+            'integer_values': bool(inteiro and n > 0)}
+
+
+# Função para obter estatísticas de ordem exatas (k-ésimos menores valores) sem ordenar a série
+def streaming_order_statistics(file_path, ranks, stats, chunksize=CHUNKSIZE):
+    """Retorna os valores de posição `ranks` (base 0) da série ordenada, sem NaN.
+
+    Uma passagem monta um histograma entre o mínimo e o máximo para localizar a
+    classe de cada posição; outra guarda apenas os valores dessas classes.
+    """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    bordas = np.linspace(stats['min'], stats['max'], _CLASSES_HISTOGRAMA + 1)
+
+    def classe(x):
+        return np.clip(np.searchsorted(bordas, x, side='right') - 1, 0, _CLASSES_HISTOGRAMA - 1)
+
+    contagens = np.zeros(_CLASSES_HISTOGRAMA, dtype=np.int64)
+    for _, x in read_csv_chunks(file_path, chunksize, with_timestamps=False):
+        contagens += np.bincount(classe(x[~np.isnan(x)]), minlength=_CLASSES_HISTOGRAMA)
+
+    acumulado = np.cumsum(contagens)
+    classes_alvo = np.searchsorted(acumulado, ranks, side='right')
+    selecionadas = np.unique(classes_alvo)
+
+    valores = {c: [] for c in selecionadas}
+    for _, x in read_csv_chunks(file_path, chunksize, with_timestamps=False):
+        x = x[~np.isnan(x)]
+        c = classe(x)
+        for alvo in selecionadas:
+            valores[alvo].append(x[c == alvo])
+
+    resultado = []
+    for rank, alvo in zip(ranks, classes_alvo):
+        ordenados = np.sort(np.concatenate(valores[alvo]))
+        inicio = acumulado[alvo] - contagens[alvo]
+        resultado.append(ordenados[rank - inicio])
+    return np.array(resultado)
+
+
+# Função para obter os limites dos bigodes do boxplot lendo o arquivo em blocos
+def streaming_whiskers(file_path, stats, whis=1.5, chunksize=CHUNKSIZE):
+    """Limites inferior e superior dos bigodes de Tukey, como o boxplot do matplotlib."""
+    quartis = quartile_ranks(stats['count'])
+    ranks = sorted({p for q in quartis for p in q[:2]})
+    ordem = dict(zip(ranks, streaming_order_statistics(file_path, ranks, stats, chunksize)))
+    q1, q3 = [linear_percentile(ordem[i], ordem[j], f) for i, j, f in quartis]
+
+    iqr = q3 - q1
+    lo_val, hi_val = q1 - whis * iqr, q3 + whis * iqr
+
+    # Valores extremos dentro das cercas de Tukey
+    lower, upper = None, None
+    for _, x in read_csv_chunks(file_path, chunksize, with_timestamps=False):
+        dentro_inf = x[x >= lo_val]
+        dentro_sup = x[x <= hi_val]
+        if len(dentro_inf):
+            lower = dentro_inf.min() if lower is None else min(lower, dentro_inf.min())
+        if len(dentro_sup):
+            upper = dentro_sup.max() if upper is None else max(upper, dentro_sup.max())
+    return whiskers_from_extremes(q1, q3, lower, upper)
+
+
+# Função principal do modo em blocos: memória limitada pelo tamanho do bloco
+def apply_quartod_streaming(input_file, output_file, station, params=None, chunksize=CHUNKSIZE):
+    """Aplica os testes QUARTOD a arquivos maiores que a memória.
+
+    Faz passagens baratas para as estatísticas globais (e para os limites do Gross
+    Range, se `params` não trouxer 'user_min'/'user_max') e depois testa bloco a
+    bloco. Cada bloco é precedido pelas últimas amostras do bloco anterior, de modo
+    que as flags são idênticas às do processamento em memória com os mesmos limiares.
+    """
+    print(f"Controle de qualidade em blocos de {chunksize} linhas - Estação {station}")
+    stats = streaming_statistics(input_file, chunksize)
+    if stats['count'] == 0:
+        print("Erro: Nenhum dado foi lido do arquivo CSV.")
+        return None
+    print(f"Desvio Padrão: {stats['std_dev']} cm, Valor Máximo: {stats['max']} cm, Valor Mínimo: {stats['min']} cm")
+
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    if 'user_min' not in params or 'user_max' not in params:
+        params['user_min'], params['user_max'] = streaming_whiskers(input_file, stats, chunksize=chunksize)
+    print(f"Gross Range Test: limites [{params['user_min']}, {params['user_max']}] cm")
+
+    n_cauda = tail_length(params)
+    cauda_ts = np.array([], dtype='datetime64[ns]')
+    cauda_x = np.array([], dtype=np.float64)
+    total, aprovados = 0, 0
+    metadata = {'stage': 'controle_qualidade', 'station': station, 'std_dev': stats['std_dev'], 'qc_params': params}
+    writer = TableWriter(output_file, metadata=metadata)
+    for ts, x in read_csv_chunks(input_file, chunksize):
+        todos_ts = np.concatenate((cauda_ts, ts))
+        todos_x = np.concatenate((cauda_x, x))
+        results = run_quartod_tests(todos_ts, todos_x, stats['std_dev'], params,
+                                    timestamp_width=stats['timestamp_width'],
+                                    integer_values=stats['integer_values'])
+        results = {k: v[len(cauda_ts):] for k, v in results.items()}
+
+        bloco = pd.DataFrame({'timestamp': ts, 'water_l1': x})
+        bloco['qc_flags'] = pack_flags(results, ts, x)
+        bloco['qc_code'] = qc_codes(bloco['qc_flags'].values)
+        writer.write(bloco)
+
+        total += len(bloco)
+        aprovados += int((bloco['qc_code'] == QC_PASS).sum())
+        cauda_ts, cauda_x = todos_ts[-n_cauda:], todos_x[-n_cauda:]
+
+    writer.close()
+
+    print(f"Total de dados: {total}, aprovados: {aprovados}")
+    print(f"Dados com flags QUARTOD salvos em {output_file}")
+    return params
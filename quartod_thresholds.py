@@ -0,0 +1,129 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# Colunas da tabela de limites do Gross Range (month = 0 indica o ano todo)
+THRESHOLD_COLUMNS = ['station', 'data_hash', 'month', 'lower', 'upper', 'count']
+
+
+# Função para interpolar um percentil como np.percentile (método linear)
+def linear_percentile(valor_inferior, valor_superior, fracao):
+    diferenca = valor_superior - valor_inferior
+    if fracao >= 0.5:
+        return valor_superior - diferenca * (1 - fracao)
+    return valor_inferior + diferenca * fracao
+
+
+# Função para obter as posições da série ordenada usadas pelos quartis
+def quartile_ranks(n):
+    """Posições (base 0) e frações para Q1 e Q3 como np.percentile(x, [25, 75])."""
+    quartis = []
+    for indice in (0.25 * (n - 1), 0.75 * (n - 1)):
+        inferior = int(np.floor(indice))
+        quartis.append((inferior, min(inferior + 1, n - 1), indice - inferior))
+    return quartis
+
+
+# Função para ajustar os bigodes às cercas de Tukey, como matplotlib.cbook.boxplot_stats
+def whiskers_from_extremes(q1, q3, menor_dentro, maior_dentro):
+    lower = q1 if menor_dentro is None or menor_dentro > q1 else menor_dentro
+    upper = q3 if maior_dentro is None or maior_dentro < q3 else maior_dentro
+    return lower, upper
+
+
+# Função para calcular os limites dos bigodes do boxplot sem desenhar a figura
+def tukey_whiskers(values, whis=1.5):
+    """Limites inferior e superior dos bigodes de Tukey de uma série.
+
+    Reproduz os valores que `plot(..., 'boxplot')` lia de `boxplot['whiskers']`,
+    selecionando apenas as estatísticas de ordem necessárias com `np.partition`.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return np.nan, np.nan
+
+    quartis = quartile_ranks(len(x))
+    posicoes = sorted({p for q in quartis for p in q[:2]})
+    parcial = np.partition(x, posicoes)
+    q1, q3 = [linear_percentile(parcial[i], parcial[j], f) for i, j, f in quartis]
+
+    iqr = q3 - q1
+    dentro_inf = x[x >= q1 - whis * iqr]
+    dentro_sup = x[x <= q3 + whis * iqr]
+    return whiskers_from_extremes(q1, q3,
+                                  dentro_inf.min() if len(dentro_inf) else None,
+                                  dentro_sup.max() if len(dentro_sup) else None)
+
+
+# Função para identificar uma série pelo conteúdo
+def data_hash(timestamps, water_l1):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(np.asarray(timestamps, dtype='datetime64[ns]')).view('i8').tobytes())
+    h.update(np.ascontiguousarray(np.asarray(water_l1, dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+# Função para calcular a tabela de limites de uma estação (anual e, opcionalmente, mensal)
+def compute_thresholds(timestamps, water_l1, station, seasonal=False, whis=1.5, hash_value=None):
+    """Retorna um DataFrame com os limites do Gross Range da estação.
+
+    A linha com month = 0 usa a série inteira; com `seasonal=True` há também uma
+    linha por mês do ano (climatologia) com os bigodes calculados só com aquele mês.
+    """
+    ts = pd.DatetimeIndex(np.asarray(timestamps, dtype='datetime64[ns]'))
+    x = np.asarray(water_l1, dtype=np.float64)
+    hash_value = hash_value or data_hash(ts.values, x)
+
+    linhas = [(station, hash_value, 0, *tukey_whiskers(x, whis), int((~np.isnan(x)).sum()))]
+    if seasonal:
+        meses = ts.month.values
+        for mes in range(1, 13):
+            xm = x[meses == mes]
+            linhas.append((station, hash_value, mes, *tukey_whiskers(xm, whis), int((~np.isnan(xm)).sum())))
+    return pd.DataFrame(linhas, columns=THRESHOLD_COLUMNS)
+
+
+# Função para obter os limites usando uma tabela em cache (estação + hash dos dados)
+def get_gross_range_thresholds(timestamps, water_l1, station, seasonal=False, cache_file=None):
+    """Lê os limites do cache quando a série da estação não mudou; senão calcula e guarda."""
+    hash_value = data_hash(timestamps, water_l1)
+    cache = pd.DataFrame(columns=THRESHOLD_COLUMNS)
+    if cache_file and os.path.exists(cache_file):
+        cache = pd.read_csv(cache_file, dtype={'station': str, 'data_hash': str}, float_precision='round_trip')
+        encontrados = cache[(cache['station'] == station) & (cache['data_hash'] == hash_value)]
+        if not seasonal:
+            encontrados = encontrados[encontrados['month'] == 0]
+        if (0 in encontrados['month'].values) and (not seasonal or len(encontrados) == 13):
+            print(f"Limites do Gross Range lidos do cache {cache_file}")
+            return encontrados.reset_index(drop=True)
+
+    tabela = compute_thresholds(timestamps, water_l1, station, seasonal=seasonal, hash_value=hash_value)
+    if cache_file:
+        # Mantém apenas a versão mais recente dos limites de cada estação
+        cache = cache[cache['station'] != station]
+        pd.concat([cache, tabela], ignore_index=True).to_csv(cache_file, index=False)
+    return tabela
+
+
+# Função para converter a tabela em limites por amostra (sazonais) ou escalares (anuais)
+def limits_for_samples(table, timestamps=None):
+    """Retorna (user_min, user_max) para o Gross Range Test.
+
+    Sem `timestamps`, ou se a tabela não tiver limites mensais, usa os limites anuais.
+    Caso contrário retorna arrays com os limites do mês de cada amostra.
+    """
+    anual = table[table['month'] == 0].iloc[0]
+    mensal = table[table['month'] > 0].set_index('month')
+    if timestamps is None or mensal.empty:
+        return anual['lower'], anual['upper']
+
+    meses = pd.DatetimeIndex(np.asarray(timestamps, dtype='datetime64[ns]')).month
+    meses = np.nan_to_num(np.asarray(meses, dtype=np.float64), nan=0).astype(int)  # NaT usa o limite anual
+    lower = np.full(13, anual['lower'])
+    upper = np.full(13, anual['upper'])
+    lower[mensal.index.values] = mensal['lower'].fillna(anual['lower']).values
+    upper[mensal.index.values] = mensal['upper'].fillna(anual['upper']).values
+    return lower[meses], upper[meses]
@@ -0,0 +1,155 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.signal import sosfiltfilt
+
+from quartod_engine import select_by_quality, QC_PASS
+from formato_intermediario import read_table, read_metadata, write_table
+from filtro_segmentos import butterworth_sos, filter_segments, FILTER_INTERVALS
+from filtros_mare import tidal_filter, TIDAL_FILTERS
+
+# Função para importar os dados a partir de um arquivo .csv (ou Parquet/Feather)
+def importar_dados(file_path, max_qc_code=QC_PASS):
+    # Ajustar o formato do timestamp (apenas no CSV; os formatos colunares já trazem datetime64)
+    df = read_table(file_path, date_format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    
+    # Selecionar as amostras pelo código QUARTOD (arquivos sem flags são usados por inteiro)
+    df = select_by_quality(df, max_code=max_qc_code)
+    
+    # Verificar se houve erros na conversão
+    if df['timestamp'].isnull().any():
+        print("Algumas datas não puderam ser convertidas. Verifique o formato dos dados.")
+    
+    # Configurar o índice como timestamp
+    df.set_index('timestamp', inplace=True)
+    
+    return df
+
+# Função para identificar as frequências de amostragem
+def identificar_frequencias(df):
+    time_diffs = df.index.to_series().diff().dt.total_seconds().dropna()
+    freq_counts = time_diffs.value_counts().sort_index()
+    return freq_counts
+
+# Função para calcular a taxa de amostragem (em Hz)
+def obter_sample_rate(time_diff):
+    return 1 / (time_diff / 60)  # Retorna a taxa de amostragem em Hz
+
+# Função para aplicar o filtro a uma série contígua: Butterworth (fase zero, seções de segunda ordem)
+# ou um dos filtros de maré de janela longa ('godin', 'doodson', 'pl33') para o sinal submareal
+def aplicar_filtro(df, sample_rate, order=4, metodo='butterworth'):
+    if metodo in TIDAL_FILTERS:
+        df['water_l1_Filtrado'] = tidal_filter(df.index.values, df['water_l1'].values, metodo,
+                                               dt=60 / sample_rate)
+        return df
+    sos = butterworth_sos(sample_rate, order)
+    df['water_l1_Filtrado'] = sosfiltfilt(sos, df['water_l1'])
+    return df
+
+# Função para filtrar, em memória, cada frequência de amostragem de interesse
+def filtrar_dados(df, order=4, plotar=True, max_workers=None, metodo='butterworth'):
+    """Aplica o filtro Butterworth às frequências principais de um DataFrame indexado por timestamp.
+
+    Cada bloco contíguo com intervalo de 1, 10 ou 15 min é filtrado separadamente,
+    sem atravessar lacunas; blocos curtos demais para o filtro são descartados.
+    Com `metodo` 'godin', 'doodson' ou 'pl33' a série inteira passa pelo filtro de
+    maré (lacunas tratadas como ausentes) e ficam as linhas com saída válida.
+    Retorna o DataFrame filtrado, em ordem de timestamp, e o número de linhas cortadas.
+    """
+    # Identificar as frequências de amostragem
+    freq_counts = identificar_frequencias(df)
+    if plotar:
+        print("\nFrequências de amostragem (em segundos) e contagem:")
+        print(freq_counts)
+
+    if metodo in TIDAL_FILTERS:
+        return filtrar_mare(df.sort_index(), metodo, plotar=plotar)
+    if metodo != 'butterworth':
+        raise ValueError(f"Filtro '{metodo}' desconhecido. Opções: ('butterworth',) + {TIDAL_FILTERS}")
+
+    # Focar apenas nas frequências principais (1 min, 10 min, 15 min)
+    frequencias_interesse = list(FILTER_INTERVALS)
+    
+    posicoes, filtrado, blocos = filter_segments(df.index.values, df['water_l1'].values,
+                                                 intervals=frequencias_interesse, order=order,
+                                                 max_workers=max_workers)
+    df_final = df.iloc[posicoes].copy()
+    df_final['water_l1_Filtrado'] = filtrado
+    num_linhas_cortadas = len(df) - len(df_final)
+
+    curtos = blocos[~blocos['filtrado']]
+    if plotar:
+        print(f"\nBlocos contíguos filtrados: {len(blocos) - len(curtos)}; "
+              f"descartados por serem curtos demais: {len(curtos)} ({curtos['amostras'].sum()} linhas)")
+
+        intervalo_linhas = blocos_por_linha(blocos, len(df))[posicoes]
+        for time_diff in frequencias_interesse:
+            df_freq = df_final[intervalo_linhas == time_diff]
+            if df_freq.empty:
+                continue
+            plt.figure(figsize=(10, 6))
+            plt.plot(df_freq.index, df_freq['water_l1'], label='Dados Brutos', color='blue')
+            plt.plot(df_freq.index, df_freq['water_l1_Filtrado'], label='Dados Filtrados', color='red')
+            plt.xlabel('Tempo')
+            plt.ylabel('Nível do Mar')
+            plt.title(f'Filtro Butterworth aplicado para intervalo de {time_diff} segundos')
+            plt.legend()
+            plt.show()
+
+    return df_final, num_linhas_cortadas
+
+# Função para filtrar a série inteira com um filtro de maré (Godin, Doodson ou PL33)
+def filtrar_mare(df, metodo, plotar=True):
+    filtrado = tidal_filter(df.index.values, df['water_l1'].values, metodo)
+    valido = np.isfinite(filtrado)
+    df_final = df[valido].copy()
+    df_final['water_l1_Filtrado'] = filtrado[valido]
+    num_linhas_cortadas = len(df) - len(df_final)
+
+    if plotar and not df_final.empty:
+        plt.figure(figsize=(10, 6))
+        plt.plot(df.index, df['water_l1'], label='Dados Brutos', color='blue')
+        plt.plot(df_final.index, df_final['water_l1_Filtrado'], label='Sinal Submareal', color='red')
+        plt.xlabel('Tempo')
+        plt.ylabel('Nível do Mar')
+        plt.title(f'Filtro de maré {metodo.upper()}')
+        plt.legend()
+        plt.show()
+    return df_final, num_linhas_cortadas
+
+# Função para obter o intervalo do bloco de cada linha (NaN fora dos blocos)
+def blocos_por_linha(blocos, n):
+    intervalo = np.full(n, np.nan)
+    for valor, i, f in zip(blocos['intervalo_s'], blocos['linha_inicio'], blocos['linha_fim']):
+        intervalo[i:f + 1] = valor
+    return intervalo
+
+# Função para processar os dados
+def processar_dados(file_path, file_saida, order=4, max_qc_code=QC_PASS, metodo='butterworth'):
+    if metodo == 'butterworth':
+        print(f"\nProcessando dados com a ordem do filtro Butterworth: {order}")
+    else:
+        print(f"\nProcessando dados com o filtro de maré {metodo}")
+    print(f"Arquivo de entrada: {file_path}")
+    
+    # Importar os dados do arquivo de entrada
+    df = importar_dados(file_path, max_qc_code=max_qc_code)
+    
+    # Filtrar cada frequência de amostragem
+    df_final, num_linhas_cortadas = filtrar_dados(df, order=order, metodo=metodo)
+    
+    # Salvar os dados filtrados
+    metadata = {**read_metadata(file_path), 'stage': 'filtragem', 'filtro': metodo, 'order': order,
+                'max_qc_code': max_qc_code}
+    write_table(df_final, file_saida, metadata=metadata, index=True)
+    print(f"\nDados filtrados salvos em: {file_saida}")
+    
+    # Informar o número de linhas cortadas
+    print(f"\nNúmero de linhas cortadas após a filtragem: {num_linhas_cortadas}")
+
+# Exemplo de uso
+if __name__ == "__main__":
+    arquivo_entrada = 'dados_qualidade_15min_RIB.csv'
+    arquivo_saida = 'dados_qualidade_RIB_filtrados.csv'
+    ordem_filtro = 4
+
+    processar_dados(arquivo_entrada, arquivo_saida, order=ordem_filtro)
@@ -9,31 +9,93 @@ Created on Sun Sep 22 18:37:59 2024
 import pandas as pd
 import numpy as np
 
-def classificar_amostragem(interval):
-    # Define faixas para amostragem
-    if np.isclose(interval.total_seconds(), 60, atol=30):  # 1 min
-        return '1_min'
-    elif np.isclose(interval.total_seconds(), 300, atol=30):  # 5 min
-        return '5_min'
-    elif np.isclose(interval.total_seconds(), 600, atol=30):  # 10 min
-        return '10_min'
-    elif np.isclose(interval.total_seconds(), 900, atol=30):  # 15 min
-        return '15_min'
-    else:
-        return 'outro'
-
-def processar_amostragem(input_file):
-    # Lendo o arquivo CSV
-    dados = pd.read_csv(input_file)
+from formato_intermediario import read_table, read_metadata, write_table
+from leitura_simcosta import montar_datahora
+
+# Classes de amostragem: (rótulo, intervalo nominal em segundos); tolerância de 30 s em torno de cada uma
+CLASSES_AMOSTRAGEM = [('1_min', 60), ('5_min', 300), ('10_min', 600), ('15_min', 900)]
+TOLERANCIA_S = 30
+RUN_COLUMNS = ['amostragem', 'inicio', 'fim', 'intervalo_s', 'amostras', 'linha_inicio', 'linha_fim']
+
+def classificar_amostragem(intervals):
+    """Classifica todos os intervalos de uma vez; retorna um array de rótulos.
+
+    Mesmo critério de np.isclose(intervalo, nominal, atol=30); intervalos
+    ausentes (primeira linha) ou fora das faixas recebem 'outro'.
+    """
+    segundos = pd.to_timedelta(pd.Series(intervals)).dt.total_seconds().to_numpy()
+    rotulos = np.array([r for r, _ in CLASSES_AMOSTRAGEM] + ['outro'], dtype=object)
+    classe = np.full(len(segundos), len(CLASSES_AMOSTRAGEM))
+    # Percorre as classes em ordem inversa para que a primeira faixa compatível prevaleça
+    for i in range(len(CLASSES_AMOSTRAGEM) - 1, -1, -1):
+        nominal = CLASSES_AMOSTRAGEM[i][1]
+        classe[np.abs(segundos - nominal) <= TOLERANCIA_S + 1e-05 * nominal] = i
+    return rotulos[classe]
+
+# Função para classificar a amostragem de cada linha de um DataFrame já em memória
+def separar_amostragem(dados):
+    dados = dados.copy()
     
-    # Criando a coluna 'DataHora' a partir das colunas separadas
-    dados['DataHora'] = pd.to_datetime(dados[['YEAR', 'MONTH', 'DAY', 'HOUR', 'MINUTE', 'SECOND']])
+    # Criando a coluna 'DataHora' a partir das colunas separadas, se o arquivo não a trouxer
+    if 'DataHora' not in dados.columns:
+        dados['DataHora'] = montar_datahora(dados)
     
     # Calculando a diferença de tempo entre as amostras
     dados['diff'] = dados['DataHora'].diff()
     
     # Classificando a amostragem
-    dados['amostragem'] = dados['diff'].apply(classificar_amostragem)
+    dados['amostragem'] = classificar_amostragem(dados['diff'])
+    return dados
+
+# Função para montar a tabela de blocos contíguos com a mesma amostragem
+def tabela_blocos(dados, invalida='outro'):
+    """Uma linha por bloco contíguo de linhas com a mesma classe de amostragem.
+
+    'amostragem' em `dados` é a classe do intervalo desde a linha anterior. Cada
+    linha fica com a classe do intervalo até a seguinte (ou, se este for
+    `invalida`, a do intervalo desde a anterior): numa mudança de intervalo a
+    linha de transição inicia o novo bloco, e um bloco só continua enquanto as
+    linhas estão ligadas pelo intervalo da sua classe. Linhas sem intervalo
+    válido formam blocos `invalida`.
+
+    'linha_inicio'/'linha_fim' são posições (iloc, fim inclusivo) em `dados`, para
+    que as etapas seguintes processem bloco a bloco sem recalcular as diferenças.
+    'intervalo_s' é a mediana dos intervalos do bloco.
+    """
+    anterior = dados['amostragem'].to_numpy()
+    n = len(anterior)
+    if n == 0:
+        return pd.DataFrame(columns=RUN_COLUMNS)
+    # Códigos inteiros das classes; -1 para intervalos inválidos (e ausentes)
+    codigos, rotulos = pd.factorize(anterior)
+    codigos[anterior == invalida] = -1
+    seguinte = np.r_[codigos[1:], -1]
+    classe = np.where(seguinte >= 0, seguinte, codigos)
+
+    segundos = dados['diff'].dt.total_seconds().to_numpy()
+    intervalo_linha = np.where(seguinte >= 0, np.r_[segundos[1:], np.nan], segundos)
+
+    mudanca = np.r_[True, (classe[1:] != classe[:-1]) | ((classe[1:] >= 0) & (codigos[1:] != classe[1:]))]
+    inicios = np.flatnonzero(mudanca)
+    fins = np.r_[inicios[1:], n] - 1
+    datahora = dados['DataHora'].to_numpy()
+    bloco = np.repeat(np.arange(len(inicios)), fins - inicios + 1)
+    intervalos = pd.Series(intervalo_linha).groupby(bloco).median().to_numpy()
+    nomes = np.array(list(rotulos) + [invalida], dtype=object)
+    return pd.DataFrame({
+        'amostragem': nomes[classe[inicios]],
+        'inicio': datahora[inicios],
+        'fim': datahora[fins],
+        'intervalo_s': intervalos,
+        'amostras': fins - inicios + 1,
+        'linha_inicio': inicios,
+        'linha_fim': fins,
+    })
+
+def processar_amostragem(input_file, formato='csv'):
+    # Lendo o arquivo (CSV, Parquet ou Feather)
+    dados = separar_amostragem(read_table(input_file))
+    metadata = read_metadata(input_file)
     
     # Criar um dicionário para armazenar as diferentes séries de amostragem
     series_amostragem = {}
@@ -45,11 +107,20 @@ def processar_amostragem(input_file):
         print(f"Período de dados: {grupo['DataHora'].min()} a {grupo['DataHora'].max()}")
         print(f"Quantidade de dados: {len(grupo)}\n")
         
-        # Salvando cada série de dados em um arquivo CSV separado
-        output_file = f'dados_{amostragem}.csv'
-        series_amostragem[amostragem].to_csv(output_file, index=False)
+        # Salvando cada série de dados em um arquivo separado
+        output_file = f'dados_{amostragem}.{formato}'
+        write_table(series_amostragem[amostragem], output_file,
+                    metadata={**metadata, 'stage': 'amostragem', 'amostragem': amostragem})
         print(f"Série salva em: {output_file}\n")
 
+    # Salvando a tabela de blocos contíguos (início, fim, intervalo e tamanho de cada bloco)
+    blocos = tabela_blocos(dados)
+    blocos_file = f'blocos_amostragem.{formato}'
+    write_table(blocos, blocos_file, metadata={**metadata, 'stage': 'amostragem'})
+    print(f"{len(blocos)} blocos contíguos salvos em: {blocos_file}")
+    return blocos
+
 # Exemplo de uso
-input_file = 'dados_pre_RIB.csv'  # Substitua pelo caminho do seu arquivo .csv
-processar_amostragem(input_file)
+if __name__ == "__main__":
+    input_file = 'dados_pre_RIB.csv'  # Substitua pelo caminho do seu arquivo .csv
+    processar_amostragem(input_file)
@@ -0,0 +1,126 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from metricas import SKILL_METRICS
+
+# Colunas da tabela de métricas por janela
+WINDOW_COLUMNS = ['inicio', 'fim', 'amostras', *SKILL_METRICS]
+
+# Janela deslizante e passo padrão
+ROLLING_WINDOW = '30D'
+ROLLING_STEP = '1D'
+
+# Somas acumuladas das séries centradas: x = referência, y = modelo, e = y - x
+_SOMAS = ('x', 'y', 'xx', 'yy', 'xy', 'ee', 'abs_e')
+
+
+def _preparar(timestamps, reference, model):
+    ts = np.asarray(timestamps, dtype='datetime64[ns]')
+    ref = np.asarray(reference, dtype=np.float64)
+    mod = np.asarray(model, dtype=np.float64)
+    validos = np.isfinite(ref) & np.isfinite(mod) & ~np.isnat(ts)
+    ts, ref, mod = ts[validos], ref[validos], mod[validos]
+    if len(ts) and np.any(ts[1:] < ts[:-1]):
+        ordem = np.argsort(ts, kind='stable')
+        ts, ref, mod = ts[ordem], ref[ordem], mod[ordem]
+    return ts, ref, mod
+
+
+# Função para calcular as métricas de vários intervalos [inicio, fim) de linhas de uma só vez
+def window_metrics(reference, model, inicios, fins):
+    """Métricas (SKILL_METRICS) de cada intervalo de linhas das séries pareadas.
+
+    RMSE, MAE, viés e r saem das somas acumuladas de x, y, x², y², xy, e² e |e|
+    (duas subtrações por janela, O(n) no total). O d de Willmott e o skill de
+    Barron dependem de |x - média da janela| e são somados exatamente, janela a
+    janela, sobre as amostras de cada uma.
+    """
+    x = np.asarray(reference, dtype=np.float64)
+    y = np.asarray(model, dtype=np.float64)
+    inicios, fins = np.asarray(inicios, dtype=np.int64), np.asarray(fins, dtype=np.int64)
+    centro = x.mean() if len(x) else 0.0
+    x, y = x - centro, y - centro
+    e = y - x
+
+    somas = np.zeros((len(_SOMAS), len(x) + 1))
+    np.cumsum(np.vstack((x, y, x * x, y * y, x * y, e * e, np.abs(e))), axis=1, out=somas[:, 1:])
+    total = dict(zip(_SOMAS, somas[:, fins] - somas[:, inicios]))
+    n = (fins - inicios).astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media_x, media_y = total['x'] / n, total['y'] / n
+        rmse = np.sqrt(total['ee'] / n)
+        mae = total['abs_e'] / n
+        cov = total['xy'] - n * media_x * media_y
+        var_x, var_y = total['xx'] - n * media_x**2, total['yy'] - n * media_y**2
+        r = cov / np.sqrt(var_x * var_y)
+
+        # Termos com valor absoluto em torno da média da referência na janela
+        desvio = np.full(len(n), np.nan)
+        willmott = np.full(len(n), np.nan)
+        for j, (i, f) in enumerate(zip(inicios, fins)):
+            if f > i:
+                desvio_x = np.abs(x[i:f] - media_x[j])
+                desvio[j] = desvio_x.sum()
+                willmott[j] = np.square(np.abs(y[i:f] - media_x[j]) + desvio_x).sum()
+        d = 1 - total['ee'] / willmott
+        skill_barron = 1 - rmse / (2 * desvio / n)
+    return pd.DataFrame({'amostras': n.astype(np.int64), 'rmse': rmse, 'mae': mae, 'bias': media_y - media_x,
+                         'r': r, 'd': d, 'skill_barron': skill_barron})
+
+
+# Função para calcular as métricas por período do calendário (mês, semana, dia...)
+def calendar_skill(timestamps, reference, model, freq='M'):
+    """Uma linha por período `freq` (alias de período do pandas: 'Y', 'M', 'W', 'D') com dados."""
+    ts, ref, mod = _preparar(timestamps, reference, model)
+    if len(ts) == 0:
+        return pd.DataFrame(columns=WINDOW_COLUMNS)
+    periodos = pd.DatetimeIndex(ts).to_period(freq)
+    codigos = periodos.asi8
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    fins = np.r_[inicios[1:], len(ts)]
+
+    tabela = window_metrics(ref, mod, inicios, fins)
+    tabela.insert(0, 'inicio', periodos[inicios].start_time)
+    tabela.insert(1, 'fim', periodos[inicios].end_time)
+    return tabela
+
+
+# Função para calcular as métricas em uma janela deslizante de duração fixa
+def rolling_skill(timestamps, reference, model, window=ROLLING_WINDOW, step=ROLLING_STEP, min_samples=1):
+    """Janelas (fim - window, fim], com `fim` avançando de `step` em `step`.
+
+    As janelas são definidas em tempo, de modo que lacunas reduzem o número de
+    amostras em vez de alongar a janela; janelas com menos de `min_samples`
+    amostras são omitidas.
+    """
+    ts, ref, mod = _preparar(timestamps, reference, model)
+    if len(ts) == 0:
+        return pd.DataFrame(columns=WINDOW_COLUMNS)
+    window, step = pd.Timedelta(window).to_timedelta64(), pd.Timedelta(step).to_timedelta64()
+    fim = np.arange(ts[0] + window, ts[-1] + step, step).astype('datetime64[ns]')
+    if len(fim) == 0:
+        fim = np.array([ts[-1]])
+    inicios = np.searchsorted(ts, fim - window, side='right')
+    fins = np.searchsorted(ts, fim, side='right')
+    manter = fins - inicios >= max(min_samples, 1)
+
+    tabela = window_metrics(ref, mod, inicios[manter], fins[manter])
+    tabela.insert(0, 'inicio', fim[manter] - window)
+    tabela.insert(1, 'fim', fim[manter])
+    return tabela
+
+
+# Função para plotar a evolução das métricas por janela
+def plot_windowed_skill(tabela, station_name, metrics=('rmse', 'bias', 'r', 'd'), title='Métricas por janela'):
+    """Um painel por métrica, com o valor de cada janela no seu instante final."""
+    fig, eixos = plt.subplots(len(metrics), 1, figsize=(14, 2.5 * len(metrics)), sharex=True)
+    for eixo, metrica in zip(np.atleast_1d(eixos), metrics):
+        eixo.plot(tabela['fim'], tabela[metrica], marker='o', markersize=3, linewidth=1)
+        eixo.set_ylabel(metrica)
+        eixo.grid(True)
+    np.atleast_1d(eixos)[-1].set_xlabel('Data')
+    fig.suptitle(f'{title} - {station_name}')
+    plt.tight_layout()
+    plt.show()
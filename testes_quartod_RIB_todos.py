@@ -1,14 +1,25 @@
+import os
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.widgets import Slider
 
-# Função para ler o arquivo CSV
-def read_csv(file_path):
+from quartod_engine import run_quartod_tests, pack_flags, qc_codes, select_by_quality, QC_PASS, DEFAULT_PARAMS
+from quartod_incremental import create_state, save_state, load_state, run_incremental, std_dev_drift, DRIFT_TOLERANCE
+from quartod_thresholds import get_gross_range_thresholds, limits_for_samples
+from formato_intermediario import read_table, read_table_after, write_table, append_table
+from decimacao import plot_decimated
+
+# Função para ler o arquivo CSV (com `after`, só as linhas posteriores a esse instante)
+def read_csv(file_path, after=None):
     try:
         print("1. Lendo o arquivo CSV...")
-        dados_mare = pd.read_csv(file_path, delimiter=',')  # Ler o arquivo com o delimitador correto
+        if after is None:
+            dados_mare = read_table(file_path, date_columns=('DataHora',))  # CSV, Parquet ou Feather conforme a extensão
+        else:
+            dados_mare = read_table_after(file_path, 'DataHora', after, date_columns=('DataHora',))
         print("Arquivo CSV lido com sucesso.")
 
         # Verificar se a coluna 'DataHora' está presente
@@ -17,7 +28,7 @@ def read_csv(file_path):
             return pd.DataFrame()
 
         # Utilizando a coluna 'DataHora' já existente
-        dados_mare['timestamp'] = pd.to_datetime(dados_mare['DataHora'])
+        dados_mare['timestamp'] = dados_mare['DataHora']
         print("Coluna de timestamp criada com sucesso.")
         
         return dados_mare[['timestamp', 'water_l1']]
@@ -41,11 +52,11 @@ def plot(data, title, plot_type, xlabel='Timestamp', ylabel='Nível do mar (cm)'
 
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    # Escolher o tipo de gráfico
+    # Escolher o tipo de gráfico (séries decimadas por LTTB, redecimadas a cada zoom)
     if plot_type == 'scatter':
-        ax.scatter(data['timestamp'], data['water_l1'], s=2)
+        plot_decimated(ax, data['timestamp'], data['water_l1'], kind='scatter', s=2)
     elif plot_type == 'line':
-        ax.plot(data['timestamp'], data['water_l1'], linestyle='-', marker='o', markersize=2)
+        plot_decimated(ax, data['timestamp'], data['water_l1'], linestyle='-', marker='o', markersize=2)
     elif plot_type == 'boxplot':
         # Gerar boxplot e calcular os limites inferior e superior
         boxplot = ax.boxplot(data['water_l1'].dropna(), vert=True, patch_artist=True)
@@ -89,56 +100,59 @@ def plot(data, title, plot_type, xlabel='Timestamp', ylabel='Nível do mar (cm)'
     if plot_type == 'boxplot':
         return lower_whisker, upper_whisker
 
-# Teste de controle de qualidade - Syntax Test
-def syntax_test(data, min_chars, max_chars):
-    print("Aplicando Syntax Test...")
-    data['combined'] = data['timestamp'].astype(str) + data['water_l1'].astype(str)
-    data['message_length'] = data['combined'].apply(len)
-    data['valid_syntax'] = data['message_length'].between(min_chars, max_chars)
-    invalid_data = data[~data['valid_syntax']]
-    print(f"Linhas cortadas pelo Teste de Sintaxe: {len(invalid_data)}")
-    return data
-
-# Teste de controle de qualidade - Gross Range Test
-def gross_range_test(data, lower_whisker, upper_whisker):
-    print(f"Aplicando Gross Range Test: limites [{lower_whisker}, {upper_whisker}] cm")
-    valid_range = data['water_l1'].between(lower_whisker, upper_whisker)
-    data['valid_range'] = valid_range
-    total_invalid = (~valid_range).sum()
-    print(f"Total de dados cortados no Gross Range Test: {total_invalid}")
-    return data
-
-# Teste de controle de qualidade - Spike Test
-def spike_test(data, std_dev, spike_threshold):
-    print(f"Aplicando Spike Test: limiar de picos = {spike_threshold} * desvio padrão")
-    spk_ref = (data['water_l1'].shift(2) + data['water_l1'].shift(0)) / 2
-    spike_val = abs(data['water_l1'] - spk_ref)
-    data['spike'] = spike_val > std_dev * spike_threshold
-    total_spikes = data['spike'].sum()
-    print(f"Total de dados cortados no Spike Test: {total_spikes}")
-    return data
-
-# Teste de controle de qualidade - Flat Line Test
-def flat_line_test(data, rep_count, eps):
-    print(f"Aplicando Flat Line Test: limite = {eps} cm com {rep_count} repetições")
-    flat_line = (data['water_l1'].diff().abs() < eps).rolling(window=rep_count).sum() == rep_count
-    data['flat_line'] = flat_line
-    total_flat_lines = flat_line.sum()
-    print(f"Total de dados cortados no Flat Line Test: {total_flat_lines}")
-    return data
-
-# Teste de controle de qualidade - Rate of Change Test
-def rate_of_change_test(data, std_dev, n_dev, tst_tim):
-    print(f"Aplicando Rate of Change Test: desvio padrão * {n_dev}")
-    rolling_std = data['water_l1'].rolling(tst_tim).std()
-    data['rate_of_change'] = abs(data['water_l1'].diff()) > rolling_std * n_dev
-    total_rate_of_change = data['rate_of_change'].sum()
-    print(f"Total de dados cortados no Rate of Change Test: {total_rate_of_change}")
-    return data
+# Função para montar os metadados da etapa de controle de qualidade
+def qc_metadata(station, std_dev, params, thresholds=None):
+    # Limites sazonais são guardados como a tabela mensal, e não um valor por amostra
+    escalares = {k: v for k, v in params.items() if np.ndim(v) == 0}
+    metadata = {'stage': 'controle_qualidade', 'station': station, 'std_dev': std_dev, 'qc_params': escalares}
+    if thresholds is not None and len(thresholds) > 1:
+        metadata['gross_range_mensal'] = thresholds[['month', 'lower', 'upper']].to_dict('records')
+    return metadata
+
+# Função para marcar as amostras de um DataFrame (colunas 'timestamp' e 'water_l1') com as flags QUARTOD
+def flag_quartod(data, station, seasonal=False, thresholds_cache=None, qc_params=None):
+    """Acrescenta 'qc_flags' e 'qc_code' a `data`, sem ler nem gravar a série.
+
+    Retorna (data, std_dev, params, thresholds); `qc_params` sobrepõe DEFAULT_PARAMS.
+    """
+    # Estatísticas básicas antes dos testes
+    std_dev, max_value, min_value = calculate_statistics(data)
+
+    # Limites do Gross Range: bigodes do boxplot dos dados brutos, calculados sem desenhar a figura
+    thresholds = get_gross_range_thresholds(data['timestamp'].values, data['water_l1'].values, station,
+                                            seasonal=seasonal, cache_file=thresholds_cache)
+    lower_whisker, upper_whisker = limits_for_samples(thresholds, data['timestamp'].values if seasonal else None)
+    if seasonal:
+        print("Gross Range Test com limites mensais:")
+        print(thresholds[['month', 'lower', 'upper']].to_string(index=False))
+
+    # Parâmetros do teste QUARTOD, agora com os limites do boxplot
+    params = {
+        **DEFAULT_PARAMS,
+        **(qc_params or {}),
+        'user_min': lower_whisker,    # Gross Range Test (valor mínimo em cm)
+        'user_max': upper_whisker,    # Gross Range Test (valor máximo em cm)
+    }
+
+    # Aplicar testes QUARTOD em uma única passagem sobre arrays NumPy
+    print("Aplicando testes QUARTOD...")
+    results = run_quartod_tests(data['timestamp'].values, data['water_l1'].values, std_dev, params)
 
+    print(f"Linhas cortadas pelo Teste de Sintaxe: {(~results['valid_syntax']).sum()}")
+    print(f"Total de dados cortados no Gross Range Test: {(~results['valid_range']).sum()}")
+    print(f"Total de dados cortados no Spike Test: {results['spike'].sum()}")
+    print(f"Total de dados cortados no Rate of Change Test: {results['rate_of_change'].sum()}")
+    print(f"Total de dados cortados no Flat Line Test: {results['flat_line'].sum()}")
+
+    # Compactar os resultados em uma palavra de flags e no código agregado QUARTOD por amostra
+    data['qc_flags'] = pack_flags(results, data['timestamp'].values, data['water_l1'].values)
+    data['qc_code'] = qc_codes(data['qc_flags'].values)
+    del results
+    return data, std_dev, params, thresholds
 
 # Função principal para aplicar os testes QUARTOD
-def apply_quartod_tests(input_file, output_file, station):
+def apply_quartod_tests(input_file, output_file, station, state_file=None, plot_figures=True,
+                        seasonal=False, thresholds_cache=None):
     # Ler o arquivo CSV
     data = read_csv(input_file)
     
@@ -150,66 +164,84 @@ def apply_quartod_tests(input_file, output_file, station):
     total_dados_antes = len(data)
     print(f"Total de dados antes dos testes: {total_dados_antes}")
 
-    # Estatísticas básicas antes dos testes
-    std_dev, max_value, min_value = calculate_statistics(data)
-
     # Gráficos de dados brutos
-    plot(data, 'Gráfico de Dispersão - Dados Brutos', 'scatter', station=station, save_name=f'{station}_scatter_brutos')
-    plot(data, 'Gráfico de Linha - Dados Brutos', 'line', station=station, save_name=f'{station}_linha_brutos')
+    if plot_figures:
+        plot(data, 'Gráfico de Dispersão - Dados Brutos', 'scatter', station=station, save_name=f'{station}_scatter_brutos')
+        plot(data, 'Gráfico de Linha - Dados Brutos', 'line', station=station, save_name=f'{station}_linha_brutos')
+        plot(data, 'Boxplot - Dados Brutos', 'boxplot', station=station, save_name=f'{station}_boxplot_brutos')
+
+    # Testes QUARTOD e limites do Gross Range
+    data, std_dev, params, thresholds = flag_quartod(data, station, seasonal=seasonal,
+                                                     thresholds_cache=thresholds_cache)
+
+    # Dados aprovados em todos os testes (código 1)
+    valid_data = select_by_quality(data, max_code=QC_PASS)
     
-    # Capturar os limites inferior e superior do boxplot dos dados brutos
-    lower_whisker, upper_whisker = plot(data, 'Boxplot - Dados Brutos', 'boxplot', station=station, save_name=f'{station}_boxplot_brutos')
+    print(f"Total de dados após os testes: {len(valid_data)}")
 
-    # Parâmetros do teste QUARTOD, agora com os limites capturados do boxplot
-    params = {
-        'min_chars': 16,          # Syntax Test (mínimo de caracteres)
-        'max_chars': 27,         # Syntax Test (máximo de caracteres)
-        'user_min': lower_whisker,    # Gross Range Test (valor mínimo em cm)
-        'user_max': upper_whisker,    # Gross Range Test (valor máximo em cm)
-        'spike_threshold': 3,     # Spike Test (limiar em múltiplos do desvio padrão)
-        'n_dev': 3,               # Rate of Change Test (número de desvios padrão)
-        'rep_cnt_fail': 5,        # Flat Line Test (repetições para falha)
-        'eps': 0.01,              # Flat Line Test (variação mínima em cm)
-        'tst_tim': 375           # Tempo de teste em número de observações
-    }
+    # Salvar todas as amostras com suas flags; o rigor é escolhido na leitura
+    write_table(data[['timestamp', 'water_l1', 'qc_flags', 'qc_code']], output_file,
+                metadata=qc_metadata(station, std_dev, params, thresholds))
+    print(f"Dados com flags QUARTOD salvos em {output_file}")
 
-    # Aplicar testes QUARTOD
-    print("Aplicando testes QUARTOD...")
+    # Salvar o estado da estação para as execuções incrementais (apenas com limites anuais)
+    if state_file and seasonal:
+        print("Aviso: o modo incremental usa limites anuais; estado não salvo.")
+    elif state_file:
+        save_state(create_state(data['timestamp'].values, data['water_l1'].values, std_dev, params), state_file)
+        print(f"Estado do controle de qualidade salvo em {state_file}")
 
-    # Etapa 1 - Teste de Sintaxe
-    data = syntax_test(data, params['min_chars'], params['max_chars'])
+    # Gráficos de dados aprovados
+    if plot_figures:
+        plot(valid_data, 'Gráfico de Dispersão - Dados Aprovados', 'scatter', station=station, save_name=f'{station}_scatter_aprovados')
+        plot(valid_data, 'Gráfico de Linha - Dados Aprovados', 'line', station=station, save_name=f'{station}_linha_aprovados')
+        plot(valid_data, 'Boxplot - Dados Aprovados', 'boxplot', station=station, save_name=f'{station}_boxplot_aprovados')
 
-    # Etapa 2 - Gross Range Test (agora com os limites do boxplot)
-    data = gross_range_test(data, params['user_min'], params['user_max'])
+# Função para aplicar os testes QUARTOD apenas aos dados novos de uma estação
+def apply_quartod_incremental(input_file, output_file, state_file, station):
+    """Testa as observações posteriores ao último processamento e as acrescenta à saída.
 
-    # Etapa 3 - Spike Test
-    data = spike_test(data, std_dev, params['spike_threshold'])
+    Usa os limiares e a cauda da série guardados em `state_file` por uma execução
+    completa de `apply_quartod_tests`. As flags só coincidem com as de reprocessar
+    tudo enquanto o `std_dev` e os limites de Tukey congelados no estado valem
+    para a série acumulada: um reprocessamento completo os recalcula com os dados
+    novos. Por isso o estado acumula o desvio padrão da série, e se ele se afastar
+    mais de DRIFT_TOLERANCE do congelado a série é reprocessada por inteiro.
+    Do arquivo de entrada (em ordem cronológica) só são lidas as linhas posteriores
+    ao último timestamp processado, de modo que o custo não cresce com o histórico.
+    """
+    if not os.path.exists(state_file):
+        print(f"Erro: estado {state_file} não encontrado. Execute apply_quartod_tests com state_file primeiro.")
+        return
 
-    # Etapa 4 - Rate of Change Test
-    data = rate_of_change_test(data, std_dev, params['n_dev'], params['tst_tim'])
+    state = load_state(state_file)
+    ultimo = state['last_timestamp']
+    data = read_csv(input_file, after=pd.Timestamp(ultimo) if ultimo is not None else None)
+    if data.empty:
+        print(f"Estação {station}: nenhuma amostra nova em {input_file}")
+        return
 
-    # Etapa 5 - Flat Line Test
-    data = flat_line_test(data, params['rep_cnt_fail'], params['eps'])
+    timestamps, water_l1, results, state = run_incremental(state, data['timestamp'].values, data['water_l1'].values)
+    print(f"Estação {station}: {len(timestamps)} novas amostras de {len(data)} lidas")
+    if len(timestamps) == 0:
+        return
 
-    # Filtrar dados aprovados
-    valid_data = data[
-        data['valid_syntax'] &
-        data['valid_range'] &
-        ~data['spike'] &
-        ~data['rate_of_change'] &
-        ~data['flat_line']
-    ]
-    
-    print(f"Total de dados após os testes: {len(valid_data)}")
+    # Limiares congelados desatualizados: recalcular std_dev e limites de Tukey com a série completa
+    deriva = std_dev_drift(state)
+    if deriva > DRIFT_TOLERANCE:
+        print(f"Desvio padrão da série variou {deriva:.1%} em relação ao do estado; reprocessando a série completa")
+        apply_quartod_tests(input_file, output_file, station, state_file=state_file, plot_figures=False)
+        return
 
-    # Salvar dados aprovados
-    valid_data[['timestamp', 'water_l1']].to_csv(output_file, index=False)
-    print(f"Dados aprovados salvos em {output_file}")
+    novos = pd.DataFrame({'timestamp': timestamps, 'water_l1': water_l1})
+    novos['qc_flags'] = pack_flags(results, timestamps, water_l1)
+    novos['qc_code'] = qc_codes(novos['qc_flags'].values)
+    print(f"Total de novos dados aprovados: {(novos['qc_code'] == QC_PASS).sum()}")
 
-    # Gráficos de dados aprovados
-    plot(valid_data, 'Gráfico de Dispersão - Dados Aprovados', 'scatter', station=station, save_name=f'{station}_scatter_aprovados')
-    plot(valid_data, 'Gráfico de Linha - Dados Aprovados', 'line', station=station, save_name=f'{station}_linha_aprovados')
-    plot(valid_data, 'Boxplot - Dados Aprovados', 'boxplot', station=station, save_name=f'{station}_boxplot_aprovados')
+    # Acrescentar à saída e só então atualizar o estado
+    append_table(novos, output_file, metadata=qc_metadata(station, state['std_dev'], state['params']))
+    save_state(state, state_file)
+    print(f"Novos dados acrescentados a {output_file}")
 
 # Função para rodar o script
 def run_analysis():
@@ -217,9 +249,12 @@ def run_analysis():
     input_file = 'dados_pre_RIB.csv'  # Caminho do arquivo de entrada
     output_file = 'dados_qualidade_RIB.csv'  # Caminho do arquivo de saída
     station = 'Ribamar - MA'  # Nome da estação para os títulos e arquivos
+    state_file = 'estado_quartod_RIB.json'  # Estado para as execuções incrementais
+    thresholds_cache = 'limites_gross_range.csv'  # Cache dos limites do Gross Range por estação
     
     # Chamar a função principal
-    apply_quartod_tests(input_file, output_file, station)
+    apply_quartod_tests(input_file, output_file, station, state_file=state_file, thresholds_cache=thresholds_cache)
 
 # Executar a análise
-run_analysis()
+if __name__ == "__main__":
+    run_analysis()
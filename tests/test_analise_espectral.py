@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analise_espectral import welch_spectra, band_skill
+
+
+# Senoide pura de amplitude A: a variância integrada na banda deve ser A²/2
+@pytest.mark.parametrize('banda, periodo_h, amplitude', [
+    ('diurnal', 23.9345, 30.0),         # K1
+    ('diurnal', 25.8193, 30.0),         # O1
+    ('diurnal', 26.8684, 20.0),         # Q1
+    ('semidiurnal', 12.4206, 100.0),    # M2
+    ('semidiurnal', 12.6583, 20.0),     # N2
+    ('quarter_diurnal', 6.2103, 5.0),   # M4
+])
+def test_band_variance_of_pure_sinusoid(banda, periodo_h, amplitude):
+    timestamps = pd.date_range('2024-01-01', periods=180 * 144, freq='10min')
+    horas = np.arange(len(timestamps)) / 6
+    serie = amplitude * np.cos(2 * np.pi * horas / periodo_h + 0.3)
+
+    bandas = band_skill(welch_spectra(timestamps, serie, serie)).set_index('band')
+
+    assert bandas.loc[banda, 'var_reference'] == pytest.approx(amplitude**2 / 2, rel=1e-3)
+    assert bandas['var_reference'].drop(banda).sum() < 1e-3 * amplitude**2
+    assert bandas.loc[banda, 'rmse_band'] == pytest.approx(0.0, abs=1e-6 * amplitude)
+
+
+# Série com lacunas de 1 dia a cada 10 dias: nenhum bloco tem SEGMENT e os segmentos encolhem
+def test_gappy_series_falls_back_to_longest_block():
+    timestamps = pd.date_range('2024-01-01', periods=60 * 144, freq='10min')
+    horas = np.arange(len(timestamps)) / 6
+    serie = 100.0 * np.cos(2 * np.pi * horas / 12.4206)
+    presente = (horas // 24) % 10 != 9
+    timestamps, serie = timestamps[presente], serie[presente]
+
+    espectro = welch_spectra(timestamps, serie, serie)
+    bandas = band_skill(espectro).set_index('band')
+
+    assert espectro.attrs['segment'] == pd.Timedelta('9D')
+    assert espectro.attrs['segments'] > 0
+    assert bandas.loc['semidiurnal', 'var_reference'] == pytest.approx(100.0**2 / 2, rel=1e-2)
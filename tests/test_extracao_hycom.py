@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip('xarray')
+pytest.importorskip('dask')
+pytest.importorskip('netCDF4')
+
+from extracao_hycom import extract_stations, RAIO_TERRA_KM
+from formato_intermediario import read_table
+
+LATS = np.array([-3.0, -2.5, -2.0])
+LONS = np.array([-44.5, -44.0, -43.5, -43.0])
+
+
+# Grade 3 x 4 com a coluna oeste seca (terra) e nível do mar em metros que identifica a célula e o passo
+def _gravar_netcdf(caminho, inicio, passos):
+    tempo = pd.date_range(inicio, periods=passos, freq='1h')
+    celula = np.arange(len(LATS) * len(LONS), dtype=np.float64).reshape(len(LATS), len(LONS))
+    ssh = celula[None] / 100 + np.arange(passos)[:, None, None] / 1000
+    ssh[:, :, 0] = np.nan
+    xr.Dataset({'surf_el': (('time', 'lat', 'lon'), ssh)},
+               coords={'time': tempo, 'lat': LATS, 'lon': LONS}).to_netcdf(caminho)
+    return tempo
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a))
+
+
+def test_extract_stations(tmp_path):
+    tempos = [_gravar_netcdf(tmp_path / f'hycom_{i}.nc', inicio, 24)
+              for i, inicio in enumerate(['2024-01-01', '2024-01-02', '2024-01-03'])]
+    estacoes = pd.DataFrame({'station': ['TERRA', 'MAR'], 'lat': [-2.5, -2.9], 'lon': [-44.5, -43.1]})
+
+    resumo = extract_stations(str(tmp_path / 'hycom_*.nc'), estacoes,
+                              output_pattern=str(tmp_path / 'serie_{station}.parquet'))
+
+    # A estação sobre a coluna seca usa a célula molhada vizinha; a outra, a célula mais próxima
+    assert resumo[['cell_lat', 'cell_lon']].values.tolist() == [[-2.5, -44.0], [-3.0, -43.0]]
+    esperado = _haversine(estacoes['lat'], estacoes['lon'], resumo['cell_lat'], resumo['cell_lon'])
+    np.testing.assert_allclose(resumo['distance_km'], esperado, rtol=1e-9)
+
+    serie = read_table(resumo.loc[0, 'file'])
+    assert list(serie.columns) == ['timestamp', 'Nivel_do_Mar']
+    assert (serie['timestamp'].values == np.concatenate([t.values for t in tempos])).all()
+    # Célula (1, 1) = 5 -> 0,05 m + passo/1000 m, gravados em cm
+    passos = np.tile(np.arange(24), 3)
+    np.testing.assert_allclose(serie['Nivel_do_Mar'], (5 / 100 + passos / 1000) * 100)
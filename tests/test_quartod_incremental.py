@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quartod_engine import run_quartod_tests, DEFAULT_PARAMS
+from quartod_incremental import create_state, run_incremental, std_dev_drift, DRIFT_TOLERANCE
+
+
+# Maré de 10 min com ruído, em cm com duas casas (como pre_RIB); as últimas `n_final` amostras têm amplitude `amplitude_final`
+def _serie(n, amplitude_final=100.0, n_final=0, semente=0):
+    rng = np.random.default_rng(semente)
+    timestamps = pd.date_range('2024-01-01', periods=n, freq='10min').values
+    horas = np.arange(n) / 6
+    amplitude = np.full(n, 100.0)
+    amplitude[n - n_final:] = amplitude_final
+    return timestamps, np.round(150 + amplitude * np.cos(2 * np.pi * horas / 12.42) + rng.normal(0, 1.0, n), 2)
+
+
+def _params(x):
+    return {**DEFAULT_PARAMS, 'user_min': float(x.min()) - 1, 'user_max': float(x.max()) + 1}
+
+
+def _estado_e_novas(timestamps, x, corte):
+    std_dev = float(pd.Series(x[:corte]).std())
+    params = _params(x[:corte])
+    state = create_state(timestamps[:corte], x[:corte], std_dev, params)
+    _, _, resultados, state = run_incremental(state, timestamps[corte:], x[corte:])
+    return std_dev, params, resultados, state
+
+
+# Com os limiares congelados, o incremental reproduz o processamento completo
+def test_incremental_matches_full_run_with_frozen_thresholds():
+    timestamps, x = _serie(3000)
+    std_dev, params, resultados, state = _estado_e_novas(timestamps, x, 2000)
+
+    completo = run_quartod_tests(timestamps, x, std_dev, params)
+    assert completo['passed'][2000:].any()
+    for teste, flags in resultados.items():
+        np.testing.assert_array_equal(flags, completo[teste][2000:], err_msg=teste)
+    assert std_dev_drift(state) < DRIFT_TOLERANCE
+
+
+# Dados novos com outra amplitude: o reprocessamento recalcula std_dev e limites, e as flags divergem
+def test_drift_marks_where_full_rerun_disagrees():
+    timestamps, x = _serie(3000, amplitude_final=150.0, n_final=1000)
+    _, _, resultados, state = _estado_e_novas(timestamps, x, 2000)
+
+    assert std_dev_drift(state) > DRIFT_TOLERANCE
+    assert state['count'] == 3000
+    assert np.sqrt(state['m2'] / (state['count'] - 1)) == pytest.approx(pd.Series(x).std())
+
+    reprocessado = run_quartod_tests(timestamps, x, float(pd.Series(x).std()), _params(x))
+    assert not np.array_equal(resultados['passed'], reprocessado['passed'][2000:])
@@ -0,0 +1,140 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from pre_RIB import ler_dados_simcosta
+from cadeia_validacao import run_validation_chain
+from quartod_engine import DEFAULT_PARAMS
+from quartod_thresholds import tukey_whiskers
+from formato_intermediario import read_table, write_table
+
+# Colunas obrigatórias do manifesto de estações
+MANIFEST_COLUMNS = ['station', 'simcosta_file', 'hycom_file']
+
+# Período da tabela de defasagem por estação
+LAG_FREQ = 'M'
+
+
+# Função para ler o manifesto de estações (JSON ou CSV)
+def read_manifest(file_path):
+    """Lê a lista de estações a validar.
+
+    JSON: lista de objetos com 'station', 'simcosta_file', 'hycom_file' e,
+    opcionalmente, 'ajuste_fuso', 'order' e 'qc_params' (dicionário).
+    CSV: uma linha por estação; colunas com nomes de parâmetros QUARTOD
+    (ex.: 'spike_threshold', 'tst_tim') são usadas como qc_params.
+    """
+    if file_path.lower().endswith('.json'):
+        with open(file_path) as f:
+            estacoes = json.load(f)
+    else:
+        tabela = pd.read_csv(file_path)
+        estacoes = []
+        for linha in tabela.to_dict('records'):
+            qc_params = {k: linha.pop(k) for k in list(linha) if k in DEFAULT_PARAMS or k in ('user_min', 'user_max')}
+            linha['qc_params'] = {k: v for k, v in qc_params.items() if not pd.isna(v)}
+            estacoes.append(linha)
+
+    for config in estacoes:
+        faltando = [c for c in MANIFEST_COLUMNS if c not in config]
+        if faltando:
+            raise ValueError(f"Manifesto sem as colunas {faltando} para a estação {config.get('station')}")
+    return estacoes
+
+
+# Função para ler a série HYCOM de uma estação no formato de interpola.read_data
+def _read_model(file_path):
+    return read_table(file_path)
+
+
+# Função executada em cada processo: cadeia completa de uma estação
+def run_station(config):
+    """Pré-processamento, QC, filtro, interpolação e estatísticas de uma estação.
+
+    A defasagem por mês vai na chave 'lag_calendar' (tabela de
+    `defasagem.calendar_lag_analysis`). Erros não interrompem o lote: a estação
+    é retornada com status 'erro' e a mensagem.
+    """
+    inicio = time.perf_counter()
+    linha = {'station': config['station'], 'status': 'ok', 'message': ''}
+    try:
+        dados = ler_dados_simcosta(config['simcosta_file'], ajuste_fuso=config.get('ajuste_fuso', 0) or 0)
+        dados = dados.sort_values('DataHora')
+        timestamps = dados['DataHora'].values
+        water_l1 = dados['water_l1'].to_numpy(dtype=np.float64)
+
+        qc_params = dict(config.get('qc_params') or {})
+        if 'user_min' not in qc_params or 'user_max' not in qc_params:
+            qc_params['user_min'], qc_params['user_max'] = tukey_whiskers(water_l1)
+        std_dev = float(pd.Series(water_l1).std())
+
+        resultado = run_validation_chain(timestamps, water_l1, _read_model(config['hycom_file']),
+                                         qc_params, std_dev, order=int(config.get('order', 4) or 4), lag=True,
+                                         lag_freq=LAG_FREQ, max_workers=1)
+        linha.update({'rows_raw': len(dados), **resultado})
+    except Exception as e:
+        linha.update({'status': 'erro', 'message': f"{type(e).__name__}: {e}"})
+    linha['seconds'] = round(time.perf_counter() - inicio, 2)
+    return linha
+
+
+# Função principal do lote: todas as estações em paralelo
+def run_batch(manifest, output_file=None, max_workers=None, lag_output_file=None):
+    """Valida todas as estações do manifesto em paralelo.
+
+    Retorna (resumo, defasagem_mensal): as métricas de cada estação (uma linha
+    por estação) e a defasagem por estação e mês (colunas 'station', 'inicio' e
+    as de `defasagem.lag_analysis`).
+    """
+    estacoes = read_manifest(manifest) if isinstance(manifest, str) else list(manifest)
+    print(f"Validando {len(estacoes)} estações em {max_workers or os.cpu_count()} processos")
+
+    linhas, mensais = [], {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {executor.submit(run_station, config): config['station'] for config in estacoes}
+        for futuro in as_completed(futuros):
+            try:
+                linha = futuro.result()
+            except Exception as e:
+                # Falhas do próprio processo (ex.: memória) também não interrompem o lote
+                linha = {'station': futuros[futuro], 'status': 'erro', 'message': f"{type(e).__name__}: {e}"}
+            mensal = linha.pop('lag_calendar', None)
+            if mensal is not None and len(mensal):
+                mensal.insert(0, 'station', linha['station'])
+                mensais[linha['station']] = mensal
+            if linha['status'] == 'ok':
+                print(f"Estação {linha['station']}: skill de Barron {linha['skill_barron']:.4f}")
+            else:
+                print(f"Estação {linha['station']}: falhou ({linha['message']})")
+            linhas.append(linha)
+
+    ordem = {config['station']: i for i, config in enumerate(estacoes)}
+    resumo = pd.DataFrame(linhas)
+    resumo = resumo.sort_values('station', key=lambda s: s.map(ordem)).reset_index(drop=True)
+    tabelas = [mensais[config['station']] for config in estacoes if config['station'] in mensais]
+    defasagem_mensal = pd.concat(tabelas, ignore_index=True) if tabelas else pd.DataFrame(columns=['station', 'inicio'])
+
+    if output_file:
+        write_table(resumo, output_file)
+        print(f"Resumo das estações salvo em {output_file}")
+    if lag_output_file:
+        write_table(defasagem_mensal, lag_output_file)
+        print(f"Defasagem mensal das estações salva em {lag_output_file}")
+    return resumo, defasagem_mensal
+
+
+def main():
+    manifest_file = 'estacoes.json'             # Manifesto com os arquivos e parâmetros de cada estação
+    output_file = 'resumo_validacao_estacoes.csv'
+    lag_output_file = 'defasagem_mensal_estacoes.csv'  # Defasagem do HYCOM por estação e mês
+    resumo, defasagem_mensal = run_batch(manifest_file, output_file, lag_output_file=lag_output_file)
+    print(resumo.to_string(index=False))
+    print(defasagem_mensal[['station', 'inicio', 'lag_minutes', 'r_peak', 'r_lag0']].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from cadeia_validacao import run_validation_chain
+from quartod_thresholds import tukey_whiskers
+from metricas import SKILL_METRICS
+from formato_intermediario import read_table, write_table
+
+# Parâmetros varridos por padrão (QC QUARTOD e ordem do filtro Butterworth)
+DEFAULT_GRID = {
+    'spike_threshold': [2, 3, 4],
+    'n_dev': [2, 3, 4],
+    'rep_cnt_fail': [3, 5, 7],
+    'eps': [0.01],
+    'tst_tim': [375],
+    'order': [2, 4, 6],
+}
+
+# Arrays compartilhados, anexados uma vez por processo de trabalho
+_SHARED = {}
+
+
+# Função para expandir a grade de parâmetros em uma lista de combinações
+def parameter_grid(grid):
+    nomes = list(grid)
+    return [dict(zip(nomes, valores)) for valores in itertools.product(*(grid[n] for n in nomes))]
+
+
+# Função para copiar um array para a memória compartilhada
+def _to_shared(array, blocos):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    blocos.append(shm)
+    return shm.name, array.shape, array.dtype.str
+
+
+# Função de inicialização dos processos: anexa os arrays sem copiá-los
+def _init_worker(descritores, std_dev, user_min, user_max):
+    for nome, (shm_name, shape, dtype) in descritores.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        _SHARED[nome] = array
+        _SHARED[f'_{nome}_shm'] = shm
+    _SHARED['std_dev'] = std_dev
+    _SHARED['limites'] = {'user_min': user_min, 'user_max': user_max}
+    _SHARED['df_model'] = pd.DataFrame({
+        'timestamp': _SHARED['model_timestamps'].view('datetime64[ns]'),
+        'Nivel_do_Mar': _SHARED['model_level'],
+    })
+
+
+# Função executada em cada processo para uma combinação de parâmetros
+def _evaluate_combination(combo):
+    qc_params = {k: v for k, v in combo.items() if k != 'order'}
+    qc_params.update(_SHARED['limites'])
+    try:
+        resultado = run_validation_chain(_SHARED['timestamps'].view('datetime64[ns]'), _SHARED['water_l1'],
+                                         _SHARED['df_model'], qc_params, _SHARED['std_dev'],
+                                         order=combo.get('order', 4), max_workers=1)
+    except Exception as e:
+        print(f"Erro na combinação {combo}: {e}")
+        resultado = {'rows_qc': np.nan, 'rows_kept': np.nan, **{k: np.nan for k in SKILL_METRICS}}
+    return {**combo, **resultado}
+
+
+# Função principal da varredura de parâmetros
+def run_parameter_sweep(timestamps, water_l1, df_model, grid=None, max_workers=None):
+    """Roda QC -> filtro -> interpolação -> estatísticas para cada combinação da grade.
+
+    A série bruta e o HYCOM são colocados uma única vez em memória compartilhada e
+    lidos pelos processos sem cópia. Desvio padrão e limites do Gross Range não
+    dependem dos parâmetros varridos e são calculados uma vez.
+    Retorna um DataFrame com uma linha por combinação: linhas mantidas, RMSE,
+    MAE, r, Willmott d e skill de Barron.
+    """
+    combos = parameter_grid(grid or DEFAULT_GRID)
+    ts = np.ascontiguousarray(np.asarray(timestamps, dtype='datetime64[ns]').view('i8'))
+    x = np.ascontiguousarray(np.asarray(water_l1, dtype=np.float64))
+    std_dev = float(pd.Series(x).std())
+    user_min, user_max = tukey_whiskers(x)
+
+    blocos = []
+    try:
+        descritores = {
+            'timestamps': _to_shared(ts, blocos),
+            'water_l1': _to_shared(x, blocos),
+            'model_timestamps': _to_shared(np.ascontiguousarray(
+                df_model['timestamp'].values.astype('datetime64[ns]').view('i8')), blocos),
+            'model_level': _to_shared(np.ascontiguousarray(df_model['Nivel_do_Mar'].to_numpy(dtype=np.float64)), blocos),
+        }
+        print(f"Varredura de {len(combos)} combinações de parâmetros em {max_workers or os.cpu_count()} processos")
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(descritores, std_dev, user_min, user_max)) as executor:
+            linhas = list(executor.map(_evaluate_combination, combos))
+    finally:
+        for shm in blocos:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(linhas)
+
+
+def main():
+    raw_file = 'dados_pre_RIB.csv'            # Série bruta (saída de pre_RIB.py)
+    model_file = 'hycom_RIB.csv'              # Série HYCOM da estação
+    output_file = 'varredura_parametros_RIB.csv'
+
+    dados = read_table(raw_file)
+    dados['timestamp'] = dados['DataHora']
+    df_model = read_table(model_file)
+
+    tabela = run_parameter_sweep(dados['timestamp'].values, dados['water_l1'].values, df_model)
+    tabela = tabela.sort_values('skill_barron', ascending=False)
+    print(tabela.to_string(index=False))
+    write_table(tabela, output_file)
+    print(f"Resultados da varredura salvos em {output_file}")
+
+
+if __name__ == "__main__":
+    main()